@@ -5,7 +5,7 @@ a = Analysis(
     ['main.py'],
     pathex=['D:\\DnD\\Pay What You Want\\Horror\\Nechronica\\Code'],
     binaries=[],
-    datas=[('Pictures', 'Pictures')],
+    datas=[('Pictures', 'Pictures'), ('JSON', 'JSON')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
@@ -0,0 +1,282 @@
+# async_bridge.py
+
+# Runs an asyncio event loop next to the Tk main loop, so slow work (loading, saving,
+# imports, searches) can be awaited without freezing the window.
+#
+# Tk is single-threaded: widgets may only be touched from the thread running mainloop().
+# The asyncio loop therefore runs on its own thread, and everything going back to the
+# widgets (results, errors, progress) is handed over through a queue that the Tk thread
+# drains with after(). Blocking calls inside a job are awaited with bridge.to_thread(),
+# which runs them on a small thread pool.
+#
+#     async def load(job, path):
+#         return await job.bridge.to_thread(read_file, path)
+#
+#     job = bridge.submit(load, path, on_done=show_data, on_error=show_error)
+#     cancel_button.configure(command=job.cancel)
+#
+# The loop thread is only started by the first job, so screens that never submit any
+# work cost nothing, and it is stopped when the widget is destroyed.
+
+import asyncio
+import concurrent.futures
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Milliseconds between two checks for results to hand over to the Tk thread
+DEFAULT_POLL_INTERVAL_MS = 50
+# Threads available to bridge.to_thread()
+IO_WORKERS = 4
+# Seconds stop() waits for the loop thread to finish
+STOP_TIMEOUT = 5.0
+
+
+class Job:
+    """
+    A coroutine running on the bridge's event loop, as seen from the Tk thread.
+    """
+    def __init__(self, bridge, name, on_done=None, on_error=None, on_progress=None, on_cancelled=None):
+        self.bridge = bridge
+        self.name = name
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.on_cancelled = on_cancelled
+        # Set by cancel(). Blocking code running in bridge.to_thread() cannot be
+        # interrupted, so it should check this now and then and stop early.
+        self.cancel_event = threading.Event()
+        self.future = None # concurrent.futures.Future of the coroutine
+        self.task = None # asyncio.Task running the coroutine, once it has started
+        self._cancel_requested = False # cancel() was called, not just request_stop()
+        self._progress_lock = threading.Lock()
+        self._latest_progress = None # Only the latest progress report is delivered
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def done(self):
+        return self.future is not None and self.future.done()
+
+    def cancel(self):
+        """
+        Cancels the job. Call from any thread. The coroutine gets a CancelledError at its
+        next await, and on_cancelled is called on the Tk thread instead of on_done once
+        the coroutine has ended, including a blocking call it was awaiting.
+        """
+        self.cancel_event.set()
+        self._cancel_requested = True
+        # The task is cancelled on the loop rather than through self.future: cancelling
+        # the future would report the job cancelled right away, while it still runs
+        if self.bridge.loop is not None and not self.bridge.loop.is_closed():
+            self.bridge.loop.call_soon_threadsafe(self._cancel_task)
+
+    def _cancel_task(self):
+        if self.task is not None:
+            self.task.cancel()
+
+    def request_stop(self):
+        """
+        Asks the job to stop early without cancelling it. Call from any thread. Only
+        cancel_event is set: blocking code that checks it returns what it has done so
+        far, and the job ends through on_done with that result.
+        """
+        self.cancel_event.set()
+
+    def report_progress(self, *values):
+        """
+        Hands progress values to on_progress on the Tk thread. Call from any thread.
+        Reports made faster than the Tk thread collects them are merged, keeping the latest.
+        """
+        if self.on_progress is None:
+            return
+        with self._progress_lock:
+            first = self._latest_progress is None
+            self._latest_progress = values
+        if first:
+            self.bridge.call_in_tk(self._deliver_progress)
+
+    def _deliver_progress(self):
+        with self._progress_lock:
+            values, self._latest_progress = self._latest_progress, None
+        if values is not None and not self.cancelled:
+            self.on_progress(*values)
+
+    def _finished(self, future):
+        """
+        Called on the loop thread when the coroutine ends; hands the outcome to the Tk thread.
+        """
+        if future.cancelled():
+            callback, args = self.on_cancelled, ()
+        elif future.exception() is not None:
+            error = future.exception()
+            if self.on_error is None:
+                logger.error("Job %s failed", self.name, exc_info=error)
+            callback, args = self.on_error, (error,)
+        else:
+            callback, args = self.on_done, (future.result(),)
+        self.bridge._jobs.discard(self)
+        if callback is not None:
+            self.bridge.call_in_tk(callback, *args)
+
+
+class AsyncBridge:
+    """
+    An asyncio event loop on a background thread whose results are delivered to Tk.
+    """
+    def __init__(self, widget, poll_interval_ms=DEFAULT_POLL_INTERVAL_MS):
+        """
+        Initializes the bridge. Nothing runs until the first job is submitted.
+
+        Args:
+            widget: Any widget of the application; its after() drives the hand-over.
+            poll_interval_ms (int): Milliseconds between two checks for results.
+        """
+        self.widget = widget
+        self.poll_interval_ms = poll_interval_ms
+        self.loop = None
+        self.executor = None
+        self._thread = None
+        self._poll_job = None # Pending after() id of _drain
+        self._callbacks = queue.SimpleQueue() # (callback, args) to run on the Tk thread
+        self._jobs = set()
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        """
+        Starts the event loop thread. submit() calls this when needed.
+        """
+        if self._thread is not None:
+            return
+        self.loop = asyncio.new_event_loop()
+        self.executor = concurrent.futures.ThreadPoolExecutor(IO_WORKERS, thread_name_prefix="async-io")
+        self.loop.set_default_executor(self.executor)
+        self._thread = threading.Thread(target=self._run_loop, name="asyncio-bridge", daemon=True)
+        self._thread.start()
+        self._poll_job = self.widget.after(self.poll_interval_ms, self._drain)
+        self.widget.bind("<Destroy>", self._on_widget_destroyed, add="+")
+
+    def _on_widget_destroyed(self, event):
+        # A toplevel also receives the <Destroy> events of its children
+        if event.widget is self.widget:
+            self.stop()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def stop(self):
+        """
+        Cancels the running jobs and stops the event loop thread. Call from the Tk thread,
+        e.g. after mainloop() returns. Callbacks still queued for Tk are dropped.
+        """
+        if self._thread is None:
+            return
+        for job in list(self._jobs):
+            job.cancel()
+
+        async def shutdown():
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.loop.stop()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self.loop)
+        self._thread.join(STOP_TIMEOUT)
+        if self._thread.is_alive():
+            logger.warning("The asyncio loop did not stop within %.0f s", STOP_TIMEOUT)
+        else:
+            self.loop.close()
+        # Threads stuck in blocking calls are left to finish on their own
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if self._poll_job is not None:
+            try:
+                self.widget.after_cancel(self._poll_job)
+            except Exception: # The widget is already destroyed
+                pass
+        self._thread = None
+        self._poll_job = None
+
+    def submit(self, coroutine_function, *args, name=None, on_done=None, on_error=None,
+               on_progress=None, on_cancelled=None):
+        """
+        Runs coroutine_function(job, *args) on the event loop. Call from the Tk thread.
+        The callbacks are called on the Tk thread.
+
+        Args:
+            coroutine_function: An async function taking the Job, then args.
+            name (str, optional): Shown in log messages; defaults to the function name.
+            on_done (callable, optional): Called with the result.
+            on_error (callable, optional): Called with the exception. Without it, the
+                error is logged.
+            on_progress (callable, optional): Called with the values of job.report_progress().
+            on_cancelled (callable, optional): Called without arguments after job.cancel().
+
+        Returns:
+            Job: The running job.
+        """
+        self.start()
+        job = Job(self, name or getattr(coroutine_function, "__name__", "job"),
+                  on_done, on_error, on_progress, on_cancelled)
+        self._jobs.add(job)
+
+        async def run():
+            job.task = asyncio.current_task()
+            if job._cancel_requested: # cancel() ran before the task started
+                raise asyncio.CancelledError()
+            return await coroutine_function(job, *args)
+        job.future = asyncio.run_coroutine_threadsafe(run(), self.loop)
+        job.future.add_done_callback(job._finished)
+        return job
+
+    def run_blocking(self, function, *args, **kwargs):
+        """
+        Shortcut for submit() of a job that only calls a blocking function(*args) on the
+        thread pool. Takes the same keyword arguments as submit().
+        """
+        async def run(job):
+            return await self.to_thread(function, *args)
+        kwargs.setdefault("name", getattr(function, "__name__", "job"))
+        return self.submit(run, **kwargs)
+
+    async def to_thread(self, function, *args):
+        """
+        Awaits function(*args) run on the bridge's thread pool. Use inside jobs for
+        blocking I/O.
+
+        A running thread cannot be interrupted, so when the job is cancelled this still
+        waits for function to return before raising the CancelledError: the job only
+        counts as ended once nothing of it runs anymore.
+        """
+        future = self.loop.run_in_executor(self.executor, function, *args)
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            await asyncio.wait([future])
+            raise
+
+    def call_in_tk(self, callback, *args):
+        """
+        Calls callback(*args) on the Tk thread soon. Safe to call from any thread.
+        """
+        self._callbacks.put((callback, args))
+
+    def _drain(self):
+        """
+        Runs the callbacks queued for the Tk thread.
+        """
+        while True:
+            try:
+                callback, args = self._callbacks.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                callback(*args)
+            except Exception:
+                logger.exception("Callback %r of the asyncio bridge failed", callback)
+        self._poll_job = self.widget.after(self.poll_interval_ms, self._drain)
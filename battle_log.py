@@ -0,0 +1,575 @@
+# battle_log.py
+
+# A record of everything that happens in a battle, for replays and analysis.
+#
+#     python battle_log.py events battle.nbl [--from-turn 12]
+#     python battle_log.py state battle.nbl --turn 40
+#
+# The log is an append-only binary file. Every action is one small record, so writing
+# one during play costs a few bytes and no rewrite:
+#
+#     header   MAGIC, format version
+#     records  type (1 byte), payload length (varint), payload
+#
+# Numbers in payloads are LEB128 varints (signed ones zigzag-encoded), so the usual
+# record is 4-6 bytes. The first record (SETUP) describes the participants as JSON.
+# Maneuver names are written once as a STRING record and then referred to by number.
+#
+# Once CHECKPOINT_INTERVAL turns have passed since the last one, the writer embeds a
+# CHECKPOINT record with the full state of every participant, and notes its turn and
+# offset in a sidecar index file (path + ".idx"). The state at any turn is then the
+# nearest checkpoint before it plus the few records after it, instead of a replay from
+# turn one. Each checkpoint starts a new string table, so reading can begin at any
+# checkpoint. A missing or stale index is rebuilt by scanning the log, and a record cut
+# short by a crash is ignored.
+
+import argparse
+import bisect
+import json
+import logging
+import os
+import struct
+import sys
+from collections import namedtuple
+
+from doll_state import DollLayout, DollState
+from parts_catalog import LOCATIONS
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"NBLG"
+FORMAT_VERSION = 1
+LOG_SUFFIX = ".nbl"
+INDEX_SUFFIX = ".idx"
+HEADER = struct.Struct("<4sB") # magic, format version
+INDEX_ENTRY = struct.Struct("<IQ") # turn, offset of the checkpoint record
+# Turns between two checkpoints. Seeking replays at most this many turns.
+CHECKPOINT_INTERVAL = 10
+# Bytes read from the log at a time
+READ_CHUNK_SIZE = 64 * 1024
+
+# Record types
+SETUP = 0       # JSON: {"participants": [...]}
+STRING = 1      # string number, UTF-8 text
+TURN = 2        # turn number; a new turn begins
+COUNT = 3       # participant, change of its count (signed)
+MANEUVER = 4    # participant, maneuver string number, target + 1 (0 for none)
+DAMAGE = 5      # source + 1 (0 for none), target, location, amount, destroyed part mask
+DESTROY = 6     # participant, part mask
+REPAIR = 7      # participant, part mask
+FRAGMENT = 8    # participant, fragment index lost
+MADNESS = 9     # participant, fetter index, change of its madness points (signed)
+CHECKPOINT = 10 # turn, then per participant: count (signed), damage taken, intact, fragments, madness
+
+RECORD_NAMES = {SETUP: "setup", STRING: "string", TURN: "turn", COUNT: "count", MANEUVER: "maneuver",
+                DAMAGE: "damage", DESTROY: "destroy", REPAIR: "repair", FRAGMENT: "fragment",
+                MADNESS: "madness", CHECKPOINT: "checkpoint"}
+# Field names of the decoded records handed to readers
+_FIELDS = {
+    TURN: ("turn",),
+    COUNT: ("participant", "change"),
+    MANEUVER: ("participant", "maneuver", "target"),
+    DAMAGE: ("source", "target", "location", "amount", "destroyed"),
+    DESTROY: ("participant", "mask"),
+    REPAIR: ("participant", "mask"),
+    FRAGMENT: ("participant", "index"),
+    MADNESS: ("participant", "fetter", "change"),
+}
+
+# One action read back from a log. data maps the field names of _FIELDS to values;
+# participants are indexes into the setup, locations are names and maneuvers are strings.
+BattleEvent = namedtuple("BattleEvent", "kind turn offset data")
+
+
+class BattleLogError(Exception):
+    """Raised when a file is not a readable battle log."""
+
+
+# --- Varints ---
+
+def _put_varint(out, value):
+    while value > 0x7F:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _put_signed(out, value):
+    _put_varint(out, value << 1 if value >= 0 else (-value << 1) - 1)
+
+
+def _read_varints(payload):
+    """
+    Returns all varints of a payload as a list.
+    """
+    values = []
+    value = shift = 0
+    for byte in payload:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append(value)
+            value = shift = 0
+    return values
+
+
+def _signed(value):
+    return (value >> 1) ^ -(value & 1)
+
+
+def _read_varint_at(data, position):
+    """
+    Returns (value, position after it), or (None, position) if data ends inside it.
+    """
+    value = shift = 0
+    while position < len(data):
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, position
+        shift += 7
+    return None, position
+
+
+# --- Battle state ---
+
+class BattleState:
+    """
+    The state of every participant at one point of a battle.
+
+    Participants with parts (Dolls) keep a DollState; the others (monsters without a part
+    list) only count the damage they have taken.
+    """
+    def __init__(self, participants):
+        """
+        Args:
+            participants (list): Dictionaries with "name", "count" (starting count) and,
+                for Dolls, "parts" (part dictionaries), "fragments" and "fetters".
+        """
+        self.participants = participants
+        self.turn = 0
+        self.counts = [participant.get("count", 0) for participant in participants]
+        self.damage_taken = [0] * len(participants)
+        self.dolls = []
+        for participant in participants:
+            if participant.get("parts"):
+                self.dolls.append(DollState(DollLayout(participant["parts"]),
+                                            participant.get("fragments", 0), participant.get("fetters", 0)))
+            else:
+                self.dolls.append(None)
+
+    def apply(self, kind, values):
+        """
+        Applies one decoded record (see _FIELDS for the order of values).
+        """
+        if kind == TURN:
+            self.turn = values[0]
+        elif kind == COUNT:
+            self.counts[values[0]] += values[1]
+        elif kind == DAMAGE:
+            source, target, location, amount, destroyed = values
+            doll = self.dolls[target]
+            if doll is None:
+                self.damage_taken[target] += amount
+            else:
+                doll.destroy(destroyed)
+        elif kind == DESTROY:
+            self.dolls[values[0]].destroy(values[1])
+        elif kind == REPAIR:
+            self.dolls[values[0]].repair(values[1])
+        elif kind == FRAGMENT:
+            self.dolls[values[0]].lose_fragment(values[1])
+        elif kind == MADNESS:
+            self.dolls[values[0]].add_madness(values[1], values[2])
+
+    def snapshot(self):
+        """
+        Returns the state as one tuple of integers per participant, after the turn number.
+        """
+        rows = []
+        for count, damage, doll in zip(self.counts, self.damage_taken, self.dolls):
+            rows.append((count, damage) + (doll.snapshot() if doll is not None else (0, 0, 0)))
+        return self.turn, rows
+
+    def restore(self, snapshot):
+        """
+        Puts the state back to a value returned by snapshot().
+        """
+        self.turn, rows = snapshot
+        for index, (count, damage, intact, fragments, madness) in enumerate(rows):
+            self.counts[index] = count
+            self.damage_taken[index] = damage
+            if self.dolls[index] is not None:
+                self.dolls[index].restore((intact, fragments, madness))
+
+
+# --- Writing ---
+
+class BattleLogWriter:
+    """
+    Appends the actions of a battle to a new log and keeps a BattleState of it up to date.
+    """
+    def __init__(self, path, participants, checkpoint_interval=CHECKPOINT_INTERVAL):
+        """
+        Creates the log and writes its SETUP record.
+
+        Args:
+            path (str): The log file. An existing file is replaced.
+            participants (list): See BattleState. Must be JSON-compatible.
+            checkpoint_interval (int): Turns between two embedded checkpoints.
+        """
+        self.path = path
+        self.checkpoint_interval = checkpoint_interval
+        self.state = BattleState(participants)
+        self._strings = {} # text -> number, since the last checkpoint
+        self._checkpoint_turn = 0 # Turn of the last checkpoint
+        self._file = open(path, 'wb')
+        self._index = open(path + INDEX_SUFFIX, 'wb')
+        self._file.write(HEADER.pack(MAGIC, FORMAT_VERSION))
+        self._append(SETUP, json.dumps({"participants": participants}, ensure_ascii=False,
+                                       separators=(",", ":")).encode("utf-8"))
+        self._checkpoint()
+
+    def close(self):
+        self._file.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def flush(self):
+        """
+        Hands everything written so far to the operating system. Called at every turn.
+        """
+        self._file.flush()
+        self._index.flush()
+
+    def _append(self, kind, payload):
+        header = bytearray((kind,))
+        _put_varint(header, len(payload))
+        self._file.write(header)
+        self._file.write(payload)
+
+    def _write(self, kind, *values):
+        payload = bytearray()
+        for value in values:
+            _put_varint(payload, value)
+        self._append(kind, payload)
+
+    def _string(self, text):
+        number = self._strings.get(text)
+        if number is None:
+            number = self._strings[text] = len(self._strings)
+            payload = bytearray()
+            _put_varint(payload, number)
+            self._append(STRING, payload + text.encode("utf-8"))
+        return number
+
+    def _checkpoint(self):
+        turn, rows = self.state.snapshot()
+        payload = bytearray()
+        _put_varint(payload, turn)
+        for count, damage, intact, fragments, madness in rows:
+            _put_signed(payload, count)
+            for value in (damage, intact, fragments, madness):
+                _put_varint(payload, value)
+        self._index.write(INDEX_ENTRY.pack(turn, self._file.tell()))
+        self._append(CHECKPOINT, payload)
+        self._strings.clear()
+        self._checkpoint_turn = turn
+
+    # --- Actions ---
+
+    def start_turn(self, turn):
+        """
+        Begins a turn. Turns must increase; a checkpoint is embedded once
+        checkpoint_interval turns have passed since the last one.
+        """
+        if turn <= self.state.turn:
+            raise ValueError(f"Turn {turn} does not follow turn {self.state.turn}")
+        self.state.turn = turn
+        # The checkpoint goes first, so reading from it includes the TURN record
+        # Counted from the last checkpoint, as turns may be skipped
+        if turn - self._checkpoint_turn >= self.checkpoint_interval:
+            self._checkpoint()
+        self._write(TURN, turn)
+        self.flush()
+
+    def change_count(self, participant, change):
+        self.state.counts[participant] += change
+        payload = bytearray()
+        _put_varint(payload, participant)
+        _put_signed(payload, change)
+        self._append(COUNT, payload)
+
+    def use_maneuver(self, participant, maneuver, target=None):
+        """
+        Records that a participant used a maneuver (by id or name), optionally on a target.
+        """
+        self._write(MANEUVER, participant, self._string(maneuver), 0 if target is None else target + 1)
+
+    def damage(self, target, location, amount, source=None, preferred_mask=None):
+        """
+        Deals damage to a participant. A Doll loses parts at the location, see DollState.damage.
+
+        Returns:
+            tuple: (destroyed_mask, overflow); (0, 0) for participants without parts.
+        """
+        doll = self.state.dolls[target]
+        if doll is None:
+            self.state.damage_taken[target] += amount
+            destroyed, overflow = 0, 0
+        else:
+            destroyed, overflow = doll.damage(location, amount, preferred_mask)
+        self._write(DAMAGE, 0 if source is None else source + 1, target, LOCATIONS.index(location), amount, destroyed)
+        return destroyed, overflow
+
+    def destroy_parts(self, participant, mask):
+        self.state.dolls[participant].destroy(mask)
+        self._write(DESTROY, participant, mask)
+
+    def repair_parts(self, participant, mask):
+        self.state.dolls[participant].repair(mask)
+        self._write(REPAIR, participant, mask)
+
+    def lose_fragment(self, participant, index):
+        self.state.dolls[participant].lose_fragment(index)
+        self._write(FRAGMENT, participant, index)
+
+    def add_madness(self, participant, fetter_index, amount=1):
+        """
+        Returns:
+            bool: True if this change made the fetter go mad.
+        """
+        went_mad = self.state.dolls[participant].add_madness(fetter_index, amount)
+        payload = bytearray()
+        _put_varint(payload, participant)
+        _put_varint(payload, fetter_index)
+        _put_signed(payload, amount)
+        self._append(MADNESS, payload)
+        return went_mad
+
+
+# --- Reading ---
+
+class BattleLogReader:
+    """
+    Reads a battle log, also one that is still being written.
+    """
+    def __init__(self, path):
+        """
+        Opens a log, reads its SETUP record and loads (or rebuilds) the checkpoint index.
+
+        Raises:
+            BattleLogError: If the file is not a battle log.
+        """
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            header = self._file.read(HEADER.size)
+            if len(header) < HEADER.size:
+                raise BattleLogError(f"{path} is not a battle log")
+            magic, version = HEADER.unpack(header)
+            if magic != MAGIC:
+                raise BattleLogError(f"{path} is not a battle log")
+            if version != FORMAT_VERSION:
+                raise BattleLogError(f"{path} has unsupported format version {version}")
+            first = next(self._records(HEADER.size), None)
+            if first is None or first[0] != SETUP:
+                raise BattleLogError(f"{path} has no setup record")
+            self.participants = json.loads(bytes(first[2]))["participants"]
+        except ValueError as e:
+            self._file.close()
+            raise BattleLogError(f"{path} is damaged: {e}")
+        except BaseException:
+            self._file.close()
+            raise
+        self._load_index()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _records(self, offset):
+        """
+        Yields (type, offset, payload) of the complete records from offset on, reading
+        the file in chunks.
+        """
+        self._file.seek(offset)
+        data = b""
+        position = 0
+        while True:
+            if position + 1 < len(data):
+                kind = data[position]
+                length, start = _read_varint_at(data, position + 1)
+                if length is not None and start + length <= len(data):
+                    yield kind, offset + position, memoryview(data)[start:start + length]
+                    position = start + length
+                    continue
+            chunk = self._file.read(max(READ_CHUNK_SIZE, len(data) - position + 1))
+            if not chunk:
+                return # Only a record cut short (or nothing) is left
+            offset += position
+            data = data[position:] + chunk
+            position = 0
+
+    def _load_index(self):
+        self._index_turns = []
+        self._index_offsets = []
+        size = os.path.getsize(self.path)
+        try:
+            with open(self.path + INDEX_SUFFIX, 'rb') as f:
+                entries = f.read()
+            entries = entries[:len(entries) - len(entries) % INDEX_ENTRY.size]
+            for turn, offset in INDEX_ENTRY.iter_unpack(entries):
+                if offset >= size:
+                    break
+                self._index_turns.append(turn)
+                self._index_offsets.append(offset)
+        except OSError:
+            pass
+        if self._index_offsets:
+            self._file.seek(self._index_offsets[-1])
+            if self._file.read(1) == bytes((CHECKPOINT,)):
+                return
+        logger.info("Rebuilding the checkpoint index of %s", self.path)
+        self._index_turns, self._index_offsets = [], []
+        for kind, offset, payload in self._records(HEADER.size):
+            if kind == CHECKPOINT:
+                self._index_turns.append(_read_varint_at(payload, 0)[0])
+                self._index_offsets.append(offset)
+
+    def checkpoint_turns(self):
+        """
+        Returns the turns that have a checkpoint.
+        """
+        return list(self._index_turns)
+
+    def _checkpoint_before(self, turn):
+        """
+        Returns the offset of the last checkpoint at or before turn.
+        """
+        position = bisect.bisect_right(self._index_turns, turn) - 1
+        return self._index_offsets[position] if position >= 0 else HEADER.size
+
+    def _decode(self, kind, payload, strings):
+        """
+        Returns the values of a record, with signed fields and targets decoded.
+        """
+        values = _read_varints(payload)
+        if kind == COUNT:
+            values[1] = _signed(values[1])
+        elif kind == MADNESS:
+            values[2] = _signed(values[2])
+        elif kind == MANEUVER:
+            values[1] = strings[values[1]]
+            values[2] -= 1
+        elif kind == DAMAGE:
+            values[0] -= 1
+        return values
+
+    def _replay(self, state, offset):
+        """
+        Yields (type, offset, values) of the action and checkpoint records from offset on,
+        applying each to state; a checkpoint restores it and has values None. String
+        records fill the string table.
+        """
+        strings = {}
+        for kind, record_offset, payload in self._records(offset):
+            if kind == CHECKPOINT:
+                values = _read_varints(payload)
+                rows = []
+                for first in range(1, len(values), 5):
+                    row = values[first:first + 5]
+                    row[0] = _signed(row[0])
+                    rows.append(tuple(row))
+                state.restore((values[0], rows))
+                strings = {}
+                yield kind, record_offset, None
+            elif kind == STRING:
+                number, start = _read_varint_at(payload, 0)
+                strings[number] = bytes(payload[start:]).decode("utf-8")
+            elif kind in _FIELDS:
+                values = self._decode(kind, payload, strings)
+                state.apply(kind, values)
+                yield kind, record_offset, values
+
+    def state_at(self, turn):
+        """
+        Returns the BattleState at the start of a turn, or at the end of the log if the
+        battle did not get that far. Only the records after the nearest checkpoint are read.
+        """
+        state = BattleState(self.participants)
+        if state.turn >= turn:
+            return state
+        for kind, offset, values in self._replay(state, self._checkpoint_before(turn)):
+            if state.turn >= turn:
+                break
+        return state
+
+    def events(self, from_turn=None):
+        """
+        Yields the actions of the battle as BattleEvents, one at a time, so logs of any
+        length can be analysed in constant memory.
+
+        Args:
+            from_turn (int, optional): First turn to yield; earlier turns are skipped by
+                starting at the nearest checkpoint.
+        """
+        state = BattleState(self.participants)
+        offset = self._checkpoint_before(from_turn) if from_turn is not None else HEADER.size
+        for kind, record_offset, values in self._replay(state, offset):
+            if kind == CHECKPOINT or from_turn is not None and state.turn < from_turn:
+                continue
+            if kind == DAMAGE:
+                values[2] = LOCATIONS[values[2]]
+            yield BattleEvent(RECORD_NAMES[kind], state.turn, record_offset, dict(zip(_FIELDS[kind], values)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Read a battle log.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    events = subparsers.add_parser("events", help="print the actions of a battle, one JSON object per line")
+    events.add_argument("log")
+    events.add_argument("--from-turn", type=int, help="first turn to print")
+    state = subparsers.add_parser("state", help="print the state of every participant at the start of a turn")
+    state.add_argument("log")
+    state.add_argument("--turn", type=int, required=True)
+    args = parser.parse_args(argv)
+
+    try:
+        with BattleLogReader(args.log) as reader:
+            if args.command == "events":
+                for event in reader.events(args.from_turn):
+                    print(json.dumps({"turn": event.turn, "kind": event.kind, **event.data}, ensure_ascii=False))
+                return 0
+            battle = reader.state_at(args.turn)
+            print(f"Turn {battle.turn}")
+            for index, participant in enumerate(battle.participants):
+                line = f"  {participant.get('name', index)}: count {battle.counts[index]}"
+                doll = battle.dolls[index]
+                if doll is None:
+                    line += f", damage taken {battle.damage_taken[index]}"
+                else:
+                    line += (f", parts {doll.intact_count()}/{len(doll.layout.parts)}, "
+                             f"fragments {doll.fragment_count()}, mad fetters {doll.mad_fetter_count()}")
+                print(line)
+            return 0
+    except (OSError, BattleLogError) as e:
+        logger.error("%s", e)
+        return 1
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    sys.exit(main())
@@ -0,0 +1,419 @@
+# benchmarks.py
+
+# Benchmarks of the data, rendering and startup hot paths.
+#
+# Usage:
+#     python benchmarks.py [--output results.json] [--baseline baseline.json] [--threshold 0.2]
+#                          [--save-baseline baseline.json] [--repeat 10] [--filter display]
+#
+# The storage benchmarks compare the bestiary formats (plain JSON, the bestiary folder and
+# compressed archives): size on disk, time to load everything and latency of reading one
+# random monster. They do not need a display, and neither does the doll builder benchmark.
+#
+# The Tk benchmarks need a display. When none is set on Linux, a private Xvfb server is
+# started for the run (and stopped afterwards), so the suite also runs on headless boxes.
+# Results are written as JSON. With --baseline, every benchmark whose median is more than
+# --threshold (a fraction, 0.2 = 20%) slower than in the baseline is reported as a
+# regression and the exit code is 1.
+#
+# The benchmarks run in a temporary working directory, because the screens read and
+# write zombie_data.json in the current directory.
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tkinter as tk
+
+from bestiary_archive import BestiaryArchive, CODECS, write_archive
+from bestiary_generator import BestiaryGenerator
+from bestiary_store import BestiaryStore
+from doll_builder import DollBuilder
+from parts_catalog import get_catalog
+from database_menu import ENEMY_DATA_FILE
+from gui import Application
+from settings_manager import SettingsService
+
+DEFAULT_OUTPUT_FILE = "benchmark_results.json"
+DEFAULT_REPEAT = 10
+DEFAULT_THRESHOLD = 0.2
+# Maneuver counts of the stat blocks used by the size-dependent benchmarks
+STAT_BLOCK_SIZES = [2, 50, 500]
+XVFB_SCREEN = "1920x1080x24"
+# Seconds to wait for Xvfb to accept connections
+XVFB_START_TIMEOUT = 10
+# Monsters in the bestiary used by the storage benchmarks
+STORAGE_MONSTER_COUNT = 2000
+# Loadouts asked for by the doll builder benchmark
+DOLL_BUILD_COUNT = 50
+
+
+def make_stat_block(maneuver_count, seed=0):
+    """
+    Returns a schema-valid monster with exactly maneuver_count maneuvers.
+    """
+    generator = BestiaryGenerator(seed)
+    monster = generator.monster(0)
+    pool = generator.maneuver_pool
+    maneuvers = []
+    for index in range(maneuver_count):
+        maneuver = dict(pool[index % len(pool)])
+        maneuver["id"] = f"{maneuver['id']}_{index}"
+        maneuvers.append(maneuver)
+    monster["maneuvers"] = maneuvers
+    return monster
+
+
+# --- Display ---
+
+def start_xvfb():
+    """
+    Starts Xvfb on a free display number and points DISPLAY at it.
+
+    Returns:
+        subprocess.Popen: The server process, or None if no display was needed or Xvfb is missing.
+    """
+    if os.environ.get("DISPLAY") or not sys.platform.startswith("linux"):
+        return None
+    if shutil.which("Xvfb") is None:
+        return None
+    for display_number in range(99, 199):
+        if os.path.exists(f"/tmp/.X{display_number}-lock"):
+            continue
+        process = subprocess.Popen(["Xvfb", f":{display_number}", "-screen", "0", XVFB_SCREEN, "-nolisten", "tcp"],
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.time() + XVFB_START_TIMEOUT
+        while time.time() < deadline and process.poll() is None:
+            if os.path.exists(f"/tmp/.X11-unix/X{display_number}"):
+                os.environ["DISPLAY"] = f":{display_number}"
+                return process
+            time.sleep(0.05)
+        process.terminate()
+    return None
+
+
+def stop_xvfb(process):
+    if process is not None:
+        process.terminate()
+        process.wait()
+        os.environ.pop("DISPLAY", None)
+
+
+# --- Timing ---
+
+def time_calls(function, repeat, setup=None):
+    """
+    Calls function repeat times (after one untimed warm-up call) and returns timing statistics.
+
+    Args:
+        function (callable): The code to time.
+        repeat (int): Number of timed calls.
+        setup (callable, optional): Called untimed before every call.
+
+    Returns:
+        dict: min, median and mean in milliseconds, and the number of timed calls.
+    """
+    timings = []
+    for call in range(repeat + 1):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        elapsed = (time.perf_counter() - start) * 1000
+        if call > 0: # The first call warms caches and is not counted
+            timings.append(elapsed)
+    return {
+        "min_ms": min(timings),
+        "median_ms": statistics.median(timings),
+        "mean_ms": statistics.fmean(timings),
+        "repeat": repeat,
+    }
+
+
+class BenchmarkContext:
+    """
+    A Tk root and an Application shared by the benchmarks of one run.
+    """
+    def __init__(self, work_dir):
+        self.work_dir = work_dir
+        self.root = tk.Tk()
+        self.app = Application(self.root, settings_service=self.new_settings_service())
+        self.root.update()
+
+    def new_settings_service(self):
+        # Settings of the run live in the temporary directory, never in the user's config
+        return SettingsService(path=os.path.join(self.work_dir, "config.json"))
+
+    @property
+    def database_menu(self):
+        return self.app.frames["DatabaseMenu"]
+
+    @property
+    def viewer(self):
+        return self.database_menu.enemy_viewer_frame
+
+    def write_enemy_file(self, record):
+        with open(ENEMY_DATA_FILE, 'w') as f:
+            json.dump(record, f, indent=4)
+
+    def close(self):
+        self.root.destroy()
+
+
+# --- Benchmarks ---
+# Each takes the context and the repeat count, and returns {benchmark name: statistics}.
+
+def bench_load_zombie_data(context, repeat):
+    results = {}
+    for size in STAT_BLOCK_SIZES:
+        context.write_enemy_file(make_stat_block(size))
+        results[f"load_or_create_zombie_data[{size}]"] = time_calls(context.database_menu._load_or_create_zombie_data, repeat)
+    return results
+
+
+def bench_display_enemy_data(context, repeat):
+    results = {}
+    viewer = context.viewer
+    for size in STAT_BLOCK_SIZES:
+        record = make_stat_block(size)
+        def display():
+            viewer.display_enemy_data(record)
+            context.root.update_idletasks()
+        results[f"display_enemy_data[{size}]"] = time_calls(display, repeat)
+    return results
+
+
+def bench_collect_and_save_data(context, repeat):
+    results = {}
+    viewer = context.viewer
+    for size in STAT_BLOCK_SIZES:
+        viewer.display_enemy_data(make_stat_block(size))
+        edits = iter(range(repeat + 1))
+        def edit_name():
+            # Every save needs a change, or it returns early
+            viewer.editable_fields["name"].set(f"Benchmark {size} {next(edits)}")
+        results[f"collect_and_save_data[{size}]"] = time_calls(viewer._collect_and_save_data, repeat, setup=edit_name)
+    return results
+
+
+def bench_application_startup(context, repeat):
+    def start_application():
+        root = tk.Tk()
+        Application(root, settings_service=context.new_settings_service())
+        root.update_idletasks()
+        root.destroy()
+    return {"application_startup": time_calls(start_application, repeat)}
+
+
+def bench_show_frame(context, repeat):
+    app = context.app
+    pages = list(app.frames)
+    def cycle_frames():
+        for page_name in pages:
+            app.show_frame(page_name)
+            context.root.update_idletasks()
+    stats = time_calls(cycle_frames, repeat)
+    # Report the cost of a single switch
+    for key in ("min_ms", "median_ms", "mean_ms"):
+        stats[key] /= len(pages)
+    return {"show_frame": stats}
+
+
+def _size_on_disk(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+
+def bench_bestiary_storage(work_dir, repeat):
+    records = list(BestiaryGenerator().monsters(STORAGE_MONSTER_COUNT))
+    # One random monster per timed call, the same sequence for every format
+    random_ids = [record["id"] for record in random.Random(0).choices(records, k=repeat + 1)]
+
+    json_path = os.path.join(work_dir, "bestiary.json")
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(records, f, indent=4)
+
+    def load_json():
+        with open(json_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def get_json(monster_id):
+        # A single JSON file has to be parsed whole to find one monster
+        return next(record for record in load_json() if record["id"] == monster_id)
+
+    store = BestiaryStore(os.path.join(work_dir, "bestiary"))
+    store.put_many(records)
+    # format name -> (path, load everything, read one monster)
+    formats = {
+        "json": (json_path, load_json, get_json),
+        "store": (store.directory, lambda: list(store.iter_records()), store.get),
+    }
+    readers = []
+    for codec in sorted(CODECS):
+        path = os.path.join(work_dir, f"bestiary_{codec}.nba")
+        write_archive(path, records, codec=codec)
+        reader = BestiaryArchive(path)
+        readers.append(reader)
+        def load_archive(path=path):
+            with BestiaryArchive(path) as archive:
+                return list(archive.iter_stored_order())
+        formats[f"archive_{codec}"] = (path, load_archive, reader.get)
+
+    results = {}
+    try:
+        for name, (path, load, get) in formats.items():
+            results[f"bestiary_load[{name}]"] = dict(time_calls(load, repeat), bytes=_size_on_disk(path))
+            ids = iter(random_ids)
+            results[f"bestiary_random_get[{name}]"] = time_calls(lambda: get(next(ids)), repeat)
+    finally:
+        for reader in readers:
+            reader.close()
+    return results
+
+
+def bench_doll_builder(work_dir, repeat):
+    catalog = get_catalog()
+    results = {}
+    for objective in ("rapid", "parts"):
+        # A new builder per call, so its solve cache does not make later calls free
+        results[f"doll_best_builds[{objective}]"] = time_calls(
+            lambda: DollBuilder(catalog).best_builds(objective, top_k=DOLL_BUILD_COUNT), repeat)
+    return results
+
+
+# Benchmarks that do not need Tk; they take the working directory instead of the context
+STORAGE_BENCHMARKS = {
+    "bestiary_storage": bench_bestiary_storage,
+    "doll_builder": bench_doll_builder,
+}
+
+BENCHMARKS = {
+    "load_zombie_data": bench_load_zombie_data,
+    "display_enemy_data": bench_display_enemy_data,
+    "collect_and_save_data": bench_collect_and_save_data,
+    "application_startup": bench_application_startup,
+    "show_frame": bench_show_frame,
+}
+
+
+def _selected(benchmarks, name_filter):
+    return {name: benchmark for name, benchmark in benchmarks.items() if not name_filter or name_filter in name}
+
+
+def run_benchmarks(repeat=DEFAULT_REPEAT, name_filter=None):
+    """
+    Runs the benchmarks in a temporary working directory.
+
+    Args:
+        repeat (int): Timed calls per benchmark.
+        name_filter (str, optional): Only run benchmarks whose name contains this text.
+            The Tk benchmarks are skipped if none of them match.
+
+    Returns:
+        dict: {"meta": {...}, "results": {benchmark name: statistics}}.
+    """
+    original_dir = os.getcwd()
+    work_dir = tempfile.mkdtemp(prefix="nechronica-bench-")
+    os.chdir(work_dir)
+    context = None
+    results = {}
+    try:
+        for name, benchmark in _selected(STORAGE_BENCHMARKS, name_filter).items():
+            print(f"Running {name}...", file=sys.stderr)
+            results.update(benchmark(work_dir, repeat))
+        tk_benchmarks = _selected(BENCHMARKS, name_filter)
+        if tk_benchmarks:
+            context = BenchmarkContext(work_dir)
+        for name, benchmark in tk_benchmarks.items():
+            print(f"Running {name}...", file=sys.stderr)
+            results.update(benchmark(context, repeat))
+    finally:
+        if context is not None:
+            context.close()
+        os.chdir(original_dir)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "tk": tk.TkVersion,
+            "display": os.environ.get("DISPLAY"),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare_to_baseline(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compares median timings with a baseline.
+
+    Returns:
+        list: (name, baseline ms, current ms, relative change, regressed) for every benchmark
+              present in both, sorted by name. A positive change means slower, and regressed
+              is True when it exceeds threshold.
+    """
+    comparisons = []
+    for name in sorted(results["results"]):
+        if name not in baseline.get("results", {}):
+            continue
+        before = baseline["results"][name]["median_ms"]
+        after = results["results"][name]["median_ms"]
+        change = (after - before) / before if before > 0 else 0.0
+        comparisons.append((name, before, after, change, change > threshold))
+    return comparisons
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Nechronica hot paths.")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT_FILE, help=f"results file (default: {DEFAULT_OUTPUT_FILE})")
+    parser.add_argument("--baseline", help="compare with the results in this file")
+    parser.add_argument("--save-baseline", metavar="FILE", help="also write the results to this baseline file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"slowdown that counts as a regression, as a fraction (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help=f"timed calls per benchmark (default: {DEFAULT_REPEAT})")
+    parser.add_argument("--filter", help="only run benchmarks whose name contains this text")
+    args = parser.parse_args(argv)
+
+    xvfb = start_xvfb() if _selected(BENCHMARKS, args.filter) else None
+    if _selected(BENCHMARKS, args.filter) and not os.environ.get("DISPLAY") and sys.platform.startswith("linux"):
+        print("ERROR: No display available and Xvfb could not be started. Install Xvfb or set DISPLAY.", file=sys.stderr)
+        return 2
+    try:
+        results = run_benchmarks(args.repeat, args.filter)
+    finally:
+        stop_xvfb(xvfb)
+
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, 'w') as f:
+            json.dump(results, f, indent=4)
+
+    print(f"{'benchmark':<36} {'median ms':>10} {'min ms':>10}")
+    for name, stats in sorted(results["results"].items()):
+        print(f"{name:<36} {stats['median_ms']:>10.2f} {stats['min_ms']:>10.2f}"
+              + (f" {stats['bytes']:>12,} bytes" if "bytes" in stats else ""))
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = 0
+    print(f"\nCompared with {args.baseline} (threshold {args.threshold:.0%}):")
+    for name, before, after, change, regressed in compare_to_baseline(results, baseline, args.threshold):
+        regressions += regressed
+        print(f"{name:<36} {before:>10.2f} -> {after:>10.2f} ({change:+.1%}) {'REGRESSION' if regressed else ''}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
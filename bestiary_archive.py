@@ -0,0 +1,294 @@
+# bestiary_archive.py
+
+# A compressed, read-only bestiary format: one file instead of a folder, for backups,
+# sharing and large generated bestiaries.
+#
+#     python bestiary_archive.py pack bestiary.nba [--store bestiary] [--codec zlib|lzma]
+#     python bestiary_archive.py unpack bestiary.nba [--store bestiary]
+#     python bestiary_archive.py get bestiary.nba mon_zombie_horde
+#
+# Pretty-printed JSON mostly stores whitespace and the same keys over and over, which
+# compresses very well. Compressing the whole file would mean inflating all of it to
+# read one monster, so records are compressed in blocks instead:
+#
+#     header   MAGIC, format version, codec
+#     blocks   each one a compressed run of JSON Lines records, about BLOCK_SIZE bytes
+#              before compression
+#     index    compressed JSON: the file offset and length of every block, and the
+#              block and line of every monster id
+#     footer   offset and length of the index, MAGIC
+#
+# Reading one monster decompresses a single block; the last few blocks read are cached.
+# Iterating decompresses one block at a time, so memory use does not depend on the size
+# of the archive.
+
+import argparse
+import json
+import logging
+import lzma
+import os
+import struct
+import sys
+import tempfile
+import zlib
+from collections import OrderedDict
+
+from bestiary_store import BestiaryStore, DEFAULT_BESTIARY_DIR
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"NBAR"
+FORMAT_VERSION = 1
+ARCHIVE_SUFFIX = ".nba"
+# Uncompressed bytes per block. Larger blocks compress better; smaller ones make
+# reading a single monster cheaper.
+DEFAULT_BLOCK_SIZE = 64 * 1024
+# Decompressed blocks kept in memory by a reader
+BLOCK_CACHE_SIZE = 8
+# Monsters per store batch when unpacking
+UNPACK_BATCH_SIZE = 1000
+
+HEADER = struct.Struct("<4sBB") # magic, format version, codec id
+FOOTER = struct.Struct("<QQ4s") # index offset, index length, magic
+
+# Raw LZMA2 frames: the .xz container would add its own header to every block
+_LZMA_FILTERS = [{"id": lzma.FILTER_LZMA2, "preset": 6}]
+
+# Codec name -> (id stored in the header, compress, decompress)
+CODECS = {
+    "zlib": (1, lambda data: zlib.compress(data, 9), zlib.decompress),
+    "lzma": (2, lambda data: lzma.compress(data, format=lzma.FORMAT_RAW, filters=_LZMA_FILTERS),
+             lambda data: lzma.decompress(data, format=lzma.FORMAT_RAW, filters=_LZMA_FILTERS)),
+}
+DEFAULT_CODEC = "zlib"
+_CODECS_BY_ID = {codec_id: name for name, (codec_id, compress, decompress) in CODECS.items()}
+
+
+class ArchiveError(Exception):
+    """Raised when a file is not a readable bestiary archive."""
+
+
+def write_archive(path, records, codec=DEFAULT_CODEC, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Writes records to a new archive. The file is written next to path and swapped into
+    place when complete. A later record replaces an earlier one with the same id.
+
+    Args:
+        path (str): The archive file.
+        records (iterable): The monsters, read one at a time.
+        codec (str): One of CODECS.
+        block_size (int): Uncompressed bytes per block.
+
+    Returns:
+        int: The number of records written.
+    """
+    codec_id, compress, decompress = CODECS[codec]
+    blocks = [] # [offset, length] of every block
+    locations = {} # id -> [block, line]
+    written = 0
+
+    directory = os.path.dirname(path) or "."
+    fd, temp_path = tempfile.mkstemp(prefix=".tmp-", suffix=ARCHIVE_SUFFIX, dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, codec_id))
+            lines = []
+            pending_size = 0
+
+            def flush():
+                data = compress(b"".join(lines))
+                blocks.append([f.tell(), len(data)])
+                f.write(data)
+
+            for record in records:
+                line = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+                locations[record["id"]] = [len(blocks), len(lines)]
+                lines.append(line)
+                pending_size += len(line)
+                written += 1
+                if pending_size >= block_size:
+                    flush()
+                    lines, pending_size = [], 0
+            if lines:
+                flush()
+
+            index = compress(json.dumps({"blocks": blocks, "ids": locations},
+                                        ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+            index_offset = f.tell()
+            f.write(index)
+            f.write(FOOTER.pack(index_offset, len(index), MAGIC))
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return written
+
+
+class BestiaryArchive:
+    """
+    Reads monsters from an archive. It offers the reading methods of BestiaryStore, so
+    it can stand in for one wherever records are only read (e.g. export_jsonl).
+    """
+    def __init__(self, path):
+        """
+        Opens an archive and reads its index.
+
+        Raises:
+            ArchiveError: If the file is not a bestiary archive or uses an unknown codec.
+        """
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            magic, version, codec_id = HEADER.unpack(self._file.read(HEADER.size))
+            if magic != MAGIC:
+                raise ArchiveError(f"{path} is not a bestiary archive")
+            if version != FORMAT_VERSION:
+                raise ArchiveError(f"{path} has unsupported format version {version}")
+            if codec_id not in _CODECS_BY_ID:
+                raise ArchiveError(f"{path} uses an unknown codec ({codec_id})")
+            self.codec = _CODECS_BY_ID[codec_id]
+            self._decompress = CODECS[self.codec][2]
+
+            self._file.seek(-FOOTER.size, os.SEEK_END)
+            index_offset, index_length, magic = FOOTER.unpack(self._file.read(FOOTER.size))
+            if magic != MAGIC:
+                raise ArchiveError(f"{path} is truncated")
+            self._file.seek(index_offset)
+            index = json.loads(self._decompress(self._file.read(index_length)))
+        except (struct.error, zlib.error, lzma.LZMAError, ValueError) as e:
+            self._file.close()
+            raise ArchiveError(f"{path} is damaged: {e}")
+        except BaseException:
+            self._file.close()
+            raise
+        self._blocks = index["blocks"]
+        self._locations = index["ids"]
+        self._cache = OrderedDict() # block number -> list of JSON lines
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _block_lines(self, block):
+        """
+        Returns the (cached) JSON lines of a block.
+        """
+        lines = self._cache.get(block)
+        if lines is not None:
+            self._cache.move_to_end(block)
+            return lines
+        offset, length = self._blocks[block]
+        self._file.seek(offset)
+        lines = self._decompress(self._file.read(length)).splitlines()
+        self._cache[block] = lines
+        if len(self._cache) > BLOCK_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return lines
+
+    def ids(self):
+        """
+        Returns the ids of all monsters in the archive, sorted.
+        """
+        return sorted(self._locations)
+
+    def __len__(self):
+        return len(self._locations)
+
+    def __contains__(self, monster_id):
+        return monster_id in self._locations
+
+    def get(self, monster_id):
+        """
+        Returns a monster, or None if there is none with that id. Only its block is decompressed.
+        """
+        location = self._locations.get(monster_id)
+        if location is None:
+            return None
+        block, line = location
+        return json.loads(self._block_lines(block)[line])
+
+    def iter_records(self, start=0):
+        """
+        Yields the monsters one at a time, in id order.
+
+        Args:
+            start (int): Number of monsters (in id order) to skip.
+        """
+        for monster_id in self.ids()[start:]:
+            yield self.get(monster_id)
+
+    def iter_stored_order(self):
+        """
+        Yields the monsters in the order they were written, one block at a time, without
+        caching the blocks. This is the fastest way to read a whole archive.
+        """
+        # Records replaced by a later one with the same id are skipped
+        live = {tuple(location) for location in self._locations.values()}
+        for block, (offset, length) in enumerate(self._blocks):
+            self._file.seek(offset)
+            lines = self._decompress(self._file.read(length)).splitlines()
+            # One parse per block is much faster than one per line
+            records = json.loads(b"[" + b",".join(lines) + b"]")
+            for line_number, record in enumerate(records):
+                if (block, line_number) in live:
+                    yield record
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pack the bestiary into a compressed archive, or unpack one.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    pack = subparsers.add_parser("pack", help="write the monsters of a bestiary folder to an archive")
+    pack.add_argument("archive")
+    pack.add_argument("--store", default=DEFAULT_BESTIARY_DIR, help=f"bestiary folder (default: {DEFAULT_BESTIARY_DIR})")
+    pack.add_argument("--codec", choices=sorted(CODECS), default=DEFAULT_CODEC, help=f"compression (default: {DEFAULT_CODEC})")
+    pack.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE,
+                      help=f"uncompressed bytes per block (default: {DEFAULT_BLOCK_SIZE})")
+    unpack = subparsers.add_parser("unpack", help="write the monsters of an archive to a bestiary folder")
+    unpack.add_argument("archive")
+    unpack.add_argument("--store", default=DEFAULT_BESTIARY_DIR, help=f"bestiary folder (default: {DEFAULT_BESTIARY_DIR})")
+    get = subparsers.add_parser("get", help="print one monster of an archive")
+    get.add_argument("archive")
+    get.add_argument("id")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "pack":
+            store = BestiaryStore(args.store)
+            written = write_archive(args.archive, store.iter_records(), args.codec, args.block_size)
+            logger.info("Packed %d monsters into %s (%d bytes)", written, args.archive, os.path.getsize(args.archive))
+            return 0
+
+        with BestiaryArchive(args.archive) as archive:
+            if args.command == "get":
+                record = archive.get(args.id)
+                if record is None:
+                    logger.error("No monster %s in %s", args.id, args.archive)
+                    return 1
+                json.dump(record, sys.stdout, indent=4, ensure_ascii=False)
+                sys.stdout.write("\n")
+                return 0
+            store = BestiaryStore(args.store)
+            written = 0
+            batch = []
+            for record in archive.iter_stored_order():
+                batch.append(record)
+                if len(batch) >= UNPACK_BATCH_SIZE:
+                    written += store.put_many(batch)
+                    batch = []
+            written += store.put_many(batch)
+            logger.info("Unpacked %d monsters into %s", written, args.store)
+            return 0
+    except ArchiveError as e:
+        logger.error("%s", e)
+        return 1
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    sys.exit(main())
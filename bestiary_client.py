@@ -0,0 +1,381 @@
+# bestiary_client.py
+
+# The app's side of a shared bestiary (see bestiary_server.py).
+#
+# BestiaryClient keeps a small pool of connections, so screens and background jobs can
+# send requests at the same time without opening a connection each, and caches the
+# monsters it has read. A separate subscribed connection receives the server's pushes:
+# changed monsters are dropped from the cache and the listeners are told.
+#
+# RemoteBestiaryStore wraps a client in the interface of BestiaryStore, so the screens,
+# the viewer and the bulk importer work on a shared bestiary unchanged.
+
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+from bestiary_protocol import (
+    OP_DELETE, OP_GET, OP_GET_MANY, OP_IDS, OP_PUT, OP_QUERY, OP_STATE_GET, OP_STATE_SET, OP_SUBSCRIBE,
+    PUSH, REQUEST, RESPONSE, STATUS_OK, ProtocolError, RemoteError, connect, encode_frame, receive_frame,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 4
+# Monsters kept in the client cache
+DEFAULT_CACHE_SIZE = 2000
+# Seconds to wait for a response
+REQUEST_TIMEOUT = 10.0
+# Seconds between two attempts to restore the subscription after the server went away
+RESUBSCRIBE_DELAY = 2.0
+
+
+class _Batch:
+    """
+    Collects operations to send as a single request. See BestiaryClient.batch().
+    """
+    def __init__(self, client):
+        self.client = client
+        self.operations = []
+        self.results = None # Raw [status, value] per operation, once sent
+
+    def add(self, op, argument=None):
+        """
+        Queues an operation and returns its index in the results.
+        """
+        self.operations.append([op, argument])
+        return len(self.operations) - 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None and self.operations:
+            self.results = self.client._send(self.operations)
+
+    def result(self, index):
+        """
+        Returns the value of an operation of the sent batch.
+
+        Raises:
+            RemoteError: If the server reported an error for it.
+        """
+        status, value = self.results[index]
+        if status != STATUS_OK:
+            raise RemoteError(value)
+        return value
+
+
+class BestiaryClient:
+    """
+    A pooled, caching connection to a bestiary server.
+    """
+    def __init__(self, address, pool_size=DEFAULT_POOL_SIZE, cache_size=DEFAULT_CACHE_SIZE):
+        """
+        Initializes the client. Connections are opened when first needed.
+
+        Args:
+            address (tuple): The server's (host, port).
+            pool_size (int): Most idle connections kept open.
+            cache_size (int): Most monsters kept in the cache.
+        """
+        self.address = tuple(address)
+        self.pool_size = pool_size
+        self.cache_size = cache_size
+        self._pool = queue.LifoQueue() # Idle connected sockets
+        self._request_ids = iter(range(1, 2 ** 32))
+        self._cache = OrderedDict() # id -> record, least recently used first
+        self._cache_lock = threading.Lock()
+        # Bumped by every push, so a response that raced with one is not cached
+        self._cache_epoch = 0
+        self._listeners = []
+        self._subscriber = None # Thread reading pushes
+        self._subscription_socket = None
+        self._closed = False
+
+    # --- Connections ---
+
+    def _acquire(self):
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            return connect(self.address, REQUEST_TIMEOUT)
+
+    def _release(self, sock):
+        if self._closed or self._pool.qsize() >= self.pool_size:
+            sock.close()
+        else:
+            self._pool.put(sock)
+
+    def _send(self, operations, retry=True):
+        """
+        Sends a batch of operations on a pooled connection and returns the raw results.
+        A connection that turns out to be broken (e.g. the server restarted) is replaced
+        once, for batches that only read.
+
+        Raises:
+            OSError: If the server cannot be reached.
+            ProtocolError: If the response is not valid.
+        """
+        request_id = next(self._request_ids)
+        sock = self._acquire()
+        try:
+            sock.sendall(encode_frame(REQUEST, request_id, operations))
+            frame_type, response_id, results = receive_frame(sock)
+        except (OSError, ProtocolError):
+            sock.close()
+            read_only = all(op in (OP_GET, OP_GET_MANY, OP_IDS, OP_QUERY, OP_STATE_GET) for op, argument in operations)
+            if retry and read_only:
+                return self._send(operations, retry=False)
+            raise
+        if frame_type != RESPONSE or response_id != request_id or len(results) != len(operations):
+            sock.close()
+            raise ProtocolError(f"Unexpected response to request {request_id}")
+        self._release(sock)
+        return results
+
+    def close(self):
+        """
+        Closes every connection and stops the subscription.
+        """
+        self._closed = True
+        if self._subscription_socket is not None:
+            self._subscription_socket.close()
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def batch(self):
+        """
+        Returns a context manager that sends the operations added inside it as one request:
+
+            with client.batch() as batch:
+                first = batch.add(OP_GET, "mon_a")
+                second = batch.add(OP_QUERY, {"name": "zombie"})
+            record, matches = batch.result(first), batch.result(second)
+        """
+        return _Batch(self)
+
+    def _call(self, op, argument=None):
+        with self.batch() as batch:
+            index = batch.add(op, argument)
+        return batch.result(index)
+
+    # --- Cache ---
+
+    def _cache_store(self, records, epoch):
+        with self._cache_lock:
+            if epoch != self._cache_epoch:
+                return # A push arrived meanwhile; these records may already be stale
+            for monster_id, record in records.items():
+                self._cache[monster_id] = record
+                self._cache.move_to_end(monster_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _cache_drop(self, monster_ids=None):
+        """
+        Drops monsters (all of them if monster_ids is None) from the cache.
+        """
+        with self._cache_lock:
+            self._cache_epoch += 1
+            if monster_ids is None:
+                self._cache.clear()
+            for monster_id in monster_ids or ():
+                self._cache.pop(monster_id, None)
+
+    # --- Bestiary ---
+
+    def get(self, monster_id):
+        """
+        Returns a monster, or None if the server has none with that id.
+        """
+        with self._cache_lock:
+            record = self._cache.get(monster_id)
+            if record is not None:
+                self._cache.move_to_end(monster_id)
+                return record
+            epoch = self._cache_epoch
+        record = self._call(OP_GET, monster_id)
+        if record is not None:
+            self._cache_store({monster_id: record}, epoch)
+        return record
+
+    def get_many(self, monster_ids):
+        """
+        Returns {id: record} of the given monsters that exist, asking the server only for
+        the ones that are not cached, in one request.
+        """
+        found = {}
+        with self._cache_lock:
+            for monster_id in monster_ids:
+                record = self._cache.get(monster_id)
+                if record is not None:
+                    found[monster_id] = record
+            epoch = self._cache_epoch
+        missing = [monster_id for monster_id in monster_ids if monster_id not in found]
+        if missing:
+            fetched = self._call(OP_GET_MANY, missing)
+            self._cache_store(fetched, epoch)
+            found.update(fetched)
+        return found
+
+    def ids(self):
+        return self._call(OP_IDS)
+
+    def query(self, **filters):
+        """
+        Returns [id, name] of the matching monsters; see BestiaryServer.query for the filters.
+        """
+        return self._call(OP_QUERY, filters)
+
+    def put(self, record):
+        """
+        Writes a monster on the server.
+
+        Raises:
+            RemoteError: If the server refused it (e.g. it is not schema-valid).
+        """
+        self._call(OP_PUT, record)
+        self._cache_store({record["id"]: record}, self._cache_epoch)
+
+    def put_many(self, records):
+        """
+        Writes several monsters in one request.
+
+        Returns:
+            int: The number of monsters written.
+
+        Raises:
+            RemoteError: For the first monster the server refused. The others are written.
+        """
+        records = list(records)
+        if not records:
+            return 0
+        try:
+            with self.batch() as batch:
+                for record in records:
+                    batch.add(OP_PUT, record)
+            for index in range(len(records)):
+                batch.result(index)
+        finally:
+            # As in delete(): get() reads these again instead of returning what was cached
+            # before, whether or not the server accepted them
+            self._cache_drop([record["id"] for record in records])
+        return len(records)
+
+    def delete(self, monster_id):
+        self._call(OP_DELETE, monster_id)
+        self._cache_drop([monster_id])
+
+    # --- Shared state ---
+
+    def get_state(self, key):
+        return self._call(OP_STATE_GET, key)
+
+    def set_state(self, key, value):
+        """
+        Sets a shared state value for every client; None removes the key.
+        """
+        self._call(OP_STATE_SET, [key, value])
+
+    # --- Pushes ---
+
+    def subscribe(self, listener):
+        """
+        Registers listener(changed_ids, removed_ids, state) for changes made by other
+        clients or on the server. It is called on the subscription thread, so GUI code
+        should hand it over to the Tk thread. After the connection was lost and restored,
+        it is called with (None, None, None): anything may have changed meanwhile.
+        """
+        self._listeners.append(listener)
+        if self._subscriber is None:
+            self._subscriber = threading.Thread(target=self._receive_pushes, name="bestiary-subscription", daemon=True)
+            self._subscriber.start()
+
+    def unsubscribe(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, changed, removed, state):
+        for listener in list(self._listeners):
+            try:
+                listener(changed, removed, state)
+            except Exception:
+                logger.exception("Bestiary listener failed")
+
+    def _receive_pushes(self):
+        resubscribing = False
+        while not self._closed:
+            try:
+                sock = connect(self.address, REQUEST_TIMEOUT)
+                sock.sendall(encode_frame(REQUEST, 0, [[OP_SUBSCRIBE, None]]))
+                receive_frame(sock)
+                sock.settimeout(None) # Pushes may be far apart
+                self._subscription_socket = sock
+                if resubscribing:
+                    logger.info("Bestiary subscription restored")
+                    self._cache_drop()
+                    self._notify(None, None, None)
+                while True:
+                    frame_type, request_id, payload = receive_frame(sock)
+                    if frame_type != PUSH:
+                        continue
+                    changed = payload.get("changed", [])
+                    removed = payload.get("removed", [])
+                    if changed or removed:
+                        self._cache_drop(changed + removed)
+                    self._notify(changed, removed, payload.get("state"))
+            except (OSError, ProtocolError) as e:
+                if self._closed:
+                    return
+                if not resubscribing:
+                    logger.warning("Lost the bestiary subscription (%s); retrying every %.0f s", e, RESUBSCRIBE_DELAY)
+                resubscribing = True
+                time.sleep(RESUBSCRIBE_DELAY)
+
+
+class RemoteBestiaryStore:
+    """
+    A BestiaryStore look-alike backed by a bestiary server.
+    """
+    def __init__(self, client):
+        self.client = client
+        self.directory = "{}:{}".format(*client.address)
+
+    def path_for(self, monster_id):
+        return f"bestiary://{self.directory}/{monster_id}"
+
+    def ids(self):
+        return self.client.ids()
+
+    def __len__(self):
+        return len(self.ids())
+
+    def __contains__(self, monster_id):
+        return self.get(monster_id) is not None
+
+    def get(self, monster_id):
+        return self.client.get(monster_id)
+
+    def iter_records(self, start=0, batch_size=500):
+        ids = self.ids()[start:]
+        for first in range(0, len(ids), batch_size):
+            chunk = ids[first:first + batch_size]
+            records = self.client.get_many(chunk)
+            for monster_id in chunk:
+                if monster_id in records:
+                    yield records[monster_id]
+
+    def put(self, record):
+        self.client.put(record)
+
+    def put_many(self, records):
+        return self.client.put_many(records)
+
+    def delete(self, monster_id):
+        self.client.delete(monster_id)
@@ -0,0 +1,292 @@
+# bestiary_generator.py
+
+# Generates synthetic bestiaries for scale and load testing, e.g.
+#
+#     python bestiary_generator.py --count 100000 --seed 7 --format jsonl --output bestiary.jsonl
+#
+# Every monster is valid against JSON/bestiary_schema.json. The output is deterministic:
+# monster i only depends on the seed and on i, so the first 1,000 monsters of a 1M run
+# are the same 1,000 monsters a 1k run produces, and any slice can be regenerated alone.
+#
+# The distributions aim to look like a real bestiary rather than uniform noise:
+#   - maneuver counts are mostly 2-5 with a long tail,
+#   - maneuvers are drawn from a shared pool with a Zipf-like skew, so a few ids
+#     (the "unarmed_attack"s) appear on many monsters while the rest are rare,
+#     and some maneuvers are unique to their monster,
+#   - text lengths follow a log-normal distribution.
+#
+# Monsters are produced one at a time and written as they are produced, so memory use
+# does not grow with the count.
+
+import argparse
+import bisect
+import copy
+import itertools
+import json
+import logging
+import math
+import random
+import sys
+
+from bestiary_archive import write_archive
+from bestiary_jsonl import write_jsonl
+from bestiary_store import BestiaryStore
+from schema_validator import validate_monster
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEED = 0
+# Size of the shared maneuver pool. It does not depend on the count, so that
+# smaller runs stay prefixes of larger ones.
+DEFAULT_MANEUVER_POOL_SIZE = 500
+# Skew of the shared maneuver pool: the maneuver of rank r is picked with weight 1 / r ** s
+MANEUVER_ZIPF_EXPONENT = 1.1
+# Chance that a maneuver slot holds a maneuver of the monster's own instead of a shared one
+UNIQUE_MANEUVER_CHANCE = 0.3
+MAX_MANEUVERS = 40
+
+TIMING_WEIGHTS = {"Action": 50, "Rapid": 15, "Auto": 20, "Check": 8, "Damage": 7}
+DAMAGE_EFFECTS = ["bash", "cut", "pierce", "fire", "explosion", "poison", "grapple", "acid"]
+DAMAGE_FORMULAS = ["chain_attack", "per_spawn_group", "half_action_points"]
+
+# (median words, sigma of the log) per text field
+TEXT_LENGTHS = {
+    "maneuver": (12, 0.5),
+    "description": (30, 0.6),
+    "tactics": (25, 0.6),
+    "roleplay": (25, 0.6),
+}
+
+NAME_ADJECTIVES = [
+    "Rotting", "Shambling", "Hollow", "Stitched", "Weeping", "Bloated", "Gaunt", "Rusted",
+    "Sewn", "Howling", "Blind", "Fused", "Pale", "Starving", "Broken", "Crawling",
+]
+NAME_NOUNS = [
+    "Zombie", "Ghoul", "Horror", "Legion", "Sheep", "Savant", "Hound", "Abomination",
+    "Corpse", "Husk", "Marionette", "Swarm", "Wretch", "Revenant", "Thrall", "Carcass",
+]
+MANEUVER_VERBS = [
+    "rend", "bite", "claw", "slam", "grapple", "spit", "howl", "lunge", "crush", "drag",
+    "tear", "burst", "shamble", "lurch", "gnaw", "scream",
+]
+MANEUVER_NOUNS = [
+    "attack", "strike", "frenzy", "hunger", "charge", "grip", "wave", "volley", "rush", "lash",
+]
+WORDS = [
+    "the", "dead", "doll", "dolls", "necromancer", "flesh", "bone", "rot", "horde", "area",
+    "target", "attack", "damage", "parts", "madness", "memory", "fragment", "hunger", "shadow",
+    "silence", "ruins", "city", "moan", "decay", "sinew", "wire", "stitch", "blood", "hollow",
+    "eyes", "teeth", "reach", "crawl", "swarm", "tear", "break", "drag", "whisper", "cold",
+    "grave", "count", "round", "turn", "enemy", "ally", "spawn", "group", "slow", "fast",
+    "mindless", "once", "human", "forgotten", "sleep", "wake", "always", "never", "again",
+]
+
+
+def _log_normal_words(rng, field):
+    median, sigma = TEXT_LENGTHS[field]
+    return max(1, int(rng.lognormvariate(math.log(median), sigma)))
+
+
+def _text(rng, word_count):
+    """
+    Returns word_count random words as sentences of 6 to 14 words.
+    """
+    sentences = []
+    while word_count > 0:
+        length = min(word_count, rng.randint(6, 14))
+        words = [rng.choice(WORDS) for _ in range(length)]
+        words[0] = words[0].capitalize()
+        sentences.append(" ".join(words) + ".")
+        word_count -= length
+    return " ".join(sentences)
+
+
+def _maneuver(rng, maneuver_id):
+    """
+    Returns a random, schema-valid maneuver with the given id.
+    """
+    timing = rng.choices(list(TIMING_WEIGHTS), weights=list(TIMING_WEIGHTS.values()))[0]
+    maneuver = {
+        "id": maneuver_id,
+        "timing": timing,
+        "cost": 0 if timing == "Auto" else rng.choices([0, 1, 2, 3, 4], weights=[10, 30, 35, 18, 7])[0],
+        "range": rng.choices([0, 1, 2, 3], weights=[60, 25, 10, 5])[0],
+        "description": _text(rng, _log_normal_words(rng, "maneuver")),
+    }
+    if timing in ("Action", "Rapid") and rng.random() < 0.8:
+        damage = {
+            "base_damage": rng.choices([0, 1, 2, 3, 4], weights=[10, 40, 30, 15, 5])[0],
+            "effect": rng.choice(DAMAGE_EFFECTS),
+        }
+        if rng.random() < 0.15:
+            damage["formula"] = rng.choice(DAMAGE_FORMULAS)
+        maneuver["damage"] = damage
+    return maneuver
+
+
+class BestiaryGenerator:
+    """
+    Produces synthetic monsters, deterministically from a seed.
+    """
+    def __init__(self, seed=DEFAULT_SEED, maneuver_pool_size=DEFAULT_MANEUVER_POOL_SIZE):
+        """
+        Initializes the generator and builds the shared maneuver pool.
+
+        Args:
+            seed (int): Seed of the whole bestiary.
+            maneuver_pool_size (int): Number of maneuvers monsters can share.
+        """
+        self.seed = seed
+        pool_rng = random.Random(f"{seed}:maneuvers")
+        self.maneuver_pool = []
+        used_ids = set()
+        for rank in range(maneuver_pool_size):
+            base_id = f"{pool_rng.choice(MANEUVER_VERBS)}_{pool_rng.choice(MANEUVER_NOUNS)}"
+            maneuver_id = base_id if base_id not in used_ids else f"{base_id}_{rank}"
+            used_ids.add(maneuver_id)
+            self.maneuver_pool.append(_maneuver(pool_rng, maneuver_id))
+
+        # Cumulative Zipf weights, searched with bisect to pick a pool maneuver
+        self.pool_cumulative_weights = []
+        total = 0.0
+        for rank in range(1, maneuver_pool_size + 1):
+            total += 1 / rank ** MANEUVER_ZIPF_EXPONENT
+            self.pool_cumulative_weights.append(total)
+
+    def monster(self, index):
+        """
+        Returns monster number index. The result only depends on the seed and index.
+        """
+        rng = random.Random(f"{self.seed}:monster:{index}")
+        monster_id = f"mon_synthetic_{index:07d}"
+
+        base_threat = min(10, 1 + int(rng.expovariate(0.5)))
+        per_spawn_group = rng.randint(3, 10) if base_threat == 1 else rng.choices([1, 2, 3], weights=[70, 20, 10])[0]
+
+        # Log-normal count: mostly 2-5, occasionally many more
+        maneuver_count = min(MAX_MANEUVERS, max(1, round(rng.lognormvariate(math.log(3.5), 0.5))))
+        maneuvers = []
+        seen_ids = set()
+        for slot in range(maneuver_count):
+            if self.maneuver_pool and rng.random() >= UNIQUE_MANEUVER_CHANCE:
+                pick = rng.random() * self.pool_cumulative_weights[-1]
+                shared = self.maneuver_pool[bisect.bisect_left(self.pool_cumulative_weights, pick)]
+                if shared["id"] in seen_ids:
+                    continue
+                seen_ids.add(shared["id"])
+                maneuvers.append(copy.deepcopy(shared)) # Each monster gets its own copy
+            else:
+                maneuvers.append(_maneuver(rng, f"{monster_id}_maneuver_{slot}"))
+
+        return {
+            "id": monster_id,
+            "name": f"{rng.choice(NAME_ADJECTIVES)} {rng.choice(NAME_NOUNS)} {index}",
+            "portrait": f"monsters/synthetic_{index % 100:02d}.png",
+            "threatLevel": {"base": base_threat, "per_spawn_group": per_spawn_group},
+            "maximumActionPoints": rng.randint(6, 12),
+            "maneuvers": maneuvers,
+            "flavor": {field: _text(rng, _log_normal_words(rng, field))
+                       for field in ("description", "tactics", "roleplay")},
+        }
+
+    def monsters(self, count, start=0):
+        """
+        Yields count monsters, starting at monster number start.
+        """
+        for index in range(start, start + count):
+            yield self.monster(index)
+
+
+def write_json(monsters, f):
+    """
+    Writes monsters as one JSON array, one monster at a time.
+
+    Returns:
+        int: The number of monsters written.
+    """
+    written = 0
+    f.write("[")
+    for monster in monsters:
+        f.write(",\n" if written else "\n")
+        f.write(json.dumps(monster, ensure_ascii=False))
+        written += 1
+    f.write("\n]\n")
+    return written
+
+
+# Output formats, keyed by the name used on the command line. Each writer takes an
+# iterable of monsters and a text file and returns the number of monsters written.
+WRITERS = {
+    "json": write_json,
+    "jsonl": write_jsonl,
+}
+# Writes into a bestiary folder (see bestiary_store.py) given as --output instead of a file
+STORE_FORMAT = "store"
+STORE_BATCH_SIZE = 1000
+# Writes a compressed archive (see bestiary_archive.py); needs an --output file
+ARCHIVE_FORMAT = "archive"
+
+
+def _validated(monsters):
+    """
+    Passes monsters through, raising ValueError on the first one that is not schema-valid.
+    """
+    for monster in monsters:
+        errors = validate_monster(monster)
+        if errors:
+            raise ValueError(f"Generated monster {monster['id']} is invalid: " + "; ".join(errors[:5]))
+        yield monster
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic Nechronica bestiary.")
+    parser.add_argument("--count", type=int, default=1000, help="number of monsters (default: 1000)")
+    parser.add_argument("--start", type=int, default=0, help="number of the first monster (default: 0)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help=f"seed (default: {DEFAULT_SEED})")
+    parser.add_argument("--maneuver-pool", type=int, default=DEFAULT_MANEUVER_POOL_SIZE,
+                        help=f"number of shared maneuvers (default: {DEFAULT_MANEUVER_POOL_SIZE})")
+    parser.add_argument("--format", choices=sorted(WRITERS) + [STORE_FORMAT, ARCHIVE_FORMAT], default="jsonl",
+                        help="output format (default: jsonl)")
+    parser.add_argument("--output", default="-",
+                        help="output file, - for stdout (not for --format archive), "
+                             "or the bestiary folder for --format store (default: -)")
+    parser.add_argument("--validate", action="store_true", help="check every monster against the bestiary schema")
+    args = parser.parse_args(argv)
+
+    generator = BestiaryGenerator(args.seed, args.maneuver_pool)
+    monsters = generator.monsters(args.count, args.start)
+    if args.validate:
+        monsters = _validated(monsters)
+
+    if args.format == STORE_FORMAT:
+        # Compact files: the store is a test fixture here, not something to read by hand
+        store = BestiaryStore(args.output, indent=None)
+        written = 0
+        # Batches keep the temporary files of put_many bounded on large runs
+        while True:
+            batch = list(itertools.islice(monsters, STORE_BATCH_SIZE))
+            if not batch:
+                break
+            written += store.put_many(batch)
+        logger.info("Wrote %d monsters", written)
+        return
+
+    if args.format == ARCHIVE_FORMAT:
+        if args.output == "-":
+            parser.error("--format archive needs an --output file")
+        written = write_archive(args.output, monsters)
+        logger.info("Wrote %d monsters", written)
+        return
+
+    writer = WRITERS[args.format]
+    if args.output == "-":
+        written = writer(monsters, sys.stdout)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            written = writer(monsters, f)
+    logger.info("Wrote %d monsters", written)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    main()
@@ -0,0 +1,240 @@
+# bestiary_jsonl.py
+
+# Streaming JSON Lines import and export of the bestiary, one monster per line:
+#
+#     python bestiary_jsonl.py export bestiary.jsonl [--store bestiary] [--resume]
+#     python bestiary_jsonl.py import bestiary.jsonl [--store bestiary] [--resume | --start-line N]
+#
+# Records are read, validated and written one at a time through generators, so memory
+# use does not depend on the size of the bestiary.
+#
+# Both directions can pick up where an interrupted run stopped:
+#   - an import saves its position (line number and byte offset) to a ".progress" file
+#     next to the input every IMPORT_CHECKPOINT_INTERVAL lines, and --resume seeks
+#     straight to it; --start-line starts at any line instead,
+#   - an export drops a trailing partial line and continues after the last complete one.
+
+import argparse
+import json
+import logging
+import os
+import sys
+
+from bestiary_store import BestiaryStore, DEFAULT_BESTIARY_DIR, atomic_write_json
+from schema_validator import validate_monster
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_SUFFIX = ".progress"
+# Lines between two saved import positions
+IMPORT_CHECKPOINT_INTERVAL = 1000
+# Invalid lines whose errors are kept in an ImportResult; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+
+class ImportResult:
+    """
+    Counts and errors of one import run.
+    """
+    def __init__(self, start_line):
+        self.start_line = start_line
+        self.next_line = start_line # First line not processed yet
+        self.imported = 0
+        self.invalid = 0
+        self.errors = [] # (line number, message), at most MAX_REPORTED_ERRORS
+
+    def add_error(self, line_number, message):
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line_number, message))
+
+
+def parse_line(line):
+    """
+    Parses and validates one JSON Lines record.
+
+    Returns:
+        tuple: (record, None) for a valid monster, (None, error message) otherwise.
+    """
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError as e:
+        return None, f"invalid JSON: {e}"
+    errors = validate_monster(record)
+    if errors:
+        return None, "; ".join(errors[:5])
+    return record, None
+
+
+def iter_jsonl(path, start_line=0, start_offset=None):
+    """
+    Yields (line number, byte offset after the line, record, error) for every
+    non-blank line of a JSON Lines file. Line numbers start at 0.
+
+    Args:
+        path (str): The file to read.
+        start_line (int): Lines before this one are skipped.
+        start_offset (int, optional): Byte offset of start_line, if known. The file is
+            then read from there directly instead of skipping lines one by one.
+    """
+    with open(path, 'rb') as f:
+        line_number = 0
+        offset = 0
+        if start_offset is not None:
+            f.seek(start_offset)
+            line_number, offset = start_line, start_offset
+        for raw_line in f:
+            offset += len(raw_line)
+            if line_number >= start_line and raw_line.strip():
+                record, error = parse_line(raw_line.decode('utf-8', errors='replace'))
+                yield line_number, offset, record, error
+            line_number += 1
+
+
+def _progress_path(path):
+    return path + PROGRESS_SUFFIX
+
+
+def load_progress(path):
+    """
+    Returns the saved (line, offset) of an interrupted import of path, or (0, None).
+    A position saved for a file that has since been replaced is ignored.
+    """
+    try:
+        with open(_progress_path(path), 'r') as f:
+            progress = json.load(f)
+    except (IOError, json.JSONDecodeError):
+        return 0, None
+    if progress.get("size") != os.path.getsize(path) or progress.get("mtime") != os.path.getmtime(path):
+        logger.warning("%s changed since the interrupted import; starting from the beginning.", path)
+        return 0, None
+    return progress["line"], progress["offset"]
+
+
+def _save_progress(path, line, offset):
+    atomic_write_json(_progress_path(path), {
+        "line": line,
+        "offset": offset,
+        "size": os.path.getsize(path),
+        "mtime": os.path.getmtime(path),
+    })
+
+
+def import_jsonl(path, store, start_line=0, resume=False, checkpoint_interval=IMPORT_CHECKPOINT_INTERVAL):
+    """
+    Imports monsters from a JSON Lines file into a store, validating each line.
+    Invalid lines are skipped and reported; valid monsters replace stored ones with the same id.
+
+    Args:
+        path (str): The JSON Lines file.
+        store (BestiaryStore): Where the monsters are written.
+        start_line (int): First line to import (0-based).
+        resume (bool): Continue from the position saved by an interrupted import instead.
+        checkpoint_interval (int): Lines between two saved positions.
+
+    Returns:
+        ImportResult: What was imported and what was rejected.
+    """
+    start_offset = None
+    if resume:
+        start_line, start_offset = load_progress(path)
+    result = ImportResult(start_line)
+
+    for line_number, offset, record, error in iter_jsonl(path, start_line, start_offset):
+        if error:
+            result.add_error(line_number, error)
+        else:
+            store.put(record)
+            result.imported += 1
+        result.next_line = line_number + 1
+        if result.next_line % checkpoint_interval == 0:
+            _save_progress(path, result.next_line, offset)
+
+    # Finished, so there is nothing left to resume
+    if os.path.exists(_progress_path(path)):
+        os.remove(_progress_path(path))
+    return result
+
+
+def _complete_lines(path):
+    """
+    Drops a trailing partial line left by an interrupted export and returns the
+    number of complete lines in the file.
+    """
+    complete_lines = 0
+    complete_size = 0
+    with open(path, 'rb') as f:
+        for raw_line in f:
+            if not raw_line.endswith(b"\n"):
+                break
+            complete_lines += 1
+            complete_size += len(raw_line)
+    if complete_size != os.path.getsize(path):
+        with open(path, 'r+b') as f:
+            f.truncate(complete_size)
+    return complete_lines
+
+
+def write_jsonl(records, f):
+    """
+    Writes records to a text file as JSON Lines.
+
+    Returns:
+        int: The number of records written.
+    """
+    written = 0
+    for record in records:
+        f.write(json.dumps(record, ensure_ascii=False))
+        f.write("\n")
+        written += 1
+    return written
+
+
+def export_jsonl(store, path, resume=False):
+    """
+    Exports every monster of a store to a JSON Lines file, in id order.
+
+    Args:
+        store (BestiaryStore): The monsters to export.
+        path (str): The file to write.
+        resume (bool): If the file exists, keep its complete lines and continue after them.
+            This assumes the store has not changed in between.
+
+    Returns:
+        int: The number of monsters written by this call.
+    """
+    skip = 0
+    if resume and os.path.exists(path):
+        skip = _complete_lines(path)
+    with open(path, 'a' if skip else 'w', encoding='utf-8', newline="\n") as f:
+        return write_jsonl(store.iter_records(start=skip), f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import or export the bestiary as JSON Lines.")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("path", help="the JSON Lines file")
+    parser.add_argument("--store", default=DEFAULT_BESTIARY_DIR, help=f"bestiary folder (default: {DEFAULT_BESTIARY_DIR})")
+    parser.add_argument("--resume", action="store_true", help="continue an interrupted import or export")
+    parser.add_argument("--start-line", type=int, default=0, help="first line to import, 0-based (default: 0)")
+    args = parser.parse_args(argv)
+
+    store = BestiaryStore(args.store)
+    if args.command == "export":
+        written = export_jsonl(store, args.path, resume=args.resume)
+        logger.info("Exported %d monsters to %s", written, args.path)
+        return 0
+
+    result = import_jsonl(args.path, store, start_line=args.start_line, resume=args.resume)
+    logger.info("Imported %d monsters from lines %d-%d of %s; %d invalid lines skipped",
+                result.imported, result.start_line, result.next_line - 1, args.path, result.invalid)
+    for line_number, message in result.errors:
+        logger.warning("Line %d: %s", line_number, message)
+    if result.invalid > len(result.errors):
+        logger.warning("... and %d more invalid lines", result.invalid - len(result.errors))
+    return 1 if result.invalid else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    sys.exit(main())
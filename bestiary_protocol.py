@@ -0,0 +1,175 @@
+# bestiary_protocol.py
+
+# The wire format shared by bestiary_server.py and bestiary_client.py.
+#
+# Every message is a frame: a fixed binary header followed by a payload.
+#
+#     header   type (1 byte), flags (1 byte), request id (4 bytes), payload length (4 bytes),
+#              big-endian
+#     payload  compact JSON (the records are JSON already), zlib-compressed when it is
+#              larger than COMPRESS_THRESHOLD bytes (FLAG_COMPRESSED)
+#
+# A REQUEST carries a batch of operations, [[op code, argument], ...], and its RESPONSE
+# carries one [status, value] per operation, in the same order, so one round trip can
+# serve a whole screen. PUSH frames (request id 0) are sent by the server to subscribed
+# clients when monsters or shared state change.
+
+import json
+import socket
+import struct
+import zlib
+
+PROTOCOL_VERSION = 1
+DEFAULT_PORT = 47321
+
+HEADER = struct.Struct("!BBII")
+# Frames larger than this are refused rather than read into memory
+MAX_PAYLOAD_SIZE = 64 * 1024 * 1024
+COMPRESS_THRESHOLD = 1024
+
+# Frame types
+HELLO = 1
+REQUEST = 2
+RESPONSE = 3
+PUSH = 4
+
+FLAG_COMPRESSED = 0x01
+
+# Operation codes of a REQUEST
+OP_GET = 1        # monster id -> record or None
+OP_GET_MANY = 2   # [ids] -> {id: record} of the ids that exist
+OP_IDS = 3        # None -> sorted [ids]
+OP_QUERY = 4      # {filters} -> [[id, name], ...]; see BestiaryServer.query
+OP_PUT = 5        # record -> None
+OP_DELETE = 6     # monster id -> None
+OP_SUBSCRIBE = 7  # None -> None; this connection now receives PUSH frames
+OP_STATE_GET = 8  # key -> value or None
+OP_STATE_SET = 9  # [key, value] -> None; a value of None removes the key
+
+# Status of one operation in a RESPONSE
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+
+class ProtocolError(Exception):
+    """Raised when the other side sends something that is not a valid frame."""
+
+
+class RemoteError(Exception):
+    """Raised by the client when the server reports that an operation failed."""
+
+
+def encode_frame(frame_type, request_id, payload):
+    """
+    Returns the bytes of a frame carrying payload (any JSON-compatible value).
+    """
+    data = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    flags = 0
+    if len(data) > COMPRESS_THRESHOLD:
+        data = zlib.compress(data, 6)
+        flags |= FLAG_COMPRESSED
+    return HEADER.pack(frame_type, flags, request_id, len(data)) + data
+
+
+def decode_header(header):
+    """
+    Returns (type, flags, request id, payload length) of a frame header.
+
+    Raises:
+        ProtocolError: If the payload would be too large.
+    """
+    frame_type, flags, request_id, length = HEADER.unpack(header)
+    if length > MAX_PAYLOAD_SIZE:
+        raise ProtocolError(f"Frame of {length} bytes is larger than the limit of {MAX_PAYLOAD_SIZE}")
+    return frame_type, flags, request_id, length
+
+
+def decode_payload(flags, data):
+    """
+    Returns the value carried by a frame payload.
+
+    Raises:
+        ProtocolError: If the payload cannot be decoded.
+    """
+    try:
+        if flags & FLAG_COMPRESSED:
+            data = zlib.decompress(data)
+        return json.loads(data)
+    except (zlib.error, ValueError) as e:
+        raise ProtocolError(f"Invalid payload: {e}")
+
+
+async def read_frame(reader):
+    """
+    Reads one frame from an asyncio StreamReader.
+
+    Returns:
+        tuple: (type, request id, payload value)
+
+    Raises:
+        asyncio.IncompleteReadError: If the connection is closed.
+        ProtocolError: If the frame is invalid.
+    """
+    frame_type, flags, request_id, length = decode_header(await reader.readexactly(HEADER.size))
+    return frame_type, request_id, decode_payload(flags, await reader.readexactly(length))
+
+
+def _receive_exactly(sock, size):
+    chunks = []
+    while size > 0:
+        chunk = sock.recv(min(size, 1024 * 1024))
+        if not chunk:
+            raise ConnectionError("Connection closed by the server")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def receive_frame(sock):
+    """
+    Reads one frame from a blocking socket.
+
+    Returns:
+        tuple: (type, request id, payload value)
+
+    Raises:
+        ConnectionError: If the connection is closed.
+        ProtocolError: If the frame is invalid.
+    """
+    frame_type, flags, request_id, length = decode_header(_receive_exactly(sock, HEADER.size))
+    return frame_type, request_id, decode_payload(flags, _receive_exactly(sock, length))
+
+
+def connect(address, timeout):
+    """
+    Opens a TCP connection with Nagle's algorithm off (requests are small and
+    latency-bound) and exchanges HELLO frames.
+
+    Returns:
+        socket.socket: The connected socket.
+
+    Raises:
+        OSError: If the server cannot be reached.
+        ProtocolError: If it does not speak this protocol version.
+    """
+    sock = socket.create_connection(address, timeout=timeout)
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.sendall(encode_frame(HELLO, 0, {"version": PROTOCOL_VERSION}))
+        frame_type, request_id, payload = receive_frame(sock)
+        if frame_type != HELLO or payload.get("version") != PROTOCOL_VERSION:
+            raise ProtocolError(f"Server speaks protocol {payload!r}, expected version {PROTOCOL_VERSION}")
+    except BaseException:
+        sock.close()
+        raise
+    return sock
+
+
+def parse_address(text, default_host="127.0.0.1"):
+    """
+    Parses "host:port", ":port", "port" or "host" into a (host, port) tuple.
+    """
+    host, _, port = text.rpartition(":") if ":" in text else ("", "", text)
+    if not port.isdigit():
+        host, port = text, str(DEFAULT_PORT)
+    return host or default_host, int(port)
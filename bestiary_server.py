@@ -0,0 +1,354 @@
+# bestiary_server.py
+
+# Shares one bestiary between the machines at a table:
+#
+#     python bestiary_server.py [--store bestiary] [--listen 127.0.0.1:47321]
+#
+# The GM runs the server (or starts the app with --serve); players start the app with
+# --connect HOST:PORT. The server keeps the monsters of its bestiary folder in memory,
+# answers batched lookups, queries and edits (see bestiary_protocol.py), and pushes the
+# ids of changed monsters to every subscribed client so their caches stay current. Edits
+# made directly in the folder on the server machine are picked up by a FileWatcher and
+# pushed the same way. The server also holds a small shared key/value state, e.g. for
+# the encounter in progress.
+#
+# It listens on localhost unless told otherwise. There is no authentication: only
+# listen on a network where everyone is at the table.
+
+import argparse
+import asyncio
+import logging
+import sys
+import threading
+
+from bestiary_protocol import (
+    DEFAULT_PORT, HELLO, OP_DELETE, OP_GET, OP_GET_MANY, OP_IDS, OP_PUT, OP_QUERY, OP_STATE_GET,
+    OP_STATE_SET, OP_SUBSCRIBE, PROTOCOL_VERSION, PUSH, REQUEST, RESPONSE, STATUS_ERROR, STATUS_OK,
+    ProtocolError, encode_frame, parse_address, read_frame,
+)
+from bestiary_store import BestiaryStore, DEFAULT_BESTIARY_DIR
+from file_watcher import FileWatcher
+from schema_validator import validate_monster
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+# Results a query returns when it does not set a limit
+DEFAULT_QUERY_LIMIT = 100
+
+
+def _servable(monster_id, record):
+    """
+    Returns True if a record read from the bestiary folder is schema-valid, as OP_PUT
+    requires of records sent by clients; logs why not otherwise.
+    """
+    errors = validate_monster(record)
+    if errors:
+        logger.warning("Not serving %s: %s", monster_id, "; ".join(errors[:5]))
+        return False
+    return True
+
+
+class BestiaryServer:
+    """
+    Serves a bestiary folder to bestiary clients over TCP.
+    """
+    def __init__(self, store, host=DEFAULT_HOST, port=DEFAULT_PORT, watch=True):
+        """
+        Initializes the server. Call start() (or serve_forever()) to begin serving.
+
+        Args:
+            store (BestiaryStore): The bestiary to serve.
+            host (str): Address to listen on.
+            port (int): Port to listen on; 0 picks a free one (see address once started).
+            watch (bool): Also push edits made directly in the bestiary folder.
+        """
+        self.store = store
+        self.host = host
+        self.port = port
+        self.watch = watch
+        self.records = {} # id -> record, the whole bestiary
+        self.state = {} # Shared key/value state
+        self.subscribers = set() # StreamWriters of subscribed connections
+        self._connections = {} # StreamWriter -> handler task of every open connection
+        self.address = None # (host, port) actually listened on
+        self.loop = None
+        self._server = None
+        self._watcher = None
+        self._thread = None
+
+    # --- Running ---
+
+    async def start(self):
+        """
+        Loads the bestiary and starts listening. Runs on the event loop that will serve.
+        """
+        self.loop = asyncio.get_running_loop()
+        self.records = await asyncio.to_thread(self._load_records)
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.address = self._server.sockets[0].getsockname()[:2]
+        if self.watch:
+            self._watcher = FileWatcher(self.store.directory, self._on_files_changed,
+                                        name_filter=lambda name: self.store.id_for_path(name) is not None)
+            self._watcher.start()
+        logger.info("Serving %d monsters from %s on %s:%d", len(self.records), self.store.directory, *self.address)
+
+    async def close(self):
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
+        if self._server is not None:
+            self._server.close()
+            # Closing the connections ends their handlers at their next read
+            for writer in list(self._connections):
+                writer.close()
+            await asyncio.gather(*self._connections.values(), return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    def start_in_thread(self):
+        """
+        Serves on an event loop of its own on a daemon thread, e.g. next to the GUI.
+
+        Returns:
+            tuple: The (host, port) listened on.
+
+        Raises:
+            OSError: If the address cannot be listened on.
+        """
+        started = threading.Event()
+        errors = []
+
+        def run():
+            loop = asyncio.new_event_loop()
+            try:
+                loop.run_until_complete(self.start())
+            except Exception as e:
+                errors.append(e)
+                started.set()
+                loop.close()
+                return
+            started.set()
+            try:
+                loop.run_forever()
+            finally:
+                loop.run_until_complete(self.close())
+                loop.close()
+
+        self._thread = threading.Thread(target=run, name="bestiary-server", daemon=True)
+        self._thread.start()
+        started.wait()
+        if errors:
+            self._thread = None
+            raise errors[0]
+        return self.address
+
+    def stop_thread(self):
+        """
+        Stops a server started with start_in_thread().
+        """
+        if self._thread is None:
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self._thread = None
+
+    def _load_records(self):
+        records = {}
+        for monster_id in self.store.ids():
+            try:
+                record = self.store.get(monster_id)
+            except ValueError as e:
+                logger.warning("Not serving %s: %s", monster_id, e)
+                continue
+            if record is not None and _servable(monster_id, record):
+                records[monster_id] = record
+        return records
+
+    # --- Connections ---
+
+    async def _handle_connection(self, reader, writer):
+        peer = writer.get_extra_info("peername")
+        self._connections[writer] = asyncio.current_task()
+        try:
+            frame_type, request_id, payload = await read_frame(reader)
+            if frame_type != HELLO or not isinstance(payload, dict) or payload.get("version") != PROTOCOL_VERSION:
+                logger.warning("Refusing %s: expected a HELLO for protocol version %d", peer, PROTOCOL_VERSION)
+                return
+            writer.write(encode_frame(HELLO, 0, {"version": PROTOCOL_VERSION, "monsters": len(self.records)}))
+            await writer.drain()
+
+            while True:
+                frame_type, request_id, payload = await read_frame(reader)
+                if frame_type != REQUEST or not isinstance(payload, list):
+                    raise ProtocolError(f"Expected a REQUEST frame, got type {frame_type}")
+                results = []
+                for operation in payload:
+                    results.append(await self._run_operation(operation, writer))
+                writer.write(encode_frame(RESPONSE, request_id, results))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass # The client went away
+        except ProtocolError as e:
+            logger.warning("Dropping %s: %s", peer, e)
+        finally:
+            self._connections.pop(writer, None)
+            self.subscribers.discard(writer)
+            writer.close()
+
+    async def _run_operation(self, operation, writer):
+        """
+        Runs one [op code, argument] operation and returns its [status, value].
+        """
+        try:
+            op, argument = operation
+            if op == OP_GET:
+                return [STATUS_OK, self.records.get(argument)]
+            if op == OP_GET_MANY:
+                return [STATUS_OK, {monster_id: self.records[monster_id] for monster_id in argument
+                                    if monster_id in self.records}]
+            if op == OP_IDS:
+                return [STATUS_OK, sorted(self.records)]
+            if op == OP_QUERY:
+                return [STATUS_OK, self.query(**(argument or {}))]
+            if op == OP_PUT:
+                errors = validate_monster(argument)
+                if errors:
+                    return [STATUS_ERROR, "; ".join(errors[:5])]
+                await asyncio.to_thread(self.store.put, argument)
+                self.records[argument["id"]] = argument
+                self._push({"changed": [argument["id"]], "removed": []})
+                return [STATUS_OK, None]
+            if op == OP_DELETE:
+                await asyncio.to_thread(self.store.delete, argument)
+                if self.records.pop(argument, None) is not None:
+                    self._push({"changed": [], "removed": [argument]})
+                return [STATUS_OK, None]
+            if op == OP_SUBSCRIBE:
+                self.subscribers.add(writer)
+                return [STATUS_OK, None]
+            if op == OP_STATE_GET:
+                return [STATUS_OK, self.state.get(argument)]
+            if op == OP_STATE_SET:
+                key, value = argument
+                if value is None:
+                    self.state.pop(key, None)
+                else:
+                    self.state[key] = value
+                self._push({"state": {key: value}})
+                return [STATUS_OK, None]
+            return [STATUS_ERROR, f"Unknown operation {op!r}"]
+        except (TypeError, ValueError, KeyError, OSError) as e:
+            return [STATUS_ERROR, f"{type(e).__name__}: {e}"]
+        except Exception as e:
+            # One failing operation must not drop the connection and the rest of its batch
+            logger.exception("Operation %r failed", operation)
+            return [STATUS_ERROR, f"{type(e).__name__}: {e}"]
+
+    def query(self, name=None, min_threat=None, max_threat=None, maneuver=None, limit=DEFAULT_QUERY_LIMIT):
+        """
+        Returns [id, name] of the monsters matching every given filter, in id order.
+
+        Args:
+            name (str, optional): Text contained in the name, case-insensitively.
+            min_threat (int, optional): Lowest base threat level.
+            max_threat (int, optional): Highest base threat level.
+            maneuver (str, optional): Id of a maneuver the monster has.
+            limit (int): Most results returned.
+
+        Raises:
+            TypeError: If a filter has the wrong type.
+        """
+        for filter_name, value, types in (("name", name, str), ("min_threat", min_threat, int),
+                                          ("max_threat", max_threat, int), ("maneuver", maneuver, str),
+                                          ("limit", limit, int)):
+            if value is not None and (not isinstance(value, types) or isinstance(value, bool)):
+                raise TypeError(f"{filter_name} must be {types.__name__}, not {type(value).__name__}")
+        name = name.casefold() if name else None
+        matches = []
+        for monster_id in sorted(self.records):
+            record = self.records[monster_id]
+            threat = record.get("threatLevel", {}).get("base", 0)
+            if name and name not in record.get("name", "").casefold():
+                continue
+            if min_threat is not None and threat < min_threat:
+                continue
+            if max_threat is not None and threat > max_threat:
+                continue
+            if maneuver and not any(m.get("id") == maneuver for m in record.get("maneuvers", [])):
+                continue
+            matches.append([monster_id, record.get("name", monster_id)])
+            if len(matches) >= limit:
+                break
+        return matches
+
+    def _push(self, payload):
+        """
+        Sends a PUSH frame to every subscribed connection. The client that made the change
+        is notified too: it sends edits on request connections, not on its subscription.
+        """
+        frame = encode_frame(PUSH, 0, payload)
+        for writer in list(self.subscribers):
+            if writer.is_closing():
+                continue
+            writer.write(frame)
+
+    def _on_files_changed(self, changed, removed):
+        """
+        Picks up edits made directly in the bestiary folder. Runs on the watcher thread.
+        """
+        records = {}
+        for name in changed:
+            monster_id = self.store.id_for_path(name)
+            try:
+                record = self.store.get(monster_id)
+            except ValueError as e:
+                logger.warning("Ignoring unreadable %s: %s", name, e)
+                continue
+            if record is not None and _servable(monster_id, record):
+                records[monster_id] = record
+        removed_ids = [self.store.id_for_path(name) for name in removed]
+        self.loop.call_soon_threadsafe(self._apply_file_changes, records, removed_ids)
+
+    def _apply_file_changes(self, records, removed_ids):
+        # Writes made by the server itself come back here too; only real changes are pushed
+        changed = [monster_id for monster_id, record in records.items() if self.records.get(monster_id) != record]
+        removed = [monster_id for monster_id in removed_ids if monster_id in self.records]
+        for monster_id in changed:
+            self.records[monster_id] = records[monster_id]
+        for monster_id in removed:
+            del self.records[monster_id]
+        if changed or removed:
+            self._push({"changed": changed, "removed": removed})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Share a bestiary with the other machines at the table.")
+    parser.add_argument("--store", default=DEFAULT_BESTIARY_DIR, help=f"bestiary folder (default: {DEFAULT_BESTIARY_DIR})")
+    parser.add_argument("--listen", default=f"{DEFAULT_HOST}:{DEFAULT_PORT}",
+                        help=f"address to listen on, e.g. 0.0.0.0:{DEFAULT_PORT} for the whole network "
+                             f"(default: {DEFAULT_HOST}:{DEFAULT_PORT})")
+    args = parser.parse_args(argv)
+
+    host, port = parse_address(args.listen, DEFAULT_HOST)
+    server = BestiaryServer(BestiaryStore(args.store), host, port)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        logger.error("Could not listen on %s:%d: %s", host, port, e)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    sys.exit(main())
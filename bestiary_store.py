@@ -0,0 +1,211 @@
+# bestiary_store.py
+
+# The bestiary on disk: a folder with one JSON file per monster, named after its id.
+#
+# One file per monster keeps a save of one monster from rewriting the others, lets
+# co-GMs edit or drop in single files, and lets records be streamed one at a time.
+# Every write goes to a temporary file that is then swapped into place, so an
+# interrupted write never leaves a truncated monster behind.
+#
+# Ids that differ only in case ("Zombie", "zombie") would share one file on Windows and
+# macOS, so writing one while the other is stored is refused on every system.
+
+import json
+import os
+import tempfile
+import threading
+from urllib.parse import quote, unquote
+
+DEFAULT_BESTIARY_DIR = "bestiary"
+RECORD_SUFFIX = ".json"
+
+
+def atomic_write_json(path, data, indent=None):
+    """
+    Writes data as JSON to a temporary file next to path and swaps it into place.
+    """
+    directory = os.path.dirname(path) or "."
+    fd, temp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=indent, ensure_ascii=False)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class IdCollisionError(ValueError):
+    """Raised when a monster id differs from a stored one only in case."""
+
+
+class BestiaryStore:
+    """
+    Reads and writes monster records in a bestiary folder.
+    """
+    def __init__(self, directory=DEFAULT_BESTIARY_DIR, indent=4):
+        """
+        Initializes the store, creating the folder if needed.
+
+        Args:
+            directory (str): The bestiary folder.
+            indent (int, optional): Indentation of the written files; None writes them compactly.
+        """
+        self.directory = directory
+        self.indent = indent
+        os.makedirs(directory, exist_ok=True)
+        self._case_lock = threading.Lock()
+        self._ids_by_case = None # casefolded id -> stored id, built on the first write
+        self._ids_by_case_mtime = None # Folder mtime the map was built or last updated at
+
+    def path_for(self, monster_id):
+        """
+        Returns the file path of a monster. Characters that are not safe in file
+        names are percent-encoded.
+        """
+        return os.path.join(self.directory, quote(monster_id, safe="") + RECORD_SUFFIX)
+
+    def id_for_path(self, path):
+        """
+        Returns the monster id of a record file path, or None if it is not a record file.
+        """
+        name = os.path.basename(path)
+        if name.startswith(".") or not name.endswith(RECORD_SUFFIX):
+            return None
+        return unquote(name[:-len(RECORD_SUFFIX)])
+
+    def ids(self):
+        """
+        Returns the ids of all stored monsters, sorted.
+        """
+        ids = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                monster_id = self.id_for_path(entry.name)
+                if monster_id is not None and entry.is_file():
+                    ids.append(monster_id)
+        ids.sort()
+        return ids
+
+    def __len__(self):
+        return len(self.ids())
+
+    def __contains__(self, monster_id):
+        return os.path.exists(self.path_for(monster_id))
+
+    def get(self, monster_id):
+        """
+        Returns a stored monster, or None if there is none with that id.
+
+        Raises:
+            json.JSONDecodeError: If the file is not valid JSON.
+        """
+        try:
+            with open(self.path_for(monster_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def iter_records(self, start=0):
+        """
+        Yields stored monsters one at a time, in id order.
+
+        Args:
+            start (int): Number of monsters (in id order) to skip.
+        """
+        for monster_id in self.ids()[start:]:
+            record = self.get(monster_id)
+            if record is not None: # It may have been deleted meanwhile
+                yield record
+
+    def _check_case(self, monster_ids):
+        """
+        Raises IdCollisionError if one of monster_ids differs only in case from a stored
+        id or from another of them. The stored ids are only listed again when the
+        folder changed since the last write.
+        """
+        mtime = os.stat(self.directory).st_mtime_ns
+        if self._ids_by_case is None or mtime != self._ids_by_case_mtime:
+            self._ids_by_case = {monster_id.casefold(): monster_id for monster_id in self.ids()}
+            self._ids_by_case_mtime = mtime
+        seen = {}
+        for monster_id in monster_ids:
+            folded = monster_id.casefold()
+            other = seen.get(folded) or self._ids_by_case.get(folded)
+            if other is not None and other != monster_id:
+                raise IdCollisionError(f"Monster id '{monster_id}' differs from '{other}' only in case")
+            seen[folded] = monster_id
+
+    def _note_case(self, added=(), removed=()):
+        """
+        Updates the map of _check_case() after a write of this store.
+        """
+        if self._ids_by_case is None:
+            return
+        for monster_id in removed:
+            if self._ids_by_case.get(monster_id.casefold()) == monster_id:
+                del self._ids_by_case[monster_id.casefold()]
+        for monster_id in added:
+            self._ids_by_case[monster_id.casefold()] = monster_id
+        self._ids_by_case_mtime = os.stat(self.directory).st_mtime_ns
+
+    def put(self, record):
+        """
+        Writes a monster, replacing any stored monster with the same id.
+
+        Raises:
+            IdCollisionError: If a stored monster's id differs from this one only in case.
+        """
+        with self._case_lock:
+            self._check_case([record["id"]])
+            atomic_write_json(self.path_for(record["id"]), record, self.indent)
+            self._note_case(added=[record["id"]])
+
+    def put_many(self, records):
+        """
+        Writes several monsters as one batch: every record is first written to a
+        temporary file, and only once all of them are on disk are they swapped into
+        place. If writing fails, the store is left as it was.
+
+        Returns:
+            int: The number of monsters written.
+
+        Raises:
+            IdCollisionError: If an id differs only in case from a stored one or from
+                another of the batch. Nothing is written then.
+        """
+        records = list(records)
+        with self._case_lock:
+            self._check_case([record["id"] for record in records])
+            written = self._put_batch(records)
+            self._note_case(added=[record["id"] for record in records])
+        return written
+
+    def _put_batch(self, records):
+        pending = [] # (temporary path, final path)
+        try:
+            for record in records:
+                fd, temp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=self.directory)
+                pending.append((temp_path, self.path_for(record["id"])))
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(record, f, indent=self.indent, ensure_ascii=False)
+        except BaseException:
+            for temp_path, path in pending:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+            raise
+        for temp_path, path in pending:
+            os.replace(temp_path, path)
+        return len(pending)
+
+    def delete(self, monster_id):
+        """
+        Removes a monster. Does nothing if it is not stored.
+        """
+        with self._case_lock:
+            try:
+                os.remove(self.path_for(monster_id))
+            except FileNotFoundError:
+                return
+            self._note_case(removed=[monster_id])
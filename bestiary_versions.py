@@ -0,0 +1,391 @@
+# bestiary_versions.py
+
+# Named snapshots of the bestiary, for balance changes that need history and rollback:
+#
+#     python bestiary_versions.py snapshot before-rebalance [--store bestiary]
+#     python bestiary_versions.py status
+#     python bestiary_versions.py diff before-rebalance [after-rebalance]
+#     python bestiary_versions.py checkout before-rebalance [--force]
+#     python bestiary_versions.py list
+#
+# Versions live in the .versions folder of the bestiary (dot files are not monsters):
+#
+#     objects/ab/cdef...   one zlib-compressed monster, named by the SHA-1 of its canonical
+#                          JSON, so a monster that did not change is stored only once
+#     snapshots/NAME.json  the snapshot it was taken on top of ("base") and the monsters
+#                          that differ from it: {id: object hash, or None if deleted}
+#     index.json           the snapshot the folder was last snapshotted or checked out at,
+#                          and the modification time, size and hash of every monster file
+#
+# A snapshot is a delta against its base, and the bases form a tree. Every
+# MAX_DELTA_DEPTH snapshots one holds the full {id: hash} table instead, so looking up a
+# monster never walks a long chain. Diffing two snapshots only looks at the monsters
+# changed between them and their common base, and checking one out rewrites only the
+# files that differ from the current one. Like git's index, index.json lets status (and
+# so snapshot) skip reading every file whose modification time and size are unchanged.
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import time
+import zlib
+
+from bestiary_store import BestiaryStore, DEFAULT_BESTIARY_DIR, atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+VERSIONS_DIRNAME = ".versions"
+INDEX_FILENAME = "index.json"
+# Snapshots in a row stored as deltas before one holds the full table again
+MAX_DELTA_DEPTH = 32
+SNAPSHOT_NAME_PATTERN = re.compile(r"^[\w.\-]+$")
+
+
+class VersionError(Exception):
+    """Raised for unknown snapshots, invalid names, or a checkout that would lose edits."""
+
+
+def _canonical_json(record):
+    return json.dumps(record, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+class BestiaryVersions:
+    """
+    Snapshots, diffs and checkouts of a bestiary folder.
+    """
+    def __init__(self, store):
+        """
+        Args:
+            store (BestiaryStore): The bestiary. Only local folders can be versioned.
+        """
+        self.store = store
+        self.path = os.path.join(store.directory, VERSIONS_DIRNAME)
+        os.makedirs(os.path.join(self.path, "objects"), exist_ok=True)
+        os.makedirs(os.path.join(self.path, "snapshots"), exist_ok=True)
+        self._snapshots = {} # name -> loaded snapshot file
+        try:
+            with open(os.path.join(self.path, INDEX_FILENAME), 'r', encoding='utf-8') as f:
+                self._index = json.load(f)
+        except FileNotFoundError:
+            self._index = {"head": None, "files": {}}
+        except ValueError as e:
+            logger.warning("Rebuilding the damaged version index of %s: %s", store.directory, e)
+            self._index = {"head": None, "files": {}}
+        self._index_changed = False
+
+    @property
+    def head(self):
+        """
+        Name of the snapshot the folder was last snapshotted or checked out at, or None.
+        """
+        return self._index["head"]
+
+    # --- Objects and snapshots ---
+
+    def _object_path(self, digest):
+        return os.path.join(self.path, "objects", digest[:2], digest[2:])
+
+    def _write_object(self, data):
+        digest = hashlib.sha1(data).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.tmp{os.getpid()}"
+            with open(temp_path, 'wb') as f:
+                f.write(zlib.compress(data, 6))
+            os.replace(temp_path, path)
+        return digest
+
+    def read_object(self, digest):
+        """
+        Returns the monster stored under a hash.
+        """
+        with open(self._object_path(digest), 'rb') as f:
+            return json.loads(zlib.decompress(f.read()))
+
+    def _snapshot(self, name):
+        snapshot = self._snapshots.get(name)
+        if snapshot is None:
+            try:
+                with open(os.path.join(self.path, "snapshots", name + ".json"), 'r', encoding='utf-8') as f:
+                    snapshot = json.load(f)
+            except FileNotFoundError:
+                raise VersionError(f"There is no snapshot named '{name}'")
+            self._snapshots[name] = snapshot
+        return snapshot
+
+    def _chain(self, name):
+        """
+        Returns the names from a snapshot down to the full snapshot it is based on.
+        """
+        chain = []
+        while name is not None:
+            chain.append(name)
+            name = self._snapshot(name)["base"]
+        return chain
+
+    def _hash_in(self, chain, monster_id):
+        """
+        Returns the hash of a monster in the first snapshot of chain, or None if absent.
+        """
+        for name in chain:
+            changes = self._snapshot(name)["changes"]
+            if monster_id in changes:
+                return changes[monster_id]
+        return None
+
+    def table(self, name):
+        """
+        Returns {id: hash} of every monster in a snapshot. Reads the whole chain; diff()
+        and checkout() avoid it.
+        """
+        table = {}
+        for snapshot_name in reversed(self._chain(name)):
+            table.update(self._snapshot(snapshot_name)["changes"])
+        return {monster_id: digest for monster_id, digest in table.items() if digest is not None}
+
+    def snapshots(self):
+        """
+        Returns [(name, created, base)] of every snapshot, oldest first.
+        """
+        names = [name[:-5] for name in os.listdir(os.path.join(self.path, "snapshots")) if name.endswith(".json")]
+        names.sort(key=lambda name: self._snapshot(name)["created_ns"])
+        return [(name, self._snapshot(name)["created"], self._snapshot(name)["base"]) for name in names]
+
+    # --- Working folder ---
+
+    def _save_index(self):
+        if self._index_changed:
+            atomic_write_json(os.path.join(self.path, INDEX_FILENAME), self._index)
+            self._index_changed = False
+
+    def _note_file(self, monster_id, digest):
+        """
+        Records the modification time, size and hash of a monster file in the index.
+        """
+        stat = os.stat(self.store.path_for(monster_id))
+        self._index["files"][monster_id] = [stat.st_mtime_ns, stat.st_size, digest]
+        self._index_changed = True
+
+    def status(self):
+        """
+        Returns the monsters of the folder that differ from the head snapshot:
+        {id: (hash, canonical JSON)} for added or changed ones, {id: None} for deleted ones.
+        Only files whose modification time or size changed are read.
+
+        Raises:
+            VersionError: If a changed monster file is not valid JSON.
+        """
+        files = self._index["files"]
+        changes = {}
+        seen = set()
+        with os.scandir(self.store.directory) as entries:
+            for entry in entries:
+                monster_id = self.store.id_for_path(entry.name)
+                if monster_id is None or not entry.is_file():
+                    continue
+                seen.add(monster_id)
+                stat = entry.stat()
+                known = files.get(monster_id)
+                if known is not None and known[0] == stat.st_mtime_ns and known[1] == stat.st_size:
+                    continue
+                try:
+                    data = _canonical_json(self.store.get(monster_id))
+                except ValueError as e:
+                    raise VersionError(f"{entry.path} is not valid JSON: {e}")
+                digest = hashlib.sha1(data).hexdigest()
+                if known is not None and known[2] == digest:
+                    # Touched but not changed: remember the new time so it is not read again
+                    files[monster_id] = [stat.st_mtime_ns, stat.st_size, digest]
+                    self._index_changed = True
+                    continue
+                changes[monster_id] = (digest, data)
+        for monster_id in files:
+            if monster_id not in seen:
+                changes[monster_id] = None
+        self._save_index()
+        return changes
+
+    # --- Snapshots ---
+
+    def snapshot(self, name):
+        """
+        Saves the folder as a new snapshot on top of the head snapshot and makes it the head.
+
+        Returns:
+            int: The number of monsters that differ from the previous head.
+        """
+        if not SNAPSHOT_NAME_PATTERN.match(name):
+            raise VersionError(f"Invalid snapshot name '{name}': use letters, digits, '.', '-' and '_'")
+        if os.path.exists(os.path.join(self.path, "snapshots", name + ".json")):
+            raise VersionError(f"A snapshot named '{name}' already exists")
+        changes = self.status()
+        delta = {}
+        for monster_id, change in changes.items():
+            delta[monster_id] = None if change is None else self._write_object(change[1])
+
+        base = self.head
+        depth = self._snapshot(base)["depth"] + 1 if base is not None else 0
+        if base is not None and depth >= MAX_DELTA_DEPTH:
+            # Start a new chain: this snapshot holds the full table
+            table = self.table(base)
+            table.update(delta)
+            delta = {monster_id: digest for monster_id, digest in table.items() if digest is not None}
+            base, depth = None, 0
+        elif base is None:
+            delta = {monster_id: digest for monster_id, digest in delta.items() if digest is not None}
+
+        snapshot = {"name": name, "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "created_ns": time.time_ns(),
+                    "base": base, "depth": depth, "changes": delta}
+        atomic_write_json(os.path.join(self.path, "snapshots", name + ".json"), snapshot)
+        self._snapshots[name] = snapshot
+
+        files = self._index["files"]
+        for monster_id, change in changes.items():
+            if change is None:
+                files.pop(monster_id, None)
+            else:
+                self._note_file(monster_id, change[0])
+        self._index["head"] = name
+        self._index_changed = True
+        self._save_index()
+        return len(changes)
+
+    def diff(self, old, new=None):
+        """
+        Returns the monsters that differ between two snapshots, or between a snapshot and
+        the folder (new=None): {id: (old hash or None, new hash or None)}.
+
+        Only the monsters changed between each snapshot and their common base are looked
+        at, so the time depends on the number of changes rather than on the bestiary size.
+        """
+        working = None
+        if new is None:
+            working = self.status()
+            new = self.head
+            if new is None:
+                raise VersionError("Nothing has been snapshotted yet")
+        old_chain, new_chain = self._chain(old), self._chain(new)
+        common = set(new_chain)
+        ancestor = next((name for name in old_chain if name in common), None)
+        if ancestor is None:
+            # Different full tables: every monster has to be compared
+            touched = set(self.table(old)) | set(self.table(new))
+        else:
+            touched = set()
+            for chain in (old_chain, new_chain):
+                for name in chain[:chain.index(ancestor)]:
+                    touched.update(self._snapshot(name)["changes"])
+        if working:
+            touched.update(working)
+
+        differences = {}
+        for monster_id in touched:
+            old_hash = self._hash_in(old_chain, monster_id)
+            if working and monster_id in working:
+                new_hash = working[monster_id] and working[monster_id][0]
+            else:
+                new_hash = self._hash_in(new_chain, monster_id)
+            if old_hash != new_hash:
+                differences[monster_id] = (old_hash, new_hash)
+        return differences
+
+    def checkout(self, name, force=False):
+        """
+        Rewrites the monsters of the folder that differ from a snapshot and makes it the head.
+
+        Args:
+            name (str): The snapshot.
+            force (bool): Discard edits made since the last snapshot or checkout.
+
+        Returns:
+            int: The number of monster files written or deleted.
+
+        Raises:
+            VersionError: If the folder has edits that are not in a snapshot and force is False.
+        """
+        self._chain(name) # Fails early for unknown names
+        if self.head is None:
+            raise VersionError("Nothing has been snapshotted yet")
+        differences = self.diff(self.head, None)
+        if differences and not force:
+            raise VersionError(f"{len(differences)} monsters were changed since snapshot '{self.head}'; "
+                               f"snapshot them first or check out with force")
+        differences = self.diff(name, None)
+        files = self._index["files"]
+        # Deletions first: a monster renamed only in case is refused while the old id is stored
+        for monster_id, (target_hash, current_hash) in sorted(differences.items(),
+                                                              key=lambda item: item[1][0] is not None):
+            if target_hash is None:
+                self.store.delete(monster_id)
+                files.pop(monster_id, None)
+                self._index_changed = True
+            else:
+                self.store.put(self.read_object(target_hash))
+                self._note_file(monster_id, target_hash)
+        self._index["head"] = name
+        self._index_changed = True
+        self._save_index()
+        return len(differences)
+
+
+def changed_fields(old, new):
+    """
+    Returns the top-level fields that differ between two versions of a monster.
+    """
+    return sorted(key for key in set(old or {}) | set(new or {}) if (old or {}).get(key) != (new or {}).get(key))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Snapshot, compare and restore versions of the bestiary.")
+    parser.add_argument("--store", default=DEFAULT_BESTIARY_DIR, help=f"bestiary folder (default: {DEFAULT_BESTIARY_DIR})")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    snapshot = subparsers.add_parser("snapshot", help="save the bestiary as a named snapshot")
+    snapshot.add_argument("name")
+    subparsers.add_parser("list", help="list the snapshots")
+    subparsers.add_parser("status", help="list the monsters changed since the last snapshot or checkout")
+    diff = subparsers.add_parser("diff", help="list the monsters that differ between two snapshots")
+    diff.add_argument("old")
+    diff.add_argument("new", nargs="?", help="default: the bestiary folder as it is now")
+    checkout = subparsers.add_parser("checkout", help="put the bestiary back to a snapshot")
+    checkout.add_argument("name")
+    checkout.add_argument("--force", action="store_true", help="discard changes that are not in a snapshot")
+    args = parser.parse_args(argv)
+
+    versions = BestiaryVersions(BestiaryStore(args.store))
+    try:
+        if args.command == "snapshot":
+            changed = versions.snapshot(args.name)
+            logger.info("Saved snapshot %s (%d monsters changed)", args.name, changed)
+        elif args.command == "list":
+            for name, created, base in versions.snapshots():
+                marker = "*" if name == versions.head else " "
+                print(f"{marker} {name:30} {created}" + (f"  (on {base})" if base else ""))
+        elif args.command == "status":
+            for monster_id, change in sorted(versions.status().items()):
+                print(f"{'D' if change is None else 'M' if monster_id in versions._index['files'] else 'A'} {monster_id}")
+        elif args.command == "diff":
+            for monster_id, (old_hash, new_hash) in sorted(versions.diff(args.old, args.new).items()):
+                if old_hash is None:
+                    print(f"A {monster_id}")
+                elif new_hash is None:
+                    print(f"D {monster_id}")
+                else:
+                    new = versions.read_object(new_hash) if args.new else versions.store.get(monster_id)
+                    print(f"M {monster_id}: {', '.join(changed_fields(versions.read_object(old_hash), new))}")
+        elif args.command == "checkout":
+            written = versions.checkout(args.name, args.force)
+            logger.info("Checked out %s (%d monsters rewritten)", args.name, written)
+    except VersionError as e:
+        logger.error("%s", e)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    sys.exit(main())
@@ -0,0 +1,358 @@
+# bulk_import.py
+
+# Imports folders of monster files into the bestiary store:
+#
+#     python bulk_import.py monsters/ extra.csv [--store bestiary] [--conflicts skip|replace|rename]
+#
+# Accepted files:
+#   - .json: one monster, a list of monsters, or {"monsters": [...]},
+#   - .jsonl: one monster per line,
+#   - .csv: spreadsheet exports with one row per maneuver (see CSV_COLUMNS). Rows with the
+#     same id make up one monster; its other columns are read from its first row.
+#
+# Files are parsed and validated against JSON/bestiary_schema.json in a process pool.
+# The results are handled in file order, so conflicting ids are resolved the same way
+# on every run, and the accepted monsters are written to the store in batches.
+
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import count
+
+from bestiary_store import BestiaryStore, DEFAULT_BESTIARY_DIR
+from schema_validator import validate_monster
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_SUFFIXES = (".json", ".jsonl", ".csv")
+# What to do with a monster whose id is already stored (or imported earlier in the run)
+CONFLICT_POLICIES = ["skip", "replace", "rename"]
+DEFAULT_CONFLICT_POLICY = "skip"
+DEFAULT_BATCH_SIZE = 500
+# Errors kept per file; the rest are only counted
+MAX_ERRORS_PER_FILE = 20
+
+# CSV columns, mapped to (path in the record, converter). Maneuver columns fill one
+# maneuver per row; damage columns are only used if damage_effect is filled in.
+CSV_MONSTER_COLUMNS = {
+    "id": (("id",), str),
+    "name": (("name",), str),
+    "portrait": (("portrait",), str),
+    "threat_base": (("threatLevel", "base"), int),
+    "threat_per_spawn_group": (("threatLevel", "per_spawn_group"), int),
+    "maximum_action_points": (("maximumActionPoints",), int),
+    "flavor_description": (("flavor", "description"), str),
+    "flavor_tactics": (("flavor", "tactics"), str),
+    "flavor_roleplay": (("flavor", "roleplay"), str),
+}
+CSV_MANEUVER_COLUMNS = {
+    "maneuver_id": (("id",), str),
+    "maneuver_timing": (("timing",), str),
+    "maneuver_cost": (("cost",), int),
+    "maneuver_range": (("range",), int),
+    "maneuver_description": (("description",), str),
+    "damage_base": (("damage", "base_damage"), int),
+    "damage_effect": (("damage", "effect"), str),
+    "damage_formula": (("damage", "formula"), str),
+}
+CSV_COLUMNS = list(CSV_MONSTER_COLUMNS) + list(CSV_MANEUVER_COLUMNS)
+
+
+class FileResult:
+    """
+    The valid monsters and the errors found in one file.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.records = []
+        self.invalid = 0
+        self.errors = [] # At most MAX_ERRORS_PER_FILE messages
+
+    def add(self, record, where):
+        errors = validate_monster(record)
+        if errors:
+            self.add_error(f"{where}: " + "; ".join(errors[:5]))
+        else:
+            self.records.append(record)
+
+    def add_error(self, message):
+        self.invalid += 1
+        if len(self.errors) < MAX_ERRORS_PER_FILE:
+            self.errors.append(message)
+
+
+class ImportProgress:
+    """
+    Running totals of a bulk import, passed to the progress callback.
+    """
+    def __init__(self, files_total):
+        self.files_total = files_total
+        self.files_done = 0
+        self.imported = 0
+        self.skipped = 0 # Conflicting ids left alone under the "skip" policy
+        self.renamed = 0
+        self.invalid = 0
+        self.errors = [] # (path, message)
+        self.cancelled = False
+        self.start_time = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.start_time
+
+    @property
+    def records_per_second(self):
+        return self.imported / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def discover_files(paths):
+    """
+    Returns the supported files among paths, searching folders recursively, sorted.
+    """
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, dirnames, filenames in os.walk(path):
+                dirnames[:] = [name for name in dirnames if not name.startswith(".")]
+                found.extend(os.path.join(directory, name) for name in filenames
+                             if name.lower().endswith(SUPPORTED_SUFFIXES) and not name.startswith("."))
+        elif path.lower().endswith(SUPPORTED_SUFFIXES):
+            found.append(path)
+    return sorted(found)
+
+
+def _set_path(record, path, value):
+    for key in path[:-1]:
+        record = record.setdefault(key, {})
+    record[path[-1]] = value
+
+
+def _parse_csv_row(row, columns, line_number):
+    """
+    Converts the filled-in cells of a CSV row with the given column mapping.
+
+    Raises:
+        ValueError: If a cell cannot be converted.
+    """
+    record = {}
+    for column, (path, convert) in columns.items():
+        cell = (row.get(column) or "").strip()
+        if cell == "":
+            continue
+        try:
+            _set_path(record, path, convert(cell))
+        except ValueError:
+            raise ValueError(f"line {line_number}: column '{column}' should be a number, got {cell!r}")
+    return record
+
+
+def _parse_csv(path, result):
+    monsters = {} # By id, in order of first appearance
+    with open(path, 'r', encoding='utf-8-sig', newline="") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            line_number = reader.line_num
+            try:
+                monster_fields = _parse_csv_row(row, CSV_MONSTER_COLUMNS, line_number)
+                maneuver = _parse_csv_row(row, CSV_MANEUVER_COLUMNS, line_number)
+            except ValueError as e:
+                result.add_error(str(e))
+                continue
+            monster_id = monster_fields.get("id")
+            if not monster_id:
+                result.add_error(f"line {line_number}: no id")
+                continue
+            monster = monsters.setdefault(monster_id, dict(monster_fields, maneuvers=[]))
+            if maneuver:
+                if "damage" in maneuver and "effect" not in maneuver["damage"]:
+                    del maneuver["damage"]
+                monster["maneuvers"].append(maneuver)
+    for monster_id, monster in monsters.items():
+        result.add(monster, f"monster '{monster_id}'")
+
+
+def parse_file(path):
+    """
+    Parses and validates one file. Runs in the worker processes.
+
+    Returns:
+        FileResult: The valid monsters and the errors.
+    """
+    result = FileResult(path)
+    try:
+        if path.lower().endswith(".csv"):
+            _parse_csv(path, result)
+        elif path.lower().endswith(".jsonl"):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line_number, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        result.add(json.loads(line), f"line {line_number}")
+                    except json.JSONDecodeError as e:
+                        result.add_error(f"line {line_number}: invalid JSON: {e}")
+        else:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict) and isinstance(data.get("monsters"), list):
+                data = data["monsters"]
+            for index, record in enumerate(data if isinstance(data, list) else [data]):
+                result.add(record, f"monster {index}")
+    except (IOError, UnicodeDecodeError, json.JSONDecodeError, csv.Error) as e:
+        result.add_error(f"could not read file: {e}")
+    return result
+
+
+def resolve_conflict(record, taken_ids, policy):
+    """
+    Applies a conflict policy to a monster whose id may already be taken.
+
+    An id that differs from a taken one only in case is a conflict too, since the store
+    refuses it; "replace" renames such a monster instead of replacing the other one.
+
+    Args:
+        record (dict): The monster.
+        taken_ids (dict): Casefolded id -> id, of the monsters stored or already imported.
+        policy (str): One of CONFLICT_POLICIES.
+
+    Returns:
+        tuple: (record to write or None to skip it, True if it was renamed)
+    """
+    monster_id = record["id"]
+    taken = taken_ids.get(monster_id.casefold())
+    if taken is None or (taken == monster_id and policy == "replace"):
+        return record, False
+    if policy == "skip":
+        return None, False
+    for suffix in count(2):
+        new_id = f"{monster_id}_{suffix}"
+        if new_id.casefold() not in taken_ids:
+            return dict(record, id=new_id), True
+
+
+class BulkImporter:
+    """
+    Parses files in a process pool and writes the accepted monsters to a store in batches.
+    """
+    def __init__(self, store, conflict_policy=DEFAULT_CONFLICT_POLICY, batch_size=DEFAULT_BATCH_SIZE,
+                 workers=None, progress_callback=None):
+        """
+        Initializes the importer.
+
+        Args:
+            store (BestiaryStore): Where the monsters are written.
+            conflict_policy (str): One of CONFLICT_POLICIES.
+            batch_size (int): Monsters per store batch.
+            workers (int, optional): Worker processes. None uses one per CPU; 0 parses
+                in this process, which is useful where subprocesses are unavailable.
+            progress_callback (callable, optional): Called with the ImportProgress after
+                every file. It runs on the thread that called run().
+        """
+        if conflict_policy not in CONFLICT_POLICIES:
+            raise ValueError(f"Unknown conflict policy '{conflict_policy}'")
+        self.store = store
+        self.conflict_policy = conflict_policy
+        self.batch_size = batch_size
+        self.workers = workers
+        self.progress_callback = progress_callback
+
+    def run(self, paths, cancel_event=None):
+        """
+        Imports every supported file found in paths.
+
+        Args:
+            paths (list): Files and folders.
+            cancel_event (threading.Event, optional): Once set, the import stops after the
+                current file. The monsters of the files handled so far are kept.
+
+        Returns:
+            ImportProgress: The final totals.
+        """
+        files = discover_files(paths)
+        progress = ImportProgress(len(files))
+        taken_ids = {monster_id.casefold(): monster_id for monster_id in self.store.ids()}
+        batch = []
+
+        if self.workers == 0:
+            results = map(parse_file, files)
+            pool = None
+        else:
+            pool = ProcessPoolExecutor(self.workers)
+            # Small files dominate, so hand them out in chunks to keep the workers busy
+            chunksize = max(1, len(files) // ((self.workers or os.cpu_count() or 1) * 8))
+            results = pool.map(parse_file, files, chunksize=chunksize)
+
+        try:
+            for file_result in results:
+                if cancel_event is not None and cancel_event.is_set():
+                    progress.cancelled = True
+                    break
+                for record in file_result.records:
+                    record, renamed = resolve_conflict(record, taken_ids, self.conflict_policy)
+                    if record is None:
+                        progress.skipped += 1
+                        continue
+                    progress.renamed += renamed
+                    taken_ids[record["id"].casefold()] = record["id"]
+                    batch.append(record)
+                    if len(batch) >= self.batch_size:
+                        progress.imported += self.store.put_many(batch)
+                        batch = []
+                progress.invalid += file_result.invalid
+                progress.errors.extend((file_result.path, message) for message in file_result.errors)
+                progress.files_done += 1
+                if self.progress_callback:
+                    self.progress_callback(progress)
+            if batch:
+                progress.imported += self.store.put_many(batch)
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+        if self.progress_callback:
+            self.progress_callback(progress)
+        return progress
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import monster files (JSON, JSON Lines, CSV) into the bestiary.")
+    parser.add_argument("paths", nargs="+", help="files or folders to import")
+    parser.add_argument("--store", default=DEFAULT_BESTIARY_DIR, help=f"bestiary folder (default: {DEFAULT_BESTIARY_DIR})")
+    parser.add_argument("--conflicts", choices=CONFLICT_POLICIES, default=DEFAULT_CONFLICT_POLICY,
+                        help=f"what to do with ids that already exist (default: {DEFAULT_CONFLICT_POLICY})")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"monsters per store batch (default: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes; 0 parses in-process (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    last_report = [0.0]
+
+    def report(progress):
+        # At most a few updates per second, plus the final one
+        if progress.files_done < progress.files_total and progress.elapsed - last_report[0] < 0.2:
+            return
+        last_report[0] = progress.elapsed
+        sys.stderr.write(f"\r{progress.files_done}/{progress.files_total} files, {progress.imported} imported, "
+                         f"{progress.skipped} skipped, {progress.invalid} invalid, "
+                         f"{progress.records_per_second:.0f} monsters/s")
+        sys.stderr.flush()
+
+    importer = BulkImporter(BestiaryStore(args.store), args.conflicts, args.batch_size, args.workers, report)
+    progress = importer.run(args.paths)
+    sys.stderr.write("\n")
+    logger.info("Imported %d monsters (%d renamed, %d skipped, %d invalid) from %d files in %.1f s",
+                progress.imported, progress.renamed, progress.skipped, progress.invalid,
+                progress.files_total, progress.elapsed)
+    for path, message in progress.errors:
+        logger.warning("%s: %s", path, message)
+    return 1 if progress.invalid else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    sys.exit(main())
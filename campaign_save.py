@@ -0,0 +1,361 @@
+# campaign_save.py
+
+# Saved campaigns: the Dolls, the Necromancer's resources, the encounters and the
+# bestiary overrides of a game in progress.
+#
+# A campaign is a folder. Its state is split into named sections ("necromancer",
+# "dolls/<id>", "encounters/<id>", ...), each one a JSON value, and every save writes a
+# checkpoint:
+#
+#     objects/<sha256>.json.z     one zlib-compressed section value, named by the hash
+#                                 of its canonical JSON
+#     checkpoints/<number>.json   manifest: campaign name, save time, the checkpoint it
+#                                 was saved on top of ("base") and the hash of every section
+#     HEAD                        number of the latest checkpoint
+#
+# Only the sections changed since the last save are serialized, and a section whose hash
+# is already stored (e.g. changed and changed back) is not written again, so an autosave
+# during play writes a few small files. Opening a campaign reads only its latest
+# manifest; a section is read and decompressed the first time it is asked for.
+#
+# Every file is written next to its target and swapped into place, and HEAD is replaced
+# last, so a save interrupted by a crash leaves the previous checkpoint intact.
+
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+import zlib
+
+from settings_manager import get_config_dir
+
+logger = logging.getLogger(__name__)
+
+SAVES_DIRNAME = "saves"
+FORMAT_VERSION = 1
+# Checkpoints kept per campaign; older ones are deleted and their unused objects removed
+KEEP_CHECKPOINTS = 20
+
+# Well-known sections; Dolls and encounters get one section each ("dolls/<id>")
+NECROMANCER_SECTION = "necromancer"
+DOLLS_PREFIX = "dolls/"
+ENCOUNTERS_PREFIX = "encounters/"
+BESTIARY_OVERRIDES_SECTION = "bestiary_overrides"
+
+# Sections of a new campaign
+NEW_CAMPAIGN_SECTIONS = {
+    NECROMANCER_SECTION: {"resources": {}, "notes": ""},
+    BESTIARY_OVERRIDES_SECTION: {},
+}
+
+
+class CampaignError(Exception):
+    """Raised when a folder does not hold a readable campaign."""
+
+
+def get_saves_dir():
+    """
+    Returns the per-user directory campaigns are saved in.
+    """
+    return os.path.join(get_config_dir(), SAVES_DIRNAME)
+
+
+def _canonical_json(value):
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def _write_atomic(path, data):
+    """
+    Writes data to a temporary file next to path and swaps it into place.
+    """
+    directory = os.path.dirname(path)
+    fd, temp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def _folder_name(name):
+    """
+    Returns a folder name for a campaign name.
+    """
+    return re.sub(r"[^\w\-]+", "_", name).strip("_") or "campaign"
+
+
+class Campaign:
+    """
+    A saved campaign whose sections are loaded on first use and saved incrementally.
+
+    Use Campaign.create() or Campaign.open(). get(), set() and save() may be called from
+    different threads, e.g. an autosave running in the background.
+    """
+    def __init__(self, path, manifest):
+        self.path = path
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock() # One save at a time, e.g. an autosave and the one on exit
+        self._manifest = manifest
+        self._hashes = dict(manifest["sections"]) # section -> hash of the stored value
+        self._values = {} # section -> value, for the sections loaded or set
+        self._dirty = set() # sections set or changed since the last save
+        self._removed = set() # sections deleted since the last save
+
+    @classmethod
+    def create(cls, name, saves_dir=None, sections=None):
+        """
+        Creates a campaign in a new folder of saves_dir and saves its first checkpoint.
+
+        Args:
+            name (str): The campaign's name.
+            saves_dir (str, optional): Defaults to get_saves_dir().
+            sections (dict, optional): Initial sections; defaults to NEW_CAMPAIGN_SECTIONS.
+        """
+        saves_dir = saves_dir or get_saves_dir()
+        base = os.path.join(saves_dir, _folder_name(name))
+        path, suffix = base, 2
+        while os.path.exists(path):
+            path, suffix = f"{base}_{suffix}", suffix + 1
+        os.makedirs(os.path.join(path, "objects"))
+        os.makedirs(os.path.join(path, "checkpoints"))
+        campaign = cls(path, {"format": FORMAT_VERSION, "name": name, "number": 0, "saved": None, "sections": {}})
+        for section, value in (NEW_CAMPAIGN_SECTIONS if sections is None else sections).items():
+            campaign.set(section, json.loads(_canonical_json(value))) # A copy, not the shared default
+        campaign.save()
+        return campaign
+
+    @classmethod
+    def open(cls, path, checkpoint=None):
+        """
+        Opens a campaign at its latest checkpoint (or an older one). Only the manifest is read.
+        Saving a campaign opened at an older checkpoint adds a checkpoint after the latest
+        one; the checkpoints in between are kept.
+
+        Raises:
+            CampaignError: If the folder holds no readable campaign.
+        """
+        try:
+            if checkpoint is None:
+                with open(os.path.join(path, "HEAD"), 'r') as f:
+                    checkpoint = int(f.read().strip())
+            with open(cls._manifest_path(path, checkpoint), 'rb') as f:
+                manifest = json.loads(f.read())
+        except (OSError, ValueError) as e:
+            raise CampaignError(f"{path} is not a readable campaign: {e}")
+        if manifest.get("format") != FORMAT_VERSION:
+            raise CampaignError(f"{path} has unsupported format version {manifest.get('format')}")
+        return cls(path, manifest)
+
+    @staticmethod
+    def _manifest_path(path, number):
+        return os.path.join(path, "checkpoints", f"{number:08d}.json")
+
+    def _object_path(self, digest):
+        return os.path.join(self.path, "objects", f"{digest}.json.z")
+
+    # --- Sections ---
+
+    @property
+    def name(self):
+        return self._manifest["name"]
+
+    @property
+    def checkpoint(self):
+        """
+        Number of the checkpoint this campaign was opened at or last saved to.
+        """
+        return self._manifest["number"]
+
+    @property
+    def saved(self):
+        """
+        Time of the last save as "YYYY-MM-DDTHH:MM:SS", or None before the first one.
+        """
+        return self._manifest["saved"]
+
+    @property
+    def dirty(self):
+        return bool(self._dirty or self._removed)
+
+    def sections(self, prefix=""):
+        """
+        Returns the names of the sections, sorted, optionally only those starting with prefix.
+        """
+        with self._lock:
+            names = set(self._hashes) | set(self._values)
+        return sorted(name for name in names if name.startswith(prefix))
+
+    def get(self, section, default=None):
+        """
+        Returns the value of a section, reading it from disk the first time.
+        A value changed in place must be reported with mark_changed().
+        """
+        with self._lock:
+            if section in self._values:
+                return self._values[section]
+            digest = self._hashes.get(section)
+        if digest is None:
+            return default
+        try:
+            with open(self._object_path(digest), 'rb') as f:
+                value = json.loads(zlib.decompress(f.read()))
+        except (OSError, zlib.error, ValueError) as e:
+            raise CampaignError(f"Section {section} of {self.path} is unreadable: {e}")
+        with self._lock:
+            # set() may have run meanwhile; its value wins
+            return self._values.setdefault(section, value)
+
+    def set(self, section, value):
+        """
+        Replaces the value of a section. It is written by the next save().
+        """
+        with self._lock:
+            self._values[section] = value
+            self._dirty.add(section)
+            self._removed.discard(section)
+
+    def mark_changed(self, section):
+        """
+        Marks a section whose value (as returned by get()) was changed in place.
+        """
+        with self._lock:
+            if section in self._values:
+                self._dirty.add(section)
+
+    def delete(self, section):
+        with self._lock:
+            self._values.pop(section, None)
+            self._dirty.discard(section)
+            if self._hashes.pop(section, None) is not None:
+                self._removed.add(section)
+
+    # --- Saving ---
+
+    def save(self):
+        """
+        Writes a checkpoint holding the changes made since the last save.
+
+        Returns:
+            int: The number of the new checkpoint, or None if nothing had changed.
+        """
+        with self._save_lock:
+            return self._save()
+
+    def _save(self):
+        with self._lock:
+            if not self._dirty and not self._removed and self.saved is not None:
+                return None
+            # Serialized under the lock, so a value changed while this save writes is
+            # saved by the next one rather than half by this one
+            encoded = {section: _canonical_json(self._values[section]) for section in self._dirty}
+            removed = set(self._removed)
+            self._dirty.clear()
+            self._removed.clear()
+            hashes = dict(self._hashes)
+        try:
+            changed = 0
+            for section, data in encoded.items():
+                digest = hashlib.sha256(data).hexdigest()
+                if hashes.get(section) == digest:
+                    continue
+                changed += 1
+                hashes[section] = digest
+                object_path = self._object_path(digest)
+                if not os.path.exists(object_path):
+                    _write_atomic(object_path, zlib.compress(data, 6))
+            for section in removed:
+                hashes.pop(section, None)
+            if not changed and not removed and self.saved is not None:
+                return None
+            # After the latest checkpoint, not the one this campaign was opened at, so
+            # saving an older checkpoint never overwrites the ones after it
+            number = max(self.checkpoints(), default=self._manifest["number"]) + 1
+            manifest = dict(self._manifest, number=number, base=self._manifest["number"],
+                            saved=time.strftime("%Y-%m-%dT%H:%M:%S"), sections=hashes)
+            _write_atomic(self._manifest_path(self.path, manifest["number"]),
+                          json.dumps(manifest, ensure_ascii=False, indent=1).encode("utf-8"))
+            _write_atomic(os.path.join(self.path, "HEAD"), str(manifest["number"]).encode("ascii"))
+        except BaseException:
+            with self._lock:
+                # Try again on the next save
+                self._dirty.update(section for section in encoded if section in self._values)
+                self._removed.update(section for section in removed if section not in self._values)
+            raise
+        with self._lock:
+            self._manifest = manifest
+            for section, digest in hashes.items():
+                self._hashes[section] = digest
+            for section in removed:
+                self._hashes.pop(section, None)
+        logger.debug("Saved checkpoint %d of %s: %d of %d sections written",
+                     manifest["number"], self.name, changed, len(hashes))
+        if manifest["number"] > KEEP_CHECKPOINTS:
+            self._prune(manifest["number"] - KEEP_CHECKPOINTS + 1)
+        return manifest["number"]
+
+    def checkpoints(self):
+        """
+        Returns the numbers of the checkpoints kept on disk, oldest first.
+        """
+        names = os.listdir(os.path.join(self.path, "checkpoints"))
+        return sorted(int(name[:-5]) for name in names if name.endswith(".json") and name[:-5].isdigit())
+
+    def _prune(self, oldest_kept):
+        """
+        Deletes the checkpoints before oldest_kept, and the objects only they referred to.
+        """
+        removed_any = False
+        for number in self.checkpoints():
+            if number < oldest_kept:
+                os.remove(self._manifest_path(self.path, number))
+                removed_any = True
+        # Collecting objects means reading every kept manifest, so it is only done now
+        # and then rather than on every save
+        if not removed_any or oldest_kept % KEEP_CHECKPOINTS:
+            return
+        referenced = set()
+        for number in self.checkpoints():
+            try:
+                with open(self._manifest_path(self.path, number), 'rb') as f:
+                    referenced.update(json.loads(f.read())["sections"].values())
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning("Not collecting unused objects of %s: %s", self.path, e)
+                return
+        objects_dir = os.path.join(self.path, "objects")
+        for name in os.listdir(objects_dir):
+            if name.endswith(".json.z") and name[:-len(".json.z")] not in referenced:
+                os.remove(os.path.join(objects_dir, name))
+
+
+def list_campaigns(saves_dir=None):
+    """
+    Returns (path, name, saved time) of every campaign in saves_dir, most recently saved first.
+    Only the latest manifest of each is read.
+    """
+    saves_dir = saves_dir or get_saves_dir()
+    campaigns = []
+    try:
+        names = os.listdir(saves_dir)
+    except OSError:
+        return campaigns
+    for folder in names:
+        path = os.path.join(saves_dir, folder)
+        if not os.path.isfile(os.path.join(path, "HEAD")):
+            continue
+        try:
+            campaign = Campaign.open(path)
+        except CampaignError as e:
+            logger.warning("Skipping campaign %s: %s", path, e)
+            continue
+        campaigns.append((path, campaign.name, campaign.saved or ""))
+    campaigns.sort(key=lambda item: item[2], reverse=True)
+    return campaigns
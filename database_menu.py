@@ -1,26 +1,49 @@
 # database_menu.py
 
 import tkinter as tk
+from tkinter import filedialog
+import bisect
 import json # Import json for file operations
+import logging
 import os # Import os for path checking
 
+from async_bridge import AsyncBridge
+from bestiary_client import RemoteBestiaryStore
+from bestiary_protocol import RemoteError
+from bestiary_store import BestiaryStore
+from bulk_import import BulkImporter
+from derived_stats import get_derived_stats_cache
 from enemy_viewer import EnemyViewer # Import EnemyViewer
+from file_watcher import FileWatcher
 from game_data import MOCK_ZOMBIE_DATA # Import mock data from the new file
+from parts_catalog import get_catalog, CatalogError, PartsCatalog, REINFORCEMENT_CATEGORIES
+from statblock_export import StatBlockExporter, FORMATS as STATBLOCK_FORMATS
 
 # Define the path for the enemy data file
 ENEMY_DATA_FILE = "zombie_data.json"
 
+# The catalog dropdown shows at most this many rows before it scrolls
+CATALOG_DROPDOWN_HEIGHT = 8
+# Changes per batch above which the Enemy Data list is refilled instead of edited row by row
+ENEMY_LIST_REBUILD_THRESHOLD = 200
+
+logger = logging.getLogger(__name__)
+
 class DatabaseMenu(tk.Frame):
     """
     A frame representing the database menu, with nested sub-menus.
     """
-    def __init__(self, master, switch_frame_callback):
+    def __init__(self, master, switch_frame_callback, async_bridge=None, bestiary_client=None):
         """
         Initializes the DatabaseMenu frame.
 
         Args:
             master: The parent widget (the main application window).
             switch_frame_callback: A function to call to switch to another frame.
+            async_bridge (AsyncBridge, optional): Runs file I/O off the Tk thread.
+                Defaults to a bridge of this frame's own.
+            bestiary_client (BestiaryClient, optional): Use the bestiary shared by a
+                bestiary server instead of the local bestiary folder.
         """
         super().__init__(master)
         self.master = master
@@ -30,6 +53,27 @@ class DatabaseMenu(tk.Frame):
         # Load or create the enemy data file on initialization
         self.zombie_data = self._load_or_create_zombie_data()
 
+        # Monsters saved in the bestiary folder (or shared by a server), listed after the built-in entries
+        self.bestiary_client = bestiary_client
+        self.bestiary_store = RemoteBestiaryStore(bestiary_client) if bestiary_client else BestiaryStore()
+        self.bestiary_names = {} # Monster id -> name, for the Enemy Data list
+        # Loading, importing and watching files happens off the Tk thread; results come back through the bridge
+        self.async_bridge = async_bridge or AsyncBridge(self)
+        self.import_job = None
+        self.export_job = None # Running stat block export
+        self.enemy_list_job = None # Running refresh_enemy_list
+        self.enemy_load_job = None # Loading of the monster selected in the list
+        # Watcher changes that arrived while the list was being reread; applied once it is done
+        self.deferred_bestiary_changes = []
+        self.file_watchers = []
+
+        # Positions, classes and parts shown in the Doll sub-menu
+        try:
+            self.catalog = get_catalog()
+        except CatalogError as e:
+            logger.error("%s. The Doll catalog will be empty.", e)
+            self.catalog = PartsCatalog()
+
         # Configure the grid to be responsive
         self.grid_rowconfigure(0, weight=1)
         self.grid_rowconfigure(1, weight=0)
@@ -76,28 +120,30 @@ class DatabaseMenu(tk.Frame):
                              fg="#f0f0f0", bg="#2c2c2c", cursor="hand2")
         back_button.grid(row=0, column=0, padx=20, pady=20, sticky="nw")
         back_button.bind("<Button-1>", lambda e: self.switch_frame_callback("MainMenu"))
-        
+
+        self._start_file_watchers()
+
     def _load_or_create_zombie_data(self):
         """
         Loads zombie data from ENEMY_DATA_FILE or creates it if it doesn't exist.
         """
         if not os.path.exists(ENEMY_DATA_FILE):
-            print(f"INFO: {ENEMY_DATA_FILE} not found. Creating with default mock data.")
+            logger.info("%s not found. Creating with default mock data.", ENEMY_DATA_FILE)
             try:
                 with open(ENEMY_DATA_FILE, 'w') as f:
                     json.dump(MOCK_ZOMBIE_DATA, f, indent=4)
                 return MOCK_ZOMBIE_DATA.copy() # Return a copy to avoid direct modification
             except IOError as e:
-                print(f"ERROR: Could not create {ENEMY_DATA_FILE}: {e}. Using default mock data in memory.")
+                logger.error("Could not create %s: %s. Using default mock data in memory.", ENEMY_DATA_FILE, e)
                 return MOCK_ZOMBIE_DATA.copy()
         else:
-            print(f"INFO: {ENEMY_DATA_FILE} found. Loading data.")
+            logger.info("%s found. Loading data.", ENEMY_DATA_FILE)
             try:
                 with open(ENEMY_DATA_FILE, 'r') as f:
                     data = json.load(f)
                 return data
             except (IOError, json.JSONDecodeError) as e:
-                print(f"ERROR: Could not load {ENEMY_DATA_FILE}: {e}. Using default mock data.")
+                logger.error("Could not load %s: %s. Using default mock data.", ENEMY_DATA_FILE, e)
                 return MOCK_ZOMBIE_DATA.copy()
 
     def _create_main_buttons(self, frame):
@@ -123,7 +169,7 @@ class DatabaseMenu(tk.Frame):
                 button = tk.Button(button_container, text=category, font=("Helvetica", 16),
                                    width=20, pady=5, bg="#555555", fg="#f0f0f0",
                                    relief="raised", bd=3,
-                                   command=lambda cat=category: print(f"{cat} button clicked"))
+                                   command=lambda cat=category: logger.debug("%s button clicked", cat))
             
             button.pack()
             
@@ -138,14 +184,14 @@ class DatabaseMenu(tk.Frame):
         left_aligned_frame.pack(fill="x", padx=20)
 
         button_configs = [
-            ("Sample Characters", lambda: print("Sample Characters clicked")),
-            ("Doll Creation", lambda: print("Doll Creation clicked")),
-            ("Fragments of Memory", lambda: print("Fragments of Memory clicked")),
-            ("Classes", self._toggle_classes_menu),
-            ("Maneuvers", lambda: print("Maneuvers clicked")),
-            ("Basic Parts", lambda: print("Basic Parts clicked")),
-            ("Reinforcement Parts", self._toggle_reinforcement_parts_menu),
-            ("Positions", self._toggle_positions_menu),
+            ("Sample Characters", lambda: logger.debug("Sample Characters clicked")),
+            ("Doll Creation", lambda: logger.debug("Doll Creation clicked")),
+            ("Fragments of Memory", lambda: logger.debug("Fragments of Memory clicked")),
+            ("Classes", lambda: self._toggle_catalog_dropdown("Classes")),
+            ("Maneuvers", lambda: logger.debug("Maneuvers clicked")),
+            ("Basic Parts", lambda: logger.debug("Basic Parts clicked")),
+            ("Reinforcement Parts", lambda: self._toggle_catalog_dropdown("Reinforcement Parts")),
+            ("Positions", lambda: self._toggle_catalog_dropdown("Positions")),
         ]
 
         self.dropdown_buttons = {}
@@ -157,13 +203,10 @@ class DatabaseMenu(tk.Frame):
             if text in ["Positions", "Reinforcement Parts", "Classes"]:
                 self.dropdown_buttons[text] = button
 
-        self.positions_menu_frame = tk.Frame(left_aligned_frame, bg="#2c2c2c", relief="flat", bd=0)
-        self.reinforcement_parts_menu_frame = tk.Frame(left_aligned_frame, bg="#2c2c2c", relief="flat", bd=0)
-        self.classes_menu_frame = tk.Frame(left_aligned_frame, bg="#2c2c2c", relief="flat", bd=0)
-
-        self._create_positions_menu()
-        self._create_reinforcement_parts_menu()
-        self._create_classes_menu()
+        # One dropdown serves Positions, Reinforcement Parts and Classes; it is refilled when opened
+        self.catalog_dropdown_kind = None
+        self.catalog_dropdown_frame = tk.Frame(left_aligned_frame, bg="#2c2c2c", relief="flat", bd=0)
+        self._create_catalog_dropdown()
 
         sub_menu_back_button = tk.Button(frame, text="❮ Back to Database", font=("Helvetica", 12),
                                          width=25, pady=5, bg="#555555", fg="#f0f0f0",
@@ -182,13 +225,13 @@ class DatabaseMenu(tk.Frame):
         left_aligned_frame.pack(fill="x", padx=20)
 
         button_configs = [
-            ("The Necromancer's Minions", lambda: print("The Necromancer's Minions clicked")),
+            ("The Necromancer's Minions", lambda: logger.debug("The Necromancer's Minions clicked")),
             ("Enemy Data", self._toggle_enemy_data_menu),
-            ("Creating Enemies", lambda: print("Creating Enemies clicked")),
-            ("Enemy Exclusive Parts", lambda: print("Enemy Exclusive Parts clicked")),
-            ("Group Management", lambda: print("Group Management clicked")),
-            ("Scripting", lambda: print("Scripting clicked")),
-            ("Styles of play", lambda: print("Styles of play clicked")),
+            ("Creating Enemies", lambda: logger.debug("Creating Enemies clicked")),
+            ("Enemy Exclusive Parts", lambda: logger.debug("Enemy Exclusive Parts clicked")),
+            ("Group Management", lambda: logger.debug("Group Management clicked")),
+            ("Scripting", lambda: logger.debug("Scripting clicked")),
+            ("Styles of play", lambda: logger.debug("Styles of play clicked")),
         ]
 
         self.necromancer_dropdown_buttons = {}
@@ -206,54 +249,92 @@ class DatabaseMenu(tk.Frame):
                                          command=self._show_main_menu)
         sub_menu_back_button.pack(pady=(20, 5), padx=20, anchor="w")
 
-    def _create_positions_menu(self):
-        """
-        Creates the entries for the Positions custom dropdown menu.
+    def _create_catalog_dropdown(self):
         """
-        positions_menu_items = [
-            "۶ Alice", "۶ Automaton", "۶ Court", "۶ Dolls", "۶ Junk", "۶ Sorority"
-        ]
-        
-        for item in positions_menu_items:
-            label = tk.Label(self.positions_menu_frame, text=item, font=("Helvetica", 12),
-                             fg="#f0f0f0", bg="#2c2c2c", anchor="w", cursor="hand2")
-            label.pack(fill="x", padx=5)
-            label.bind("<Enter>", lambda e, l=label: l.configure(bg="#444444"))
-            label.bind("<Leave>", lambda e, l=label: l.configure(bg="#2c2c2c"))
-            label.bind("<Button-1>", lambda e, opt=item, l=label: self._on_menu_item_click(opt, l))
-
-    def _create_reinforcement_parts_menu(self):
+        Creates the catalog dropdown: a single Listbox, which only draws its visible
+        rows, plus a label showing the details of the selected entry.
         """
-        Creates the entries for the Reinforcement Parts custom dropdown menu.
-        """
-        reinforcement_parts_menu_items = [
-            "۶ Armaments", "۶ Mutations", "۶ Enhancements"
-        ]
-
-        for item in reinforcement_parts_menu_items:
-            label = tk.Label(self.reinforcement_parts_menu_frame, text=item, font=("Helvetica", 12),
-                             fg="#f0f0f0", bg="#2c2c2c", anchor="w", cursor="hand2")
-            label.pack(fill="x", padx=5)
-            label.bind("<Enter>", lambda e, l=label: l.configure(bg="#444444"))
-            label.bind("<Leave>", lambda e, l=label: l.configure(bg="#2c2c2c"))
-            label.bind("<Button-1>", lambda e, opt=item, l=label: self._on_menu_item_click(opt, l))
+        list_frame = tk.Frame(self.catalog_dropdown_frame, bg="#2c2c2c")
+        list_frame.pack(fill="x")
 
-    def _create_classes_menu(self):
-        """
-        Creates the entries for the Classes custom dropdown menu.
-        """
-        classes_menu_items = [
-            "۶ Baroque", "۶ Gothic", "۶ Requiem", "۶ Romanesque", "۶ Stacy", "۶ Thanatos"
-        ]
+        scrollbar = tk.Scrollbar(list_frame, orient="vertical")
+        self.catalog_listbox = tk.Listbox(list_frame, height=CATALOG_DROPDOWN_HEIGHT, width=40, font=("Helvetica", 12),
+                                          fg="#f0f0f0", bg="#2c2c2c", activestyle="none",
+                                          selectbackground="#444444", selectforeground="#f0f0f0",
+                                          yscrollcommand=scrollbar.set, relief="flat", bd=0,
+                                          highlightthickness=0)
+        scrollbar.config(command=self.catalog_listbox.yview)
+        scrollbar.pack(side="right", fill="y")
+        self.catalog_listbox.pack(side="left", fill="both", expand=True)
+
+        self.catalog_detail_label = tk.Label(self.catalog_dropdown_frame, text="", font=("Helvetica", 10),
+                                             fg="#cccccc", bg="#2c2c2c", justify="left", anchor="w",
+                                             wraplength=350)
+        self.catalog_detail_label.pack(fill="x", pady=(2, 0))
+
+        # The catalog entry behind each Listbox row; None for category headings
+        self.catalog_row_entries = []
+        # The only binding of the dropdown, whatever it currently shows
+        self.catalog_listbox.bind("<<ListboxSelect>>", self._on_catalog_item_selected)
+
+    def _catalog_rows(self, kind):
+        """
+        Returns the (text, entry) rows the catalog dropdown shows for a Doll sub-menu button.
+        """
+        if kind == "Positions":
+            return [(f"۶ {position['name']}", position) for position in self.catalog.positions]
+        if kind == "Classes":
+            return [(f"۶ {doll_class['name']}", doll_class) for doll_class in self.catalog.classes]
+
+        rows = []
+        for category in REINFORCEMENT_CATEGORIES:
+            rows.append((f"۶ {category}", None))
+            for part in self.catalog.by_category.get(category, []):
+                rows.append((f"      {part['name']} ({part['location']}, {part['timing']}, {part['cost']})", part))
+        return rows
+
+    def _toggle_catalog_dropdown(self, kind):
+        """
+        Shows the catalog dropdown under the given button, or hides it if it already shows that kind.
+        """
+        if self.catalog_dropdown_frame.winfo_ismapped() and self.catalog_dropdown_kind == kind:
+            self.catalog_dropdown_frame.pack_forget()
+            return
+
+        rows = self._catalog_rows(kind)
+        self.catalog_listbox.delete(0, tk.END)
+        self.catalog_listbox.insert(tk.END, *[text for text, entry in rows])
+        self.catalog_listbox.configure(height=max(1, min(len(rows), CATALOG_DROPDOWN_HEIGHT)))
+        self.catalog_row_entries = [entry for text, entry in rows]
+        self.catalog_detail_label.configure(text="")
+        self.catalog_dropdown_kind = kind
+
+        self.catalog_dropdown_frame.pack_forget()
+        self.catalog_dropdown_frame.pack(after=self.dropdown_buttons[kind], padx=10, pady=(0, 5), anchor="w")
+
+    def _on_catalog_item_selected(self, event):
+        """
+        Shows the details of the catalog entry selected in the dropdown.
+        """
+        selected_index = self.catalog_listbox.curselection()
+        if not selected_index:
+            return
+        entry = self.catalog_row_entries[selected_index[0]]
+        if entry is None:
+            # A category heading: summarize the parts listed under it
+            category = self.catalog_listbox.get(selected_index[0]).replace("۶", "").strip()
+            count = len(self.catalog.by_category.get(category, []))
+            self.catalog_detail_label.configure(text=f"{category}: {count} parts")
+        elif "effect" in entry:
+            self.catalog_detail_label.configure(
+                text=f"{entry['name']} — {entry['category']} Lv{entry['level']}, {entry['location']}\n"
+                     f"{entry['timing']} / Cost {entry['cost']} / Range {entry['range']}\n{entry['effect']}")
+        else:
+            bonus = entry.get("bonus", {})
+            bonus_text = ", ".join(f"{category} +{points}" for category, points in bonus.items())
+            self.catalog_detail_label.configure(
+                text=f"{entry['name']}: {entry['description']}" + (f"\n{bonus_text}" if bonus_text else ""))
 
-        for item in classes_menu_items:
-            label = tk.Label(self.classes_menu_frame, text=item, font=("Helvetica", 12),
-                             fg="#f0f0f0", bg="#2c2c2c", anchor="w", cursor="hand2")
-            label.pack(fill="x", padx=5)
-            label.bind("<Enter>", lambda e, l=label: l.configure(bg="#444444"))
-            label.bind("<Leave>", lambda e, l=label: l.configure(bg="#2c2c2c"))
-            label.bind("<Button-1>", lambda e, opt=item, l=label: self._on_menu_item_click(opt, l))
-    
     def _create_enemy_data_menu(self):
         """
         Creates the entries for the Enemy Data custom dropdown menu with a scrollbar.
@@ -261,11 +342,14 @@ class DatabaseMenu(tk.Frame):
         list_frame = tk.Frame(self.enemy_data_menu_frame, bg="#2c2c2c")
         list_frame.pack(fill="x")
         
-        enemy_data_items = [
+        # Built-in entries; bestiary monsters are appended by refresh_enemy_list
+        self.builtin_enemy_items = [
             "۶ Zombie", "۶ Skeleton", "۶ Ghoul", "۶ Wight", "۶ Lich",
             "۶ Banshee", "۶ Wraith", "۶ Vampire", "۶ Werewolf", "۶ Chimera",
             "۶ Hydra", "۶ Dragon", "۶ Basilisk"
         ]
+        # The bestiary id behind each Listbox row; None for built-in entries
+        self.enemy_row_ids = []
 
         scrollbar = tk.Scrollbar(list_frame, orient="vertical")
         
@@ -280,11 +364,87 @@ class DatabaseMenu(tk.Frame):
         scrollbar.pack(side="right", fill="y")
         self.enemy_listbox.pack(side="left", fill="both", expand=True)
         
-        for item in enemy_data_items:
-            self.enemy_listbox.insert(tk.END, item)
-        
         self.enemy_listbox.bind("<<ListboxSelect>>", self._on_enemy_selected)
 
+        import_row = tk.Frame(self.enemy_data_menu_frame, bg="#2c2c2c")
+        import_row.pack(fill="x", pady=(2, 0))
+        self.import_button = tk.Button(import_row, text="Import monsters...", font=("Helvetica", 10),
+                                       bg="#555555", fg="#f0f0f0", relief="raised", bd=2,
+                                       command=self._import_monsters)
+        self.import_button.pack(side="left")
+        self.export_button = tk.Button(import_row, text="Export stat blocks...", font=("Helvetica", 10),
+                                       bg="#555555", fg="#f0f0f0", relief="raised", bd=2,
+                                       command=self._export_statblocks)
+        self.export_button.pack(side="left", padx=(5, 0))
+        self.import_status_label = tk.Label(import_row, text="", font=("Helvetica", 10),
+                                            fg="#cccccc", bg="#2c2c2c", anchor="w")
+        self.import_status_label.pack(side="left", fill="x", padx=(5, 0))
+
+        self.refresh_enemy_list()
+
+    def refresh_enemy_list(self):
+        """
+        Rereads the monster names of the bestiary folder in the background and then refills
+        the Enemy Data list. The built-in entries are listed right away.
+        """
+        if self.enemy_list_job is not None:
+            self.enemy_list_job.cancel()
+        self._fill_enemy_list()
+        job = self.async_bridge.run_blocking(self._read_bestiary_names,
+                                             on_done=lambda names: self._on_bestiary_names_read(job, names))
+        self.enemy_list_job = job
+
+    def _read_bestiary_names(self):
+        """
+        Returns {monster id: name} of every readable bestiary monster. Runs off the Tk thread.
+        """
+        names = {}
+        try:
+            monster_ids = self.bestiary_store.ids()
+        except (OSError, RemoteError) as e:
+            logger.error("Could not list the bestiary at %s: %s", self.bestiary_store.directory, e)
+            return names
+        for monster_id in monster_ids:
+            record = self._read_bestiary_record(monster_id)
+            if record is not None:
+                names[monster_id] = record.get("name") or monster_id
+        return names
+
+    def _on_bestiary_names_read(self, job, names):
+        """
+        Fills the enemy list with the names a refresh job read from the bestiary, then
+        applies the bestiary changes deferred while it ran. The result is ignored if job
+        is no longer self.enemy_list_job, i.e. a newer refresh has replaced it.
+        """
+        if job is not self.enemy_list_job:
+            return # Finished just as a newer refresh replaced it
+        self.enemy_list_job = None
+        self.bestiary_names = names
+        self._fill_enemy_list()
+        deferred, self.deferred_bestiary_changes = self.deferred_bestiary_changes, []
+        for records, removed_ids in deferred:
+            self._apply_bestiary_changes(records, removed_ids)
+
+    def _read_bestiary_record(self, monster_id):
+        """
+        Returns a bestiary monster, or None if it is missing or unreadable.
+        """
+        try:
+            return self.bestiary_store.get(monster_id)
+        except (IOError, json.JSONDecodeError, RemoteError) as e:
+            logger.warning("Could not read bestiary monster %s: %s", monster_id, e)
+            return None
+
+    def _fill_enemy_list(self):
+        """
+        Refills the Enemy Data list from the built-in entries and bestiary_names, in id order.
+        """
+        rows = [(item, None) for item in self.builtin_enemy_items]
+        rows.extend((f"۶ {self.bestiary_names[monster_id]}", monster_id) for monster_id in sorted(self.bestiary_names))
+        self.enemy_listbox.delete(0, tk.END)
+        self.enemy_listbox.insert(tk.END, *[text for text, monster_id in rows])
+        self.enemy_row_ids = [monster_id for text, monster_id in rows]
+
     def _on_enemy_selected(self, event):
         """
         Handles the event when an enemy is selected from the listbox.
@@ -292,62 +452,267 @@ class DatabaseMenu(tk.Frame):
         selected_index = self.enemy_listbox.curselection()
         if selected_index:
             selected_item = self.enemy_listbox.get(selected_index[0])
-            print(f"Enemy selected: {selected_item}")
-
+            monster_id = self.enemy_row_ids[selected_index[0]]
+            logger.debug("Enemy selected: %s", selected_item)
+
+            if monster_id is not None:
+                # Only the latest selection is shown
+                if self.enemy_load_job is not None:
+                    self.enemy_load_job.cancel()
+                job = self.async_bridge.run_blocking(
+                    self._read_bestiary_record, monster_id,
+                    on_done=lambda record: self._on_bestiary_record_loaded(job, record))
+                self.enemy_load_job = job
             # Check if the selected item is "۶ Zombie" and display its data
-            if selected_item == "۶ Zombie":
+            elif selected_item == "۶ Zombie":
                 # Pass the loaded zombie_data to the viewer
                 self._show_enemy_viewer(self.zombie_data)
             else:
-                print(f"Viewer for {selected_item} not yet implemented.")
-
-
-    def _on_menu_item_click(self, item, label):
-        """
-        Handles clicks on the custom dropdown menu items and provides a visual cue.
-        """
-        print(f"{item} selected")
-        label.configure(bg="#666666")
-        self.after(200, lambda: label.configure(bg="#444444"))
-        
-    def _toggle_positions_menu(self):
-        """
-        Toggles the visibility of the custom positions dropdown menu.
-        """
-        if self.positions_menu_frame.winfo_ismapped():
-            self.positions_menu_frame.pack_forget()
-        else:
-            if self.reinforcement_parts_menu_frame.winfo_ismapped():
-                self.reinforcement_parts_menu_frame.pack_forget()
-            if self.classes_menu_frame.winfo_ismapped():
-                self.classes_menu_frame.pack_forget()
-            self.positions_menu_frame.pack(padx=10, pady=(0, 5), anchor="w")
-
-    def _toggle_reinforcement_parts_menu(self):
-        """
-        Toggles the visibility of the custom reinforcement parts dropdown menu.
-        """
-        if self.reinforcement_parts_menu_frame.winfo_ismapped():
-            self.reinforcement_parts_menu_frame.pack_forget()
+                logger.info("Viewer for %s not yet implemented.", selected_item)
+
+    def _on_bestiary_record_loaded(self, job, record):
+        """
+        Shows the record a load job read from the bestiary in the enemy viewer, or
+        refreshes the list if the monster is gone. The result is ignored if job is no
+        longer self.enemy_load_job, i.e. a later selection has replaced it.
+        """
+        if job is not self.enemy_load_job:
+            return # A later selection replaced it
+        self.enemy_load_job = None
+        if record is None: # Deleted or unreadable since the list was filled
+            self.refresh_enemy_list()
+            return
+        # Saves from the viewer go back to the bestiary folder
+        self._show_enemy_viewer(record, self.bestiary_store)
+
+    def _import_monsters(self):
+        """
+        Asks for a folder of monster files and imports it into the bestiary in the
+        background. While it runs, the button cancels it.
+        """
+        if self.import_job is not None:
+            # The importer stops after the current file and the job ends through
+            # _on_import_done with its totals; until then no other import can start
+            self.import_job.request_stop()
+            self.import_button.configure(state="disabled")
+            self.import_status_label.configure(text="Cancelling import...")
+            return
+        folder = filedialog.askdirectory(title="Import monsters from folder")
+        if not folder:
+            return
+
+        async def run_import(job):
+            # Runs on the bridge's loop: only plain numbers are handed over to the Tk thread
+            importer = BulkImporter(self.bestiary_store, progress_callback=lambda progress: job.report_progress(
+                progress.files_done, progress.files_total, progress.imported, progress.invalid))
+            return await job.bridge.to_thread(importer.run, [folder], job.cancel_event)
+
+        self.import_button.configure(text="Cancel import")
+        self.import_status_label.configure(text="Importing...")
+        self.import_job = self.async_bridge.submit(run_import, name=f"import of {folder}",
+                                                   on_done=self._on_import_done, on_error=self._on_import_failed,
+                                                   on_progress=self._on_import_progress,
+                                                   on_cancelled=self._on_import_cancelled)
+
+    def _on_import_progress(self, files_done, files_total, imported, invalid):
+        self.import_status_label.configure(
+            text=f"{files_done}/{files_total} files, {imported} monsters" + (f", {invalid} invalid" if invalid else ""))
+
+    def _finish_import(self, status):
+        self.import_job = None
+        self.import_button.configure(text="Import monsters...", state="normal")
+        self.import_status_label.configure(text=status)
+
+    def _on_import_done(self, progress):
+        status = "Import cancelled: imported" if progress.cancelled else "Imported"
+        self._finish_import(f"{status} {progress.imported} monsters ({progress.skipped} skipped, {progress.invalid} invalid)")
+        for path, error in progress.errors:
+            logger.warning("%s: %s", path, error)
+        # The imported files reach the Enemy Data list through the bestiary watcher
+
+    def _on_import_failed(self, error):
+        logger.error("Import failed: %s", error)
+        self._finish_import(f"Import failed: {error}")
+
+    def _on_import_cancelled(self):
+        # The files handled before the import stopped stay imported
+        self._finish_import("Import cancelled")
+
+
+    def _export_statblocks(self):
+        """
+        Asks for a folder and exports the stat block of every monster to it as printable
+        HTML and SVG pages, in the background. Monsters unchanged since the last export to
+        the same folder are skipped. While it runs, the button cancels it.
+        """
+        if self.export_job is not None:
+            self.export_job.cancel()
+            return
+        folder = filedialog.askdirectory(title="Export stat blocks to folder")
+        if not folder:
+            return
+
+        async def run_export(job):
+            exporter = StatBlockExporter(folder, STATBLOCK_FORMATS, progress_callback=lambda progress: job.report_progress(
+                progress.rendered, progress.to_render))
+            return await job.bridge.to_thread(exporter.run, self.bestiary_store.iter_records(), job.cancel_event)
+
+        self.export_button.configure(text="Cancel export")
+        self.import_status_label.configure(text="Exporting...")
+        self.export_job = self.async_bridge.submit(run_export, name=f"stat block export to {folder}",
+                                                   on_done=self._on_export_done, on_error=self._on_export_failed,
+                                                   on_progress=self._on_export_progress,
+                                                   on_cancelled=lambda: self._finish_export("Export cancelled"))
+
+    def _on_export_progress(self, rendered, to_render):
+        self.import_status_label.configure(text=f"Exported {rendered}/{to_render} changed monsters")
+
+    def _finish_export(self, status):
+        self.export_job = None
+        self.export_button.configure(text="Export stat blocks...")
+        self.import_status_label.configure(text=status)
+
+    def _on_export_done(self, progress):
+        self._finish_export(f"Exported {progress.total} stat blocks ({progress.rendered} rendered, "
+                            f"{progress.unchanged} unchanged)" + (f", {len(progress.errors)} failed" if progress.errors else ""))
+        for monster_id, error in progress.errors:
+            logger.warning("Stat block of %s: %s", monster_id, error)
+
+    def _on_export_failed(self, error):
+        logger.error("Stat block export failed: %s", error)
+        self._finish_export(f"Export failed: {error}")
+
+    def _start_file_watchers(self):
+        """
+        Watches the bestiary folder and ENEMY_DATA_FILE for edits made outside the app,
+        e.g. by a co-GM, and starts checking for the changes they report. A shared
+        bestiary reports its changes through the server's pushes instead.
+        """
+        enemy_file_directory = os.path.dirname(os.path.abspath(ENEMY_DATA_FILE))
+        enemy_file_name = os.path.basename(ENEMY_DATA_FILE)
+        self.file_watchers = [
+            FileWatcher(enemy_file_directory, self._on_enemy_file_changed,
+                        name_filter=lambda name: name == enemy_file_name),
+        ]
+        if self.bestiary_client is not None:
+            self.bestiary_client.subscribe(self._on_remote_bestiary_changed)
         else:
-            if self.positions_menu_frame.winfo_ismapped():
-                self.positions_menu_frame.pack_forget()
-            if self.classes_menu_frame.winfo_ismapped():
-                self.classes_menu_frame.pack_forget()
-            self.reinforcement_parts_menu_frame.pack(padx=10, pady=(0, 5), anchor="w")
+            self.file_watchers.append(
+                FileWatcher(self.bestiary_store.directory, self._on_bestiary_files_changed,
+                            name_filter=lambda name: self.bestiary_store.id_for_path(name) is not None))
+        for watcher in self.file_watchers:
+            watcher.start()
+        # The watchers hand their changes over through the bridge
+        self.async_bridge.start()
+
+    def _on_bestiary_files_changed(self, changed, removed):
+        """
+        Reparses the changed bestiary files. Runs on the watcher thread, so the files are
+        read there and only the results are handed to the Tk thread.
+        """
+        records = {}
+        for name in changed:
+            monster_id = self.bestiary_store.id_for_path(name)
+            record = self._read_bestiary_record(monster_id)
+            if record is not None:
+                records[monster_id] = record
+        removed_ids = {self.bestiary_store.id_for_path(name) for name in removed}
+        self.async_bridge.call_in_tk(self._apply_bestiary_changes, records, removed_ids)
+
+    def _on_remote_bestiary_changed(self, changed, removed, state):
+        """
+        Fetches the monsters changed on the server (by any client, this one included),
+        in one request. Runs on the client's subscription thread.
+        """
+        if changed is None: # Reconnected: anything may have changed
+            self.async_bridge.call_in_tk(self.refresh_enemy_list)
+            return
+        if not changed and not removed:
+            return # Only shared state changed
+        try:
+            records = self.bestiary_client.get_many(changed)
+        except (OSError, RemoteError) as e:
+            logger.warning("Could not fetch changed monsters: %s", e)
+            return
+        self.async_bridge.call_in_tk(self._apply_bestiary_changes, records, set(removed))
+
+    def _on_enemy_file_changed(self, changed, removed):
+        """
+        Rereads ENEMY_DATA_FILE after an edit on disk. Runs on the watcher thread.
+        """
+        if not changed: # Removed: keep the data in memory, the next save writes it back
+            return
+        try:
+            with open(ENEMY_DATA_FILE, 'r') as f:
+                data = json.load(f)
+        except (IOError, json.JSONDecodeError) as e:
+            logger.warning("Could not reload %s: %s", ENEMY_DATA_FILE, e)
+            return
+        self.async_bridge.call_in_tk(self._apply_enemy_file_change, data)
+
+    def _apply_enemy_file_change(self, data):
+        self.zombie_data = data
+        if self.enemy_viewer_frame.store is None:
+            self.enemy_viewer_frame.reload_from_disk(self.zombie_data)
+
+    def _apply_bestiary_changes(self, records, removed_ids):
+        """
+        Updates bestiary_names, the Enemy Data list and the viewer for changed and
+        removed bestiary monsters, without rereading the rest of the bestiary.
 
-    def _toggle_classes_menu(self):
-        """
-        Toggles the visibility of the custom classes dropdown menu.
-        """
-        if self.classes_menu_frame.winfo_ismapped():
-            self.classes_menu_frame.pack_forget()
+        Args:
+            records (dict): Monster id -> record, for the added or changed monsters.
+            removed_ids (set): Ids of the removed monsters.
+        """
+        if self.enemy_list_job is not None:
+            # The list is being reread; it may or may not include these changes yet
+            self.deferred_bestiary_changes.append((records, removed_ids))
+            return
+        get_derived_stats_cache().invalidate(*removed_ids, *records)
+        for monster_id in removed_ids:
+            self.bestiary_names.pop(monster_id, None)
+        renamed_ids = []
+        for monster_id, record in records.items():
+            name = record.get("name") or monster_id
+            if self.bestiary_names.get(monster_id) != name:
+                self.bestiary_names[monster_id] = name
+                renamed_ids.append(monster_id)
+
+        if len(removed_ids) + len(renamed_ids) > ENEMY_LIST_REBUILD_THRESHOLD:
+            self._fill_enemy_list()
         else:
-            if self.positions_menu_frame.winfo_ismapped():
-                self.positions_menu_frame.pack_forget()
-            if self.reinforcement_parts_menu_frame.winfo_ismapped():
-                self.reinforcement_parts_menu_frame.pack_forget()
-            self.classes_menu_frame.pack(padx=10, pady=(0, 5), anchor="w")
+            # Bestiary rows follow the built-in ones, sorted by id
+            first_row = len(self.builtin_enemy_items)
+            for monster_id in removed_ids:
+                row = bisect.bisect_left(self.enemy_row_ids, monster_id, lo=first_row)
+                if row < len(self.enemy_row_ids) and self.enemy_row_ids[row] == monster_id:
+                    self.enemy_listbox.delete(row)
+                    del self.enemy_row_ids[row]
+            for monster_id in renamed_ids:
+                row = bisect.bisect_left(self.enemy_row_ids, monster_id, lo=first_row)
+                if row < len(self.enemy_row_ids) and self.enemy_row_ids[row] == monster_id:
+                    self.enemy_listbox.delete(row)
+                else:
+                    self.enemy_row_ids.insert(row, monster_id)
+                self.enemy_listbox.insert(row, f"۶ {self.bestiary_names[monster_id]}")
+
+        viewer = self.enemy_viewer_frame
+        shown_id = viewer.saved_record.get("id") if viewer.saved_record else None
+        if viewer.store is self.bestiary_store and shown_id is not None:
+            if shown_id in records:
+                viewer.reload_from_disk(records[shown_id])
+            elif shown_id in removed_ids:
+                viewer.reload_from_disk(None)
+
+    def destroy(self):
+        """
+        Stops the file watchers before the frame is destroyed.
+        """
+        for watcher in self.file_watchers:
+            watcher.stop()
+        if self.bestiary_client is not None:
+            self.bestiary_client.unsubscribe(self._on_remote_bestiary_changed)
+        super().destroy()
 
     def _toggle_enemy_data_menu(self):
         """
@@ -357,12 +722,8 @@ class DatabaseMenu(tk.Frame):
             self.enemy_data_menu_frame.pack_forget()
             self._hide_enemy_viewer() # If hiding enemy data list, hide viewer too
         else:
-            if self.positions_menu_frame.winfo_ismapped():
-                self.positions_menu_frame.pack_forget()
-            if self.reinforcement_parts_menu_frame.winfo_ismapped():
-                self.reinforcement_parts_menu_frame.pack_forget()
-            if self.classes_menu_frame.winfo_ismapped():
-                self.classes_menu_frame.pack_forget()
+            if self.catalog_dropdown_frame.winfo_ismapped():
+                self.catalog_dropdown_frame.pack_forget()
 
             self.enemy_data_menu_frame.pack(after=self.necromancer_dropdown_buttons["Enemy Data"], padx=10, pady=(0, 5), anchor="w")
         
@@ -370,57 +731,61 @@ class DatabaseMenu(tk.Frame):
         """
         Hides all other content and shows the doll sub-menu.
         """
-        print("DEBUG: _show_doll_menu called.")
+        logger.debug("_show_doll_menu called.")
         self._hide_all_main_content_frames()
         self.doll_buttons_frame.grid(row=0, column=0, padx=20, pady=20, sticky="nsew")
-        print(f"DEBUG: doll_buttons_frame gridded. Is mapped: {self.doll_buttons_frame.winfo_ismapped()}")
-        print(f"DEBUG: Children of doll_buttons_frame: {[w.winfo_class() for w in self.doll_buttons_frame.winfo_children()]}")
+        # These arguments are Tk queries, so only make them when the line is actually logged
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("doll_buttons_frame gridded. Is mapped: %s", self.doll_buttons_frame.winfo_ismapped())
+            logger.debug("Children of doll_buttons_frame: %s", [w.winfo_class() for w in self.doll_buttons_frame.winfo_children()])
 
     def _show_necromancer_menu(self):
         """
         Hides all other content and shows the necromancer sub-menu.
         """
-        print("DEBUG: _show_necromancer_menu called.")
+        logger.debug("_show_necromancer_menu called.")
         self._hide_all_main_content_frames()
         self.necromancer_buttons_frame.grid(row=0, column=0, padx=20, pady=20, sticky="nsew")
-        print(f"DEBUG: necromancer_buttons_frame gridded. Is mapped: {self.necromancer_buttons_frame.winfo_ismapped()}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("necromancer_buttons_frame gridded. Is mapped: %s", self.necromancer_buttons_frame.winfo_ismapped())
 
     def _show_main_menu(self):
         """
         Hides all other content and displays the main database menu.
         """
-        print("DEBUG: _show_main_menu called.")
+        logger.debug("_show_main_menu called.")
         self._hide_all_main_content_frames() # This now hides everything cleanly
         self.main_buttons_frame.grid(row=0, column=0, padx=20, pady=20, sticky="nsew")
-        print(f"DEBUG: main_buttons_frame gridded. Is mapped: {self.main_buttons_frame.winfo_ismapped()}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("main_buttons_frame gridded. Is mapped: %s", self.main_buttons_frame.winfo_ismapped())
 
     def _hide_all_main_content_frames(self):
         """Helper to hide all main content frames (main, doll, necromancer, enemy viewer) and their dropdowns."""
-        print("DEBUG: _hide_all_main_content_frames called.")
+        logger.debug("_hide_all_main_content_frames called.")
         self.main_buttons_frame.grid_forget()
         self.doll_buttons_frame.grid_forget()
         self.necromancer_buttons_frame.grid_forget()
         self.enemy_viewer_frame.grid_forget()
         # Also hide any currently open dropdowns, regardless of which main menu is active
-        if self.positions_menu_frame.winfo_ismapped():
-            self.positions_menu_frame.pack_forget()
-        if self.reinforcement_parts_menu_frame.winfo_ismapped():
-            self.reinforcement_parts_menu_frame.pack_forget()
-        if self.classes_menu_frame.winfo_ismapped():
-            self.classes_menu_frame.pack_forget()
+        if self.catalog_dropdown_frame.winfo_ismapped():
+            self.catalog_dropdown_frame.pack_forget()
         if self.enemy_data_menu_frame.winfo_ismapped():
             self.enemy_data_menu_frame.pack_forget()
-        print("DEBUG: All main content frames and dropdowns hidden.")
+        logger.debug("All main content frames and dropdowns hidden.")
 
-    def _show_enemy_viewer(self, enemy_data):
+    def _show_enemy_viewer(self, enemy_data, store=None):
         """
         Displays the EnemyViewer in the right column.
         The necromancer buttons frame remains visible in the left column.
+
+        Args:
+            enemy_data (dict): The monster to show.
+            store (BestiaryStore, optional): Where the viewer saves edits of a bestiary monster.
         """
         # Ensure the necromancer menu is visible in column 0
         self.necromancer_buttons_frame.grid(row=0, column=0, padx=20, pady=20, sticky="nsew")
         
-        self.enemy_viewer_frame.display_enemy_data(enemy_data) # Update viewer with data
+        self.enemy_viewer_frame.display_enemy_data(enemy_data, store) # Update viewer with data
         # Grid the viewer into column 1, leaving column 0 for the necromancer menu
         self.enemy_viewer_frame.grid(row=0, column=1, padx=20, pady=20, sticky="nsew") 
 
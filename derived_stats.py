@@ -0,0 +1,153 @@
+# derived_stats.py
+
+# Numbers derived from a monster record that encounter building, sorting the Enemy Data
+# list and analytics need: its threat, its expected damage per turn and per Action
+# Point, and its best maneuver for each timing.
+#
+# They are computed from "threatLevel", "maximumActionPoints" and "maneuvers" only, and
+# memoized per record: the cache keeps the record each entry was computed from and
+# reuses the entry while it is given that same record (or an equal one, e.g. reread
+# from disk). EnemyViewer invalidates a monster when it saves it and DatabaseMenu when
+# the bestiary changes on disk or on the server, so a view asks for the stats of the
+# whole bestiary but only recomputes the monsters that changed.
+
+import logging
+import threading
+from collections import namedtuple
+
+from dice_odds import maneuver_odds
+
+logger = logging.getLogger(__name__)
+
+# Attackers per spawn group assumed for the damage figures: chain_attack only lengthens
+# the chain from CHAIN_ATTACK_GROUP attackers on, which depends on the encounter
+DEFAULT_GROUP_SIZE = 1
+
+DerivedStats = namedtuple("DerivedStats", [
+    "threat",           # Threat of the monster with one spawn group
+    "threat_per_group", # Threat added by every further spawn group
+    "action_points",    # maximumActionPoints, 0 if missing
+    "damage_per_turn",  # Expected damage of the best maneuver repeated with the turn's Action Points
+    "damage_per_ap",    # Best expected damage per Action Point of a maneuver
+    "best_maneuvers",   # {timing: id of the maneuver with the most expected damage per AP}
+])
+
+
+def _int(value, default=0):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def threat_for_groups(stats, groups):
+    """
+    Returns the threat of a monster appearing as the given number of spawn groups.
+    """
+    if groups <= 0:
+        return 0
+    return stats.threat + stats.threat_per_group * (groups - 1)
+
+
+def compute_derived_stats(record, group_size=DEFAULT_GROUP_SIZE):
+    """
+    Computes the DerivedStats of a monster record. Missing or malformed fields count as 0.
+
+    A maneuver's expected damage comes from dice_odds with no attack modifier. Maneuvers
+    are ranked within their timing by expected damage per Action Point, then by lower
+    cost; maneuvers that deal no damage rank by cost alone.
+
+    Args:
+        record (dict): A monster record.
+        group_size (int): Attackers in a spawn group, for chain_attack.
+    """
+    threat_level = record.get("threatLevel") or {}
+    base = _int(threat_level.get("base"))
+    per_group = _int(threat_level.get("per_spawn_group"))
+    action_points = max(0, _int(record.get("maximumActionPoints")))
+
+    damage_per_turn = 0.0
+    damage_per_ap = 0.0
+    ranked = {} # timing -> (rank key, maneuver id)
+    for maneuver in record.get("maneuvers") or []:
+        if not isinstance(maneuver, dict):
+            continue
+        cost = max(0, _int(maneuver.get("cost")))
+        odds = maneuver_odds(maneuver, 0, group_size)
+        damage = odds.expected_damage if odds is not None else 0.0
+        # A free maneuver is not repeated: it is ranked as if it cost one Action Point
+        per_ap = damage / max(cost, 1)
+        damage_per_ap = max(damage_per_ap, per_ap)
+        uses = action_points // cost if cost else min(action_points, 1)
+        damage_per_turn = max(damage_per_turn, damage * uses)
+
+        key = (-per_ap, cost)
+        timing = maneuver.get("timing") or ""
+        if maneuver.get("id") and (timing not in ranked or key < ranked[timing][0]):
+            ranked[timing] = (key, maneuver.get("id"))
+
+    return DerivedStats(base + per_group, per_group, action_points, damage_per_turn, damage_per_ap,
+                        {timing: maneuver_id for timing, (_, maneuver_id) in ranked.items()})
+
+
+class DerivedStatsCache:
+    """
+    DerivedStats memoized per monster id and record version. Safe to use from any thread.
+    """
+    def __init__(self, group_size=DEFAULT_GROUP_SIZE):
+        self.group_size = group_size
+        self._lock = threading.Lock()
+        self._entries = {} # monster id -> (record, DerivedStats)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, record):
+        """
+        Returns the DerivedStats of a record, computing them if the cached ones were
+        computed from a different version of it.
+        """
+        monster_id = record.get("id")
+        with self._lock:
+            entry = self._entries.get(monster_id)
+        # The same object is the common case (a list showing its records again); an
+        # equal copy costs a comparison, which is still cheaper than recomputing
+        if entry is not None and (entry[0] is record or entry[0] == record):
+            self.hits += 1
+            return entry[1]
+        stats = compute_derived_stats(record, self.group_size)
+        with self._lock:
+            self.misses += 1
+            if monster_id is not None:
+                self._entries[monster_id] = (record, stats)
+        return stats
+
+    def get_many(self, records):
+        """
+        Returns {monster id: DerivedStats} for an iterable of records.
+        """
+        return {record.get("id"): self.get(record) for record in records}
+
+    def invalidate(self, *monster_ids):
+        """
+        Drops the stats of the given monsters, e.g. after one of them was saved or removed.
+        """
+        with self._lock:
+            for monster_id in monster_ids:
+                self._entries.pop(monster_id, None)
+        logger.debug("Invalidated derived stats of %s", ", ".join(map(str, monster_ids)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = None
+
+def get_derived_stats_cache():
+    """
+    Returns the shared cache, creating it on first use.
+    """
+    global _cache
+    if _cache is None:
+        _cache = DerivedStatsCache()
+    return _cache
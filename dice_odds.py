@@ -0,0 +1,171 @@
+# dice_odds.py
+
+# Exact odds of an attack: the chance to hit and the distribution of the damage dealt,
+# computed from the d10 outcome table rather than by rolling dice many times.
+#
+#     python dice_odds.py --base-damage 1 --modifier 1 --group-size 25 --formula chain_attack
+#
+# An attack check is 1d10 plus modifiers. A natural 1 always fails; a total of
+# SUCCESS_TARGET or more hits the location of HIT_LOCATIONS (10 and up: the attacker
+# chooses), and CRITICAL_TARGET or more is a critical hit that deals CRITICAL_DAMAGE_BONUS
+# extra damage. With chain_attack a group attacks again after every hit, once per
+# CHAIN_ATTACK_GROUP attackers, until an attack misses.
+#
+# The damage of a chain is the distribution of one attack convolved with the rest of the
+# chain, with NumPy when it is installed and in pure Python otherwise. Results are
+# memoized per (modifier, chain length, base damage), so once a table is built a query
+# is a dictionary lookup taking about a microsecond.
+
+import argparse
+import sys
+from collections import namedtuple
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError: # The pure-Python convolution gives the same results
+    np = None
+
+DIE_SIDES = 10
+FUMBLE_FACE = 1
+SUCCESS_TARGET = 6
+CRITICAL_TARGET = 11
+CRITICAL_DAMAGE_BONUS = 1
+# Location hit by a successful total; higher totals let the attacker choose
+HIT_LOCATIONS = {6: "Leg", 7: "Torso", 8: "Arm", 9: "Head"}
+CHOSEN_LOCATION = "Choice"
+# chain_attack repeats the attack once per this many attackers in the group
+CHAIN_ATTACK_GROUP = 10
+# Longest chain computed. Every attack after the first needs the previous ones to hit
+# (at most 90%, a natural 1 always misses), so longer chains change the expected
+# damage by less than 1e-8, while the work grows with the square of the length
+MAX_CHAIN = 200
+# Distinct (modifier, chain length, base damage) tables kept. A table holds up to
+# (MAX_CHAIN + 1) * (base damage + 1) + 1 chances
+ODDS_CACHE_SIZE = 1024
+
+AttackOdds = namedtuple("AttackOdds", [
+    "hit_chance",          # The first attack hits (critical hits included)
+    "critical_chance",     # The first attack is a critical hit
+    "fumble_chance",       # The first attack rolls a natural 1
+    "expected_hits",       # Hits over the whole chain
+    "expected_damage",     # Damage over the whole chain
+    "damage_distribution", # Tuple: probability of each total damage, from 0
+    "location_chances",    # {location: chance the first attack hits it}
+])
+
+
+def roll_outcomes(modifier=0):
+    """
+    Returns (miss, hit, critical) chances of one attack check and the chance of every
+    hit location.
+    """
+    miss = hit = critical = 0.0
+    locations = {}
+    chance = 1.0 / DIE_SIDES
+    for face in range(1, DIE_SIDES + 1):
+        total = face + modifier
+        if face == FUMBLE_FACE or total < SUCCESS_TARGET:
+            miss += chance
+            continue
+        if total >= CRITICAL_TARGET:
+            critical += chance
+        else:
+            hit += chance
+        location = HIT_LOCATIONS.get(total, CHOSEN_LOCATION)
+        locations[location] = locations.get(location, 0.0) + chance
+    return miss, hit, critical, locations
+
+
+def _convolve(first, second):
+    if np is not None:
+        return np.convolve(first, second).tolist()
+    result = [0.0] * (len(first) + len(second) - 1)
+    for i, a in enumerate(first):
+        if a:
+            for j, b in enumerate(second):
+                result[i + j] += a * b
+    return result
+
+
+@lru_cache(maxsize=ODDS_CACHE_SIZE)
+def attack_odds(modifier=0, chain=0, base_damage=1):
+    """
+    Returns the AttackOdds of an attack that is repeated up to chain more times while it hits.
+
+    Args:
+        modifier (int): Sum of the modifiers to the attack check.
+        chain (int): Extra attacks after hits, e.g. from chain_attack_length(). Longer
+            chains than MAX_CHAIN are computed as MAX_CHAIN.
+        base_damage (int): Damage of a hit.
+    """
+    if chain > MAX_CHAIN:
+        return attack_odds(modifier, MAX_CHAIN, base_damage)
+    miss, hit, critical, locations = roll_outcomes(modifier)
+    critical_damage = base_damage + CRITICAL_DAMAGE_BONUS if base_damage > 0 else base_damage
+    # Damage dealt by one attack that hits
+    hit_damage = [0.0] * (critical_damage + 1)
+    hit_damage[base_damage] += hit
+    hit_damage[critical_damage] += critical
+
+    # Built from the last attack of the chain back to the first: an attack misses
+    # (ending the chain) or hits and is followed by the rest of the chain
+    distribution = [1.0]
+    for _ in range(chain + 1):
+        distribution = _convolve(hit_damage, distribution)
+        distribution[0] += miss
+
+    hit_chance = hit + critical
+    expected_hits = sum(hit_chance ** attacks for attacks in range(1, chain + 2))
+    expected_damage = sum(damage * chance for damage, chance in enumerate(distribution))
+    return AttackOdds(hit_chance, critical, 1.0 / DIE_SIDES, expected_hits, expected_damage,
+                      tuple(distribution), locations)
+
+
+def chain_attack_length(formula, group_size):
+    """
+    Returns the extra attacks a maneuver's damage formula gives a group of group_size.
+    """
+    if formula == "chain_attack":
+        return max(0, group_size) // CHAIN_ATTACK_GROUP
+    return 0
+
+
+def maneuver_odds(maneuver, modifier=0, group_size=1):
+    """
+    Returns the AttackOdds of a maneuver from a monster record, or None if it deals no damage.
+
+    Damage formulas other than chain_attack depend on the state of the battle and are
+    not included.
+    """
+    damage = maneuver.get("damage")
+    if not damage:
+        return None
+    try:
+        base_damage = max(0, int(damage.get("base_damage", 0)))
+    except (TypeError, ValueError):
+        return None
+    return attack_odds(modifier, chain_attack_length(damage.get("formula"), group_size), base_damage)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Print the exact odds of an attack.")
+    parser.add_argument("--base-damage", type=int, default=1)
+    parser.add_argument("--modifier", type=int, default=0, help="sum of the attack check modifiers")
+    parser.add_argument("--group-size", type=int, default=1, help="attackers in the group")
+    parser.add_argument("--formula", default=None, help="damage formula, e.g. chain_attack")
+    args = parser.parse_args(argv)
+
+    odds = maneuver_odds({"damage": {"base_damage": args.base_damage, "formula": args.formula}},
+                         args.modifier, args.group_size)
+    print(f"Hit: {odds.hit_chance:.1%} (critical {odds.critical_chance:.1%}, fumble {odds.fumble_chance:.1%})")
+    print(f"Expected hits: {odds.expected_hits:.3f}, expected damage: {odds.expected_damage:.3f}")
+    print("Locations: " + ", ".join(f"{location} {chance:.1%}" for location, chance in odds.location_chances.items()))
+    for damage, chance in enumerate(odds.damage_distribution):
+        if chance >= 0.0005:
+            print(f"  {damage:3d} damage: {chance:.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,253 @@
+# doll_builder.py
+
+# Assembles legal Doll loadouts from the parts catalog.
+#
+# A Doll has a position, a main class and a sub class. Their bonuses give her
+# reinforcement points per category (Armaments, Mutations, Enhancements): with N
+# points in a category she may take up to N parts of that category, each of level N
+# or lower. Reinforcement parts also need a free slot at their location, and the
+# combined action point cost of the chosen parts may be capped.
+#
+# The best loadouts are found with a memoized dynamic program over slot states:
+# parts are grouped by (category, location), each group is reduced to its best
+# options per (number of parts, total cost), and the groups are then combined while
+# tracking the slots, category points and cost still available.
+
+import heapq
+from functools import lru_cache
+
+from parts_catalog import LOCATIONS, REINFORCEMENT_CATEGORIES
+
+# Reinforcement part slots available at each location
+SLOT_LIMITS = {"Head": 2, "Arm": 3, "Torso": 3, "Leg": 2}
+
+# Ready-made objectives: each scores a single part, and a build scores the sum over its parts
+OBJECTIVES = {
+    "rapid": lambda part: 1 if part["timing"] == "Rapid" else 0,
+    "action": lambda part: 1 if part["timing"] == "Action" else 0,
+    "maneuvers": lambda part: 0 if part["timing"] == "Auto" else 1,
+    "parts": lambda part: 1,
+}
+
+
+def _sort_key(entry):
+    """
+    Orders (score, cost, part_ids) entries: higher score first, then lower cost.
+    """
+    return (entry[0], -entry[1])
+
+
+def _merge_top(entries, top_k):
+    """
+    Returns the top_k best (score, cost, part_ids) entries as a tuple.
+    """
+    return tuple(heapq.nlargest(top_k, entries, key=_sort_key))
+
+
+class DollBuilder:
+    """
+    Finds the best Doll loadouts for an objective under slot, class and cost limits.
+    """
+    def __init__(self, catalog, slot_limits=None):
+        """
+        Initializes the builder.
+
+        Args:
+            catalog (PartsCatalog): Positions, classes and parts to build from.
+            slot_limits (dict, optional): Reinforcement slots per location. Defaults to SLOT_LIMITS.
+        """
+        self.catalog = catalog
+        self.slot_limits = dict(slot_limits or SLOT_LIMITS)
+        self._group_options_cache = {}
+        self._solve_cache = {}
+
+    def point_budgets(self, position_id=None, class_ids=None):
+        """
+        Groups every allowed (position, main class, sub class) combination by the
+        reinforcement points it grants, so each distinct budget is solved only once.
+
+        Args:
+            position_id (str, optional): Only consider this position.
+            class_ids (tuple, optional): Only consider this (main class, sub class) pair.
+
+        Returns:
+            dict: Maps a points tuple (in REINFORCEMENT_CATEGORIES order) to a list of
+                  (position_id, main_class_id, sub_class_id) combinations.
+        """
+        positions = [self.catalog.get(position_id)] if position_id else self.catalog.positions
+        if class_ids:
+            class_pairs = [(self.catalog.get(class_ids[0]), self.catalog.get(class_ids[1]))]
+        else:
+            class_pairs = [(main, sub) for main in self.catalog.classes for sub in self.catalog.classes]
+
+        budgets = {}
+        for position in positions:
+            for main, sub in class_pairs:
+                points = tuple(position.get("bonus", {}).get(category, 0)
+                               + main["bonus"].get(category, 0)
+                               + sub["bonus"].get(category, 0)
+                               for category in REINFORCEMENT_CATEGORIES)
+                budgets.setdefault(points, []).append((position["id"], main["id"], sub["id"]))
+        return budgets
+
+    def best_builds(self, objective="rapid", cost_cap=None, top_k=5, position_id=None, class_ids=None):
+        """
+        Returns the top_k loadouts for an objective.
+
+        Args:
+            objective (str or callable): A key of OBJECTIVES, or a function scoring one part.
+            cost_cap (int, optional): Highest combined action point cost of the chosen parts.
+            top_k (int): How many builds to return.
+            position_id (str, optional): Only build for this position.
+            class_ids (tuple, optional): Only build for this (main class, sub class) pair.
+
+        Returns:
+            list: Builds, best first. Each is a dictionary with "score", "cost",
+                  "parts" (reinforcement part ids), "basic_parts" and "combinations"
+                  (the (position, main class, sub class) choices that allow it).
+        """
+        score_part = OBJECTIVES[objective] if isinstance(objective, str) else objective
+        # The objective itself, not its id(): the cache entries keep a callable alive, so a
+        # later callable can never reuse its id and be served its results
+        objective_key = objective
+        if cost_cap is None:
+            cost_cap = sum(part["cost"] for part in self.catalog.parts)
+
+        basic_parts = self.catalog.by_category.get("Basic", [])
+        basic_score = sum(score_part(part) for part in basic_parts)
+
+        # A loadout that fits a small budget also fits every larger one, so the same part
+        # set can come from several budgets: keep it once, with all their combinations
+        candidates = {} # frozenset of part ids -> (score, cost, part_ids, combinations)
+        for points, combinations in self.point_budgets(position_id, class_ids).items():
+            cache_key = (objective_key, points, cost_cap, top_k)
+            if cache_key not in self._solve_cache:
+                self._solve_cache[cache_key] = self._solve(score_part, objective_key, points, cost_cap, top_k)
+            for score, cost, part_ids in self._solve_cache[cache_key]:
+                key = frozenset(part_ids)
+                if key in candidates:
+                    candidates[key][3].extend(combinations)
+                else:
+                    candidates[key] = (score, cost, part_ids, list(combinations))
+
+        builds = []
+        for score, cost, part_ids, combinations in heapq.nlargest(top_k, candidates.values(), key=_sort_key):
+            builds.append({
+                "score": score + basic_score,
+                "cost": cost,
+                "parts": list(part_ids),
+                "basic_parts": [part["id"] for part in basic_parts],
+                "combinations": combinations,
+            })
+        assert len({frozenset(build["parts"]) for build in builds}) == len(builds), "part set returned twice"
+        return builds
+
+    def _solve(self, score_part, objective_key, points, cost_cap, top_k):
+        """
+        Runs the dynamic program for one reinforcement points budget.
+
+        Returns:
+            tuple: The top_k (score, cost, part_ids) entries.
+        """
+        groups = []
+        for category_index, category in enumerate(REINFORCEMENT_CATEGORIES):
+            if points[category_index] == 0:
+                continue
+            for location_index, location in enumerate(LOCATIONS):
+                max_pick = min(points[category_index], self.slot_limits.get(location, 0))
+                if max_pick == 0:
+                    continue
+                options = self._group_options(score_part, objective_key, category, location,
+                                              points[category_index], max_pick, cost_cap, top_k)
+                if len(options) > 1: # More than just "take nothing"
+                    groups.append((category_index, location_index, options))
+
+        # What the groups from each index onwards can still use. Anything beyond that is
+        # zeroed or clamped before a lookup, so states that only differ in resources no
+        # remaining group can use share one memo entry.
+        remaining_categories = [set() for _ in range(len(groups) + 1)]
+        remaining_locations = [set() for _ in range(len(groups) + 1)]
+        remaining_max_cost = [0] * (len(groups) + 1)
+        for group_index in range(len(groups) - 1, -1, -1):
+            category_index, location_index, options = groups[group_index]
+            remaining_categories[group_index] = remaining_categories[group_index + 1] | {category_index}
+            remaining_locations[group_index] = remaining_locations[group_index + 1] | {location_index}
+            remaining_max_cost[group_index] = remaining_max_cost[group_index + 1] + max(cost for count, cost in options)
+
+        def lookup(group_index, slots_left, points_left, cost_left):
+            slots_left = tuple(slots if index in remaining_locations[group_index] else 0
+                               for index, slots in enumerate(slots_left))
+            points_left = tuple(points if index in remaining_categories[group_index] else 0
+                                for index, points in enumerate(points_left))
+            return best(group_index, slots_left, points_left, min(cost_left, remaining_max_cost[group_index]))
+
+        @lru_cache(maxsize=None)
+        def best(group_index, slots_left, points_left, cost_left):
+            # Top entries for groups[group_index:] given what is still available
+            if group_index == len(groups):
+                return ((0, 0, ()),)
+            category_index, location_index, options = groups[group_index]
+            entries = []
+            for (count, cost), picks in options.items():
+                if count > slots_left[location_index] or count > points_left[category_index] or cost > cost_left:
+                    continue
+                rest = lookup(group_index + 1,
+                            slots_left[:location_index] + (slots_left[location_index] - count,) + slots_left[location_index + 1:],
+                            points_left[:category_index] + (points_left[category_index] - count,) + points_left[category_index + 1:],
+                            cost_left - cost)
+                # Both lists are sorted best first, so the pair (i, j) is beaten by at least
+                # (i + 1) * (j + 1) - 1 other pairs and can only matter while that stays below top_k
+                for i, (pick_score, pick_cost, pick_ids) in enumerate(picks):
+                    for j, (rest_score, rest_cost, rest_ids) in enumerate(rest):
+                        if (i + 1) * (j + 1) > top_k:
+                            break
+                        entries.append((pick_score + rest_score, pick_cost + rest_cost, pick_ids + rest_ids))
+            return _merge_top(entries, top_k)
+
+        slots = tuple(self.slot_limits.get(location, 0) for location in LOCATIONS)
+        return lookup(0, slots, points, cost_cap)
+
+    def _group_options(self, score_part, objective_key, category, location, max_level, max_pick, cost_cap, top_k):
+        """
+        Returns the best ways to pick parts from one (category, location) group.
+
+        Parts that score nothing are left out, and so is any part beaten (higher or
+        equal score at lower or equal cost) by enough others that it could always be
+        swapped for one of them. A small knapsack over the remaining parts then keeps
+        the top_k picks for each (number of parts, total cost).
+
+        Returns:
+            dict: Maps (count, cost) to a tuple of (score, cost, part_ids) entries.
+        """
+        cache_key = (objective_key, category, location, max_level, max_pick, cost_cap, top_k)
+        if cache_key in self._group_options_cache:
+            return self._group_options_cache[cache_key]
+
+        scored = []
+        for part in self.catalog.find_parts(category=category, location=location, max_cost=cost_cap):
+            score = score_part(part)
+            if part["level"] <= max_level and score > 0:
+                scored.append((score, part["cost"], part["id"]))
+        scored.sort(key=lambda entry: (-entry[0], entry[1]))
+
+        # Sorted by score then cost, so every part that beats a candidate comes before it
+        keep_threshold = max_pick + top_k - 1
+        kept = []
+        for score, cost, part_id in scored:
+            beaten_by = sum(1 for other_score, other_cost, _ in kept if other_score >= score and other_cost <= cost)
+            if beaten_by < keep_threshold:
+                kept.append((score, cost, part_id))
+
+        options = {(0, 0): ((0, 0, ()),)}
+        for score, cost, part_id in kept:
+            # Iterate over a snapshot so each part is used at most once
+            for (count, total_cost), picks in list(options.items()):
+                if count == max_pick or total_cost + cost > cost_cap:
+                    continue
+                key = (count + 1, total_cost + cost)
+                extended = [(pick_score + score, pick_cost + cost, pick_ids + (part_id,))
+                            for pick_score, pick_cost, pick_ids in picks]
+                options[key] = _merge_top(list(options.get(key, ())) + extended, top_k)
+
+        self._group_options_cache[cache_key] = options
+        return options
@@ -0,0 +1,228 @@
+# doll_state.py
+
+# Battle state of a Doll, stored as bitsets so that the checks made on every hit are
+# single integer operations instead of walks over lists of part dictionaries.
+#
+# A DollLayout is built once per loadout and gives every part a bit. It holds masks of
+# those bits per location (Head/Arm/Torso/Leg) and per timing. A DollState then only
+# needs one integer for the parts still intact, one for the memory fragments still
+# held, and one that packs the madness points of every fetter.
+
+from parts_catalog import LOCATIONS
+
+# Madness points are packed into fields of this many bits, one field per fetter
+MADNESS_FIELD_BITS = 3
+# A fetter with this many madness points has gone mad. It is the only value in a field
+# with the field's top bit set, so "which fetters are mad" is a single AND.
+MAX_MADNESS = 4
+
+
+def _field_mask(fetter_count, bit_in_field):
+    """
+    Returns a mask with bit_in_field set in each of the first fetter_count madness fields.
+    """
+    mask = 0
+    for index in range(fetter_count):
+        mask |= 1 << (index * MADNESS_FIELD_BITS + bit_in_field)
+    return mask
+
+
+class DollLayout:
+    """
+    The fixed part of a Doll's battle state: which part sits on which bit.
+    """
+    def __init__(self, parts):
+        """
+        Initializes the layout and computes its masks.
+
+        Args:
+            parts (list): Part dictionaries (see JSON/doll_catalog_schema.json), basic
+                          and reinforcement parts alike. Bit i stands for parts[i].
+        """
+        self.parts = list(parts)
+        self.all_mask = (1 << len(self.parts)) - 1
+        self.location_masks = {location: 0 for location in LOCATIONS}
+        self.timing_masks = {}
+        for bit, part in enumerate(self.parts):
+            self.location_masks[part["location"]] |= 1 << bit
+            self.timing_masks[part["timing"]] = self.timing_masks.get(part["timing"], 0) | 1 << bit
+
+    @classmethod
+    def from_build(cls, catalog, build):
+        """
+        Creates the layout of a build returned by DollBuilder.best_builds.
+
+        Args:
+            catalog (PartsCatalog): The catalog the build was made from.
+            build (dict): A build with "basic_parts" and "parts" id lists.
+        """
+        return cls([catalog.get(part_id) for part_id in build["basic_parts"] + build["parts"]])
+
+    def parts_in(self, mask):
+        """
+        Returns the part dictionaries whose bits are set in mask, e.g. for display.
+        """
+        parts = []
+        while mask:
+            low_bit = mask & -mask
+            parts.append(self.parts[low_bit.bit_length() - 1])
+            mask ^= low_bit
+        return parts
+
+
+class DollState:
+    """
+    The changing part of a Doll's battle state.
+    """
+    __slots__ = ("layout", "intact", "fragments", "madness", "fetter_count", "_mad_mask")
+
+    def __init__(self, layout, fragment_count=0, fetter_count=0):
+        """
+        Initializes a Doll with every part intact, every fragment held and no madness.
+
+        Args:
+            layout (DollLayout): The Doll's parts.
+            fragment_count (int): Number of memory fragments the Doll holds.
+            fetter_count (int): Number of fetters that track madness points.
+        """
+        self.layout = layout
+        self.intact = layout.all_mask
+        self.fragments = (1 << fragment_count) - 1
+        self.madness = 0
+        self.fetter_count = fetter_count
+        self._mad_mask = _field_mask(fetter_count, MADNESS_FIELD_BITS - 1)
+
+    # --- Parts ---
+
+    def damage(self, location, amount, preferred_mask=None):
+        """
+        Destroys up to amount intact parts at a location.
+
+        Parts in preferred_mask are destroyed first (a player usually chooses which parts
+        to lose); the rest go in layout order.
+
+        Args:
+            location (str): "Head", "Arm", "Torso" or "Leg".
+            amount (int): Points of damage, one part each.
+            preferred_mask (int, optional): Bits of the parts to give up first.
+
+        Returns:
+            tuple: (destroyed_mask, overflow) where overflow is the damage left over
+                   because the location ran out of parts.
+        """
+        candidates = self.intact & self.layout.location_masks[location]
+        destroyed = 0
+        for pool in ((candidates & preferred_mask, candidates) if preferred_mask else (candidates,)):
+            pool &= ~destroyed
+            while amount and pool:
+                low_bit = pool & -pool
+                destroyed |= low_bit
+                pool ^= low_bit
+                amount -= 1
+        self.intact &= ~destroyed
+        return destroyed, amount
+
+    def destroy(self, mask):
+        """
+        Destroys the parts whose bits are set in mask.
+        """
+        self.intact &= ~mask
+
+    def repair(self, mask):
+        """
+        Restores the parts whose bits are set in mask.
+        """
+        self.intact |= mask & self.layout.all_mask
+
+    def has_usable(self, timing):
+        """
+        Returns True if at least one intact part has a maneuver of the given timing.
+        """
+        return bool(self.intact & self.layout.timing_masks.get(timing, 0))
+
+    def usable_count(self, timing):
+        """
+        Returns how many intact parts have a maneuver of the given timing.
+        """
+        return (self.intact & self.layout.timing_masks.get(timing, 0)).bit_count()
+
+    def intact_count(self, location=None):
+        """
+        Returns how many parts are intact, at one location or overall.
+        """
+        if location is None:
+            return self.intact.bit_count()
+        return (self.intact & self.layout.location_masks[location]).bit_count()
+
+    def is_destroyed(self):
+        """
+        Returns True once every part of the Doll has been destroyed.
+        """
+        return self.intact == 0
+
+    # --- Memory fragments ---
+
+    def has_fragment(self, index):
+        """
+        Returns True if the Doll still holds the memory fragment at index.
+        """
+        return bool(self.fragments >> index & 1)
+
+    def lose_fragment(self, index):
+        """
+        Marks the memory fragment at index as lost.
+        """
+        self.fragments &= ~(1 << index)
+
+    def fragment_count(self):
+        """
+        Returns the number of memory fragments the Doll still holds.
+        """
+        return self.fragments.bit_count()
+
+    # --- Madness ---
+
+    def get_madness(self, fetter_index):
+        """
+        Returns the madness points of a fetter.
+        """
+        return self.madness >> (fetter_index * MADNESS_FIELD_BITS) & ((1 << MADNESS_FIELD_BITS) - 1)
+
+    def add_madness(self, fetter_index, amount=1):
+        """
+        Adds (or with a negative amount, removes) madness points, clamped to 0..MAX_MADNESS.
+
+        Returns:
+            bool: True if this change made the fetter go mad.
+        """
+        shift = fetter_index * MADNESS_FIELD_BITS
+        old_value = self.get_madness(fetter_index)
+        new_value = max(0, min(MAX_MADNESS, old_value + amount))
+        self.madness += (new_value - old_value) << shift
+        return new_value == MAX_MADNESS and old_value != MAX_MADNESS
+
+    def mad_fetters_mask(self):
+        """
+        Returns a mask with the top bit of every mad fetter's field set.
+        """
+        return self.madness & self._mad_mask
+
+    def mad_fetter_count(self):
+        """
+        Returns the number of fetters at maximum madness.
+        """
+        return self.mad_fetters_mask().bit_count()
+
+    # --- Snapshots ---
+
+    def snapshot(self):
+        """
+        Returns the state as a tuple of integers, cheap to store and compare.
+        """
+        return (self.intact, self.fragments, self.madness)
+
+    def restore(self, snapshot):
+        """
+        Puts the state back to a tuple returned by snapshot().
+        """
+        self.intact, self.fragments, self.madness = snapshot
@@ -0,0 +1,184 @@
+# edit_history.py
+
+# Undo/redo history for bestiary records.
+# Records are treated as persistent (never mutated): every change copies only the
+# dictionaries and lists on the path to the changed value and shares everything else
+# with the previous version. A history step therefore costs memory proportional to
+# the depth of the change, not to the size of the record.
+
+import sys
+
+# Default amount of memory the history may use before the oldest steps are dropped
+DEFAULT_MEMORY_BUDGET_BYTES = 8 * 1024 * 1024
+
+
+def get_path(record, path):
+    """
+    Returns the value found by following path (a tuple of keys/indexes) into record.
+    """
+    value = record
+    for key in path:
+        value = value[key]
+    return value
+
+
+def assoc_path(record, path, value):
+    """
+    Returns a new record with value stored at path, leaving record untouched.
+
+    Only the containers along the path are copied, so the new record shares every
+    other branch with the old one.
+
+    Args:
+        record (dict or list): The record to start from.
+        path (tuple): Keys (for dicts) or indexes (for lists) leading to the value.
+        value: The new value.
+
+    Returns:
+        tuple: (new_record, copied_bytes) where copied_bytes estimates the memory
+               used by the copied containers and the new value.
+    """
+    if not path:
+        return value, estimate_size(value)
+
+    key = path[0]
+    if isinstance(record, list):
+        child = record[key]
+    else:
+        child = record.get(key, {}) if len(path) > 1 else None
+    new_child, copied_bytes = assoc_path(child, path[1:], value)
+
+    new_record = list(record) if isinstance(record, list) else dict(record)
+    new_record[key] = new_child
+    return new_record, copied_bytes + sys.getsizeof(new_record)
+
+
+def estimate_size(value):
+    """
+    Estimates the memory used by a freshly built value, including nested containers.
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += sys.getsizeof(key) + estimate_size(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            size += estimate_size(item)
+    return size
+
+
+class EditHistory:
+    """
+    A linear undo/redo history of persistent record versions.
+
+    Each version is stored whole, but consecutive versions share all unchanged
+    branches, so only the changed paths take up new memory. When the estimated
+    memory used by the history exceeds the budget, the oldest versions are dropped.
+    """
+    def __init__(self, record, memory_budget=DEFAULT_MEMORY_BUDGET_BYTES):
+        """
+        Initializes the history with a starting record.
+
+        Args:
+            record (dict): The record as it was loaded.
+            memory_budget (int): Maximum estimated bytes kept for undo steps.
+        """
+        self.memory_budget = memory_budget
+        # Parallel lists: versions[i] was produced by a step costing step_costs[i] bytes
+        self.versions = [record]
+        self.step_costs = [0]
+        self.position = 0 # Index of the current version
+        self.memory_used = 0
+
+    @property
+    def current(self):
+        """
+        The record at the current position in the history.
+        """
+        return self.versions[self.position]
+
+    def can_undo(self):
+        return self.position > 0
+
+    def can_redo(self):
+        return self.position < len(self.versions) - 1
+
+    def commit(self, changes):
+        """
+        Applies a list of (path, value) changes as a single undoable step.
+
+        Any redo steps are discarded. Changes that leave a value identical to the
+        current one are skipped, and no step is recorded if nothing changed.
+
+        Args:
+            changes (list): (path, value) pairs, where path is a tuple of keys/indexes.
+
+        Returns:
+            dict: The new current record.
+        """
+        record = self.current
+        step_cost = 0
+        for path, value in changes:
+            try:
+                if get_path(record, path) == value:
+                    continue
+            except (KeyError, IndexError, TypeError):
+                pass
+            record, copied_bytes = assoc_path(record, path, value)
+            step_cost += copied_bytes
+
+        if record is self.current:
+            return record
+
+        # Drop the redo branch
+        for cost in self.step_costs[self.position + 1:]:
+            self.memory_used -= cost
+        del self.versions[self.position + 1:]
+        del self.step_costs[self.position + 1:]
+
+        self.versions.append(record)
+        self.step_costs.append(step_cost)
+        self.position += 1
+        self.memory_used += step_cost
+        self._enforce_budget()
+        return record
+
+    def undo(self):
+        """
+        Moves one step back and returns that record, or None if there is nothing to undo.
+        """
+        if not self.can_undo():
+            return None
+        self.position -= 1
+        return self.current
+
+    def redo(self):
+        """
+        Moves one step forward and returns that record, or None if there is nothing to redo.
+        """
+        if not self.can_redo():
+            return None
+        self.position += 1
+        return self.current
+
+    def reset(self, record):
+        """
+        Clears the history and starts again from record.
+        """
+        self.versions = [record]
+        self.step_costs = [0]
+        self.position = 0
+        self.memory_used = 0
+
+    def _enforce_budget(self):
+        """
+        Drops the oldest versions until the history fits in its memory budget.
+        The current version is always kept.
+        """
+        while self.memory_used > self.memory_budget and self.position > 0:
+            # The cost of the second version is what keeps the first one reachable
+            self.memory_used -= self.step_costs[1]
+            del self.versions[0]
+            del self.step_costs[0]
+            self.step_costs[0] = 0
+            self.position -= 1
@@ -3,18 +3,39 @@
 import tkinter as tk
 from tkinter import scrolledtext # For multi-line text with scrollbars
 import json # To load and save enemy data
+import logging
 import os # For file path operations
 
+from edit_history import EditHistory, DEFAULT_MEMORY_BUDGET_BYTES # Undo/redo with structural sharing
+from dice_odds import maneuver_odds # Exact hit chance and expected damage shown in the maneuver rows
+from bestiary_store import IdCollisionError # Refused ids that differ from a stored one only in case
+from derived_stats import get_derived_stats_cache # Memoized threat and damage figures, invalidated on save
+
 # Define the path for the mock enemy data file
 # In a real game, this would likely be managed by a data loading system
 ENEMY_DATA_FILE = "zombie_data.json"
 
+# Maneuvers are shown as collapsed summary rows, this many per page
+MANEUVERS_PER_PAGE = 20
+
+# Changed fields are saved automatically after this many milliseconds without further edits
+AUTOSAVE_DELAY_MS = 3000
+
+# (lowest, highest) attack modifier and group size the maneuver odds are shown for
+ODDS_MODIFIER_RANGE = (-10, 10)
+ODDS_GROUP_SIZE_RANGE = (1, 999)
+
+# Edits made within this many milliseconds of each other are grouped into one undo step
+UNDO_GROUPING_DELAY_MS = 600
+
+logger = logging.getLogger(__name__)
+
 class EnemyViewer(tk.Frame):
     """
     A frame representing the detailed viewer for a single enemy statblock.
     Allows editing and saving of the statblock data.
     """
-    def __init__(self, master, back_to_parent_callback, enemy_data=None):
+    def __init__(self, master, back_to_parent_callback, enemy_data=None, undo_memory_budget=DEFAULT_MEMORY_BUDGET_BYTES):
         """
         Initializes the EnemyViewer frame.
 
@@ -23,6 +44,7 @@ class EnemyViewer(tk.Frame):
             back_to_parent_callback: A function to call to return to the parent menu.
             enemy_data (dict, optional): The dictionary containing the enemy's statblock data.
                                          Defaults to None, in which case a placeholder is shown.
+            undo_memory_budget (int, optional): Estimated bytes the undo history may use per monster.
         """
         super().__init__(master)
         self.master = master
@@ -32,6 +54,27 @@ class EnemyViewer(tk.Frame):
 
         # Dictionary to hold references to editable Tkinter variables/widgets
         self.editable_fields = {}
+        # Keys of editable_fields changed since the last undo step; maneuvers use ("maneuvers", index)
+        self.dirty_fields = set()
+        self.autosave_job = None # Pending after() id of the debounced autosave
+        self.undo_step_job = None # Pending after() id that groups recent edits into an undo step
+        self.suppress_tracking = False # True while fields are refreshed from the history
+
+        # Every committed edit becomes a new version of the record that shares unchanged parts
+        self.history = EditHistory(enemy_data, memory_budget=undo_memory_budget)
+        self.saved_record = enemy_data # The version last written to disk
+        # Callables called with the record after display_enemy_data has built its widgets
+        self.display_listeners = []
+        # Bestiary store the displayed monster is saved to; None saves to ENEMY_DATA_FILE
+        self.store = None
+        self.maneuver_rows = {} # Widgets of the maneuver rows on the current page, keyed by maneuver index
+        self.derived_stats_label = None # Derived threat and damage line of the basic info panel
+        # Attack modifier and attacking group size the maneuver odds are shown for. They are
+        # not part of the monster, so they are kept when another monster is shown.
+        self.odds_modifier_var = tk.StringVar(value="0")
+        self.odds_group_size_var = tk.StringVar(value="1")
+        self.odds_modifier_var.trace_add("write", lambda *args: self._refresh_maneuver_odds())
+        self.odds_group_size_var.trace_add("write", lambda *args: self._refresh_maneuver_odds())
 
         # Configure the grid to be responsive
         self.grid_rowconfigure(0, weight=0) # For the back button/title/save button
@@ -42,20 +85,48 @@ class EnemyViewer(tk.Frame):
         top_bar_frame = tk.Frame(self, bg="#2c2c2c")
         top_bar_frame.grid(row=0, column=0, sticky="ew", padx=20, pady=20)
         top_bar_frame.grid_columnconfigure(0, weight=1) # Back button column
-        top_bar_frame.grid_columnconfigure(1, weight=1) # Save button column
+        top_bar_frame.grid_columnconfigure(1, weight=1) # Unsaved changes indicator column
+        top_bar_frame.grid_columnconfigure(2, weight=0) # Undo button column
+        top_bar_frame.grid_columnconfigure(3, weight=0) # Redo button column
+        top_bar_frame.grid_columnconfigure(4, weight=0) # Save button column
 
         # --- Back button ---
         back_button = tk.Label(top_bar_frame, text="❮ Back to Enemy Data", font=("Helvetica", 12, "underline"),
                                fg="#f0f0f0", bg="#2c2c2c", cursor="hand2")
         back_button.grid(row=0, column=0, sticky="nw")
-        back_button.bind("<Button-1>", lambda e: self.back_to_parent_callback())
+        back_button.bind("<Button-1>", lambda e: self._on_back())
+
+        # --- Unsaved changes indicator ---
+        self.save_status_label = tk.Label(top_bar_frame, text="", font=("Helvetica", 10, "italic"),
+                                          fg="#f0f0f0", bg="#2c2c2c")
+        self.save_status_label.grid(row=0, column=1, padx=10, sticky="e")
+
+        # --- Undo / Redo buttons ---
+        self.undo_button = tk.Button(top_bar_frame, text="↶ Undo", font=("Helvetica", 12),
+                                     pady=5, bg="#444444", fg="#f0f0f0",
+                                     relief="raised", bd=3, state="disabled",
+                                     command=self.undo)
+        self.undo_button.grid(row=0, column=2, padx=(0, 5), sticky="ne")
+        self.redo_button = tk.Button(top_bar_frame, text="↷ Redo", font=("Helvetica", 12),
+                                     pady=5, bg="#444444", fg="#f0f0f0",
+                                     relief="raised", bd=3, state="disabled",
+                                     command=self.redo)
+        self.redo_button.grid(row=0, column=3, padx=(0, 10), sticky="ne")
 
         # --- Save Changes button ---
         save_button = tk.Button(top_bar_frame, text="Save Changes", font=("Helvetica", 12),
                                 width=15, pady=5, bg="#444444", fg="#f0f0f0",
                                 relief="raised", bd=3,
                                 command=self._collect_and_save_data)
-        save_button.grid(row=0, column=1, sticky="ne")
+        save_button.grid(row=0, column=4, sticky="ne")
+
+        # Keyboard shortcuts of the window, only acting while the viewer is on screen.
+        # Removed again in destroy(), so a destroyed viewer is not kept alive by them.
+        toplevel = self.winfo_toplevel()
+        self.shortcut_bindings = [
+            (sequence, toplevel.bind(sequence, lambda e, action=action: self._on_shortcut(action), add="+"))
+            for sequence, action in (("<Control-z>", self.undo), ("<Control-y>", self.redo), ("<Control-Z>", self.redo))
+        ]
 
 
         # --- Main content frame for enemy details ---
@@ -65,21 +136,37 @@ class EnemyViewer(tk.Frame):
 
         self.display_enemy_data(self.current_enemy_data)
 
-    def display_enemy_data(self, enemy_data):
+    def display_enemy_data(self, enemy_data, store=None):
         """
         Populates the viewer with the provided enemy data, creating editable fields.
         Clears previous data if any.
+
+        Args:
+            enemy_data (dict): The monster to show.
+            store (BestiaryStore, optional): Where the monster is saved. Defaults to ENEMY_DATA_FILE.
         """
-        print("DEBUG: display_enemy_data called.")
+        logger.debug("display_enemy_data called.")
+        # Don't lose edits to the monster that is being replaced
+        if self._has_unsaved_changes():
+            self._collect_and_save_data()
+        self.store = store
+        self.dirty_fields = set()
+        self.history.reset(enemy_data)
+        self.saved_record = enemy_data
+        self._update_save_status()
+
         # Clear existing widgets in the detail_frame
         for widget in self.detail_frame.winfo_children():
             widget.destroy()
         self.editable_fields = {} # Reset editable fields dictionary
-        print(f"DEBUG: editable_fields reset: {self.editable_fields}")
+        self.maneuver_rows = {}
+        self.derived_stats_label = None
+        logger.debug("editable_fields reset: %s", self.editable_fields)
 
         if not enemy_data:
             tk.Label(self.detail_frame, text="No enemy data to display.", font=("Helvetica", 16),
                      fg="black", bg="#cccccc").pack(pady=50)
+            self._notify_display_listeners(enemy_data)
             return
 
         self.current_enemy_data = enemy_data # Update current data
@@ -96,6 +183,7 @@ class EnemyViewer(tk.Frame):
                               justify="center", relief="flat", bd=0) # Flat relief to blend with frame
         name_entry.grid(row=0, column=0, padx=5, pady=5, sticky="ew")
         self.editable_fields["name"] = name_var
+        self._track_variable(name_var, "name")
 
 
         # --- Basic Info Section (Horizontal Layout) ---
@@ -124,8 +212,10 @@ class EnemyViewer(tk.Frame):
                                    relief="sunken", bd=2, justify="center")
         id_value_entry.grid(row=1, column=0, padx=2, pady=2, sticky="ew")
         self.editable_fields["id"] = id_value_var
-        print(f"DEBUG: 'id' key added to editable_fields (explicitly): id -> {id_value_var.get()}")
-        print(f"DEBUG: editable_fields after explicit 'id' add: {list(self.editable_fields.keys())}")
+        self._track_variable(id_value_var, "id")
+        if logger.isEnabledFor(logging.DEBUG): # Skip the Tk query unless the line is logged
+            logger.debug("'id' key added to editable_fields (explicitly): id -> %s", id_value_var.get())
+            logger.debug("editable_fields after explicit 'id' add: %s", list(self.editable_fields))
 
 
         # Helper function to create an "object" (label) and its "value" (entry)
@@ -143,6 +233,7 @@ class EnemyViewer(tk.Frame):
                                    relief="sunken", bd=2, justify="center")
             value_entry.grid(row=1, column=col_offset, padx=2, pady=2, sticky="ew")
             self.editable_fields[value_key] = value_var
+            self._track_variable(value_var, value_key)
 
 
         threat_level = enemy_data.get("threatLevel", {})
@@ -152,71 +243,44 @@ class EnemyViewer(tk.Frame):
         create_horizontal_info_pair(basic_info_panel_frame, 4, "Threat Level (Per Spawn Group):", "threatLevel_per_spawn_group", threat_level.get('per_spawn_group', 'N/A'))
         create_horizontal_info_pair(basic_info_panel_frame, 6, "Max Action Points:", "maximumActionPoints", enemy_data.get('maximumActionPoints', 'N/A'))
 
+        # Derived figures of the saved record; refreshed when it is saved
+        self.derived_stats_label = tk.Label(basic_info_panel_frame, text=self._derived_stats_text(enemy_data),
+                                            font=("Helvetica", 9), fg="#333333", bg="#cccccc", anchor="w")
+        self.derived_stats_label.grid(row=2, column=0, columnspan=8, padx=2, pady=(4, 0), sticky="ew")
+
 
         # --- Maneuvers Section ---
         maneuvers_heading = tk.Label(self.detail_frame, text="Maneuvers",
                                      font=("Quantico", 16, "bold"), fg="black", bg="#cccccc",
                                      relief="raised", bd=3)
         maneuvers_heading.pack(pady=(15, 5), anchor="w", fill="x")
+
+        # The odds in the maneuver rows are worked out for these two values
+        odds_frame = tk.Frame(self.detail_frame, bg="#cccccc")
+        odds_frame.pack(fill="x")
+        tk.Label(odds_frame, text="Odds for attack modifier:", font=("Helvetica", 10),
+                 fg="black", bg="#cccccc").pack(side="left")
+        tk.Spinbox(odds_frame, from_=ODDS_MODIFIER_RANGE[0], to=ODDS_MODIFIER_RANGE[1], width=4, textvariable=self.odds_modifier_var,
+                   font=("Helvetica", 10)).pack(side="left", padx=(2, 10))
+        tk.Label(odds_frame, text="Group size:", font=("Helvetica", 10),
+                 fg="black", bg="#cccccc").pack(side="left")
+        tk.Spinbox(odds_frame, from_=ODDS_GROUP_SIZE_RANGE[0], to=ODDS_GROUP_SIZE_RANGE[1], width=5, textvariable=self.odds_group_size_var,
+                   font=("Helvetica", 10)).pack(side="left", padx=(2, 0))
         
-        maneuvers_panel_frame = tk.Frame(self.detail_frame, bg="#cccccc", padx=10, pady=10, relief="raised", bd=2)
-        maneuvers_panel_frame.pack(fill="x", pady=5)
+        self.maneuvers_panel_frame = tk.Frame(self.detail_frame, bg="#cccccc", padx=10, pady=10, relief="raised", bd=2)
+        self.maneuvers_panel_frame.pack(fill="x", pady=5)
 
         maneuvers = enemy_data.get("maneuvers", [])
-        self.editable_fields["maneuvers"] = [] # Store maneuver data as a list of dicts/vars
-        
+        # One slot per maneuver. A slot stays empty until its editor is expanded,
+        # so a monster with hundreds of maneuvers only pays for the summary rows.
+        self.editable_fields["maneuvers"] = [{} for _ in maneuvers]
+        self.maneuver_rows = {} # Widgets of the rows on the current page, keyed by maneuver index
+        self.maneuver_page = 0
+
         if maneuvers:
-            for i, maneuver in enumerate(maneuvers):
-                maneuver_data = {} # To store variables for this specific maneuver
-                self.editable_fields["maneuvers"].append(maneuver_data)
-
-                # Maneuver ID label (object - raised)
-                maneuver_id_label = tk.Label(maneuvers_panel_frame, text=f"{i+1}. {maneuver.get('id', 'N/A')}",
-                                             font=("Quantico", 12, "bold", "underline"), fg="black", bg="#cccccc",
-                                             relief="raised", bd=2)
-                maneuver_id_label.pack(anchor="w", pady=(5, 0))
-
-                detail_frame_inner = tk.Frame(maneuvers_panel_frame, bg="#cccccc", padx=5, pady=5, relief="raised", bd=1) # Changed bg and relief
-                detail_frame_inner.pack(fill="x", padx=10, pady=2)
-                detail_frame_inner.grid_columnconfigure(0, weight=0)
-                detail_frame_inner.grid_columnconfigure(1, weight=1)
-
-                row_idx = 0
-                def add_editable_detail_row(parent, label_text, value_key, initial_value, is_text_area=False):
-                    nonlocal row_idx
-                    tk.Label(parent, text=label_text, font=("Quantico", 10, "bold"), fg="black", bg="#cccccc").grid(row=row_idx, column=0, sticky="w", padx=2) # Changed font/fg/bg
-                    
-                    if is_text_area:
-                        text_widget = scrolledtext.ScrolledText(parent, wrap=tk.WORD, height=3,
-                                                               font=("Helvetica", 10), fg="#f0f0f0", bg="#5a5a5a",
-                                                               insertbackground="#f0f0f0", relief="sunken", bd=1)
-                        text_widget.insert(tk.END, str(initial_value))
-                        text_widget.grid(row=row_idx, column=1, sticky="ew", padx=2, pady=2)
-                        maneuver_data[value_key] = text_widget # Store widget reference directly
-                    else:
-                        value_var = tk.StringVar(value=str(initial_value))
-                        value_entry = tk.Entry(parent, textvariable=value_var,
-                                               font=("Helvetica", 10), fg="#f0f0f0", bg="#5a5a5a",
-                                               relief="sunken", bd=1)
-                        value_entry.grid(row=row_idx, column=1, sticky="ew", padx=2, pady=2)
-                        maneuver_data[value_key] = value_var # Store StringVar reference
-                    row_idx += 1
-
-                add_editable_detail_row(detail_frame_inner, "Timing:", "timing", maneuver.get('timing', 'N/A'))
-                add_editable_detail_row(detail_frame_inner, "Cost:", "cost", maneuver.get('cost', 'N/A'))
-                add_editable_detail_row(detail_frame_inner, "Range:", "range", maneuver.get('range', 'N/A'))
-                add_editable_detail_row(detail_frame_inner, "Description:", "description", maneuver.get('description', 'No description.'), is_text_area=True)
-                
-                damage = maneuver.get('damage', {})
-                if damage:
-                    add_editable_detail_row(detail_frame_inner, "Base Damage:", "damage_base_damage", damage.get('base_damage', 'N/A'))
-                    add_editable_detail_row(detail_frame_inner, "Effect:", "damage_effect", damage.get('effect', 'N/A'))
-                    if "formula" in damage: # Only add if formula exists
-                        add_editable_detail_row(detail_frame_inner, "Formula:", "damage_formula", damage.get('formula', 'N/A'))
-                
-                tk.Frame(maneuvers_panel_frame, height=1, bg="#555555").pack(fill="x", pady=5) # Separator
+            self._render_maneuver_page()
         else:
-            tk.Label(maneuvers_panel_frame, text="No maneuvers listed.", font=("Helvetica", 10),
+            tk.Label(self.maneuvers_panel_frame, text="No maneuvers listed.", font=("Helvetica", 10),
                      fg="#f0f0f0", bg="#4a4a4a").pack(anchor="w")
 
         # --- Flavor Text Section ---
@@ -232,122 +296,560 @@ class EnemyViewer(tk.Frame):
                                                      font=("Helvetica", 10), fg="#f0f0f0", bg="#5a5a5a",
                                                      insertbackground="#f0f0f0", relief="sunken", bd=2)
         flavor_text_widget.pack(fill="x", pady=5)
-        flavor_text_widget.insert(tk.END, f"Description:\n{flavor.get('description', 'N/A')}\n\n")
-        flavor_text_widget.insert(tk.END, f"Tactics:\n{flavor.get('tactics', 'N/A')}\n\n")
-        flavor_text_widget.insert(tk.END, f"Roleplay:\n{flavor.get('roleplay', 'N/A')}")
+        flavor_text_widget.insert(tk.END, self._format_flavor(flavor))
         self.editable_fields["flavor_text"] = flavor_text_widget # Store widget reference
+        self._track_text_widget(flavor_text_widget, "flavor_text")
 
-    def _collect_and_save_data(self):
+        self._notify_display_listeners(enemy_data)
+
+    def _notify_display_listeners(self, enemy_data):
+        for listener in list(self.display_listeners):
+            listener(enemy_data)
+
+    def _render_maneuver_page(self):
         """
-        Collects data from all editable fields and saves it to the JSON file.
+        Creates the collapsed summary rows for the current page of maneuvers.
+        Edits in editors on the page being left are committed to the history first,
+        so paging never loses an edit.
         """
-        print(f"DEBUG: _collect_and_save_data called. Type of editable_fields: {type(self.editable_fields)}. editable_fields keys: {list(self.editable_fields.keys())}")
-        updated_data = {}
+        self._commit_undo_step()
+        for index, row in self.maneuver_rows.items():
+            if row["editor"] is not None:
+                self.editable_fields["maneuvers"][index] = {}
+        self.maneuver_rows = {}
+        for widget in self.maneuvers_panel_frame.winfo_children():
+            widget.destroy()
+
+        maneuvers = self.current_enemy_data.get("maneuvers", [])
+        page_count = (len(maneuvers) + MANEUVERS_PER_PAGE - 1) // MANEUVERS_PER_PAGE
+        start = self.maneuver_page * MANEUVERS_PER_PAGE
+        for index in range(start, min(start + MANEUVERS_PER_PAGE, len(maneuvers))):
+            self._create_maneuver_row(self.maneuvers_panel_frame, index)
+
+        # Pagination controls are only shown once a monster has more than one page of maneuvers
+        if page_count > 1:
+            nav_frame = tk.Frame(self.maneuvers_panel_frame, bg="#cccccc")
+            nav_frame.pack(fill="x", pady=(5, 0))
+            nav_frame.grid_columnconfigure(1, weight=1)
+
+            if self.maneuver_page > 0:
+                prev_label = tk.Label(nav_frame, text="❮ Previous", font=("Helvetica", 10, "underline"),
+                                      fg="black", bg="#cccccc", cursor="hand2")
+                prev_label.grid(row=0, column=0, sticky="w")
+                prev_label.bind("<Button-1>", lambda e: self._change_maneuver_page(-1))
+
+            tk.Label(nav_frame, text=f"Page {self.maneuver_page + 1} of {page_count} ({len(maneuvers)} maneuvers)",
+                     font=("Helvetica", 10), fg="black", bg="#cccccc").grid(row=0, column=1)
+
+            if self.maneuver_page < page_count - 1:
+                next_label = tk.Label(nav_frame, text="Next ❯", font=("Helvetica", 10, "underline"),
+                                      fg="black", bg="#cccccc", cursor="hand2")
+                next_label.grid(row=0, column=2, sticky="e")
+                next_label.bind("<Button-1>", lambda e: self._change_maneuver_page(1))
+
+    def _change_maneuver_page(self, step):
+        """
+        Moves the maneuver list forward or backward by the given number of pages.
+        """
+        self.maneuver_page += step
+        self._render_maneuver_page()
 
+    def _maneuver_summary_text(self, index, maneuver, expanded):
+        """
+        Returns the one-line summary shown for a maneuver row.
+        """
+        arrow = "▾" if expanded else "▸"
+        return (f"{arrow} {index + 1}. {maneuver.get('id', 'N/A')}    "
+                f"Timing: {maneuver.get('timing', 'N/A')} | Cost: {maneuver.get('cost', 'N/A')} | "
+                f"Range: {maneuver.get('range', 'N/A')}{self._odds_text(maneuver)}")
+
+    def _odds_text(self, maneuver):
+        """
+        Returns the hit chance and expected damage of a maneuver for the summary row,
+        or "" if it deals no damage or the odds settings are not numbers.
+        """
         try:
-            # Retrieve 'id' and 'name' before the main try block for robustness
-            enemy_id = self.editable_fields["id"].get()
-            enemy_name = self.editable_fields["name"].get()
+            modifier = int(self.odds_modifier_var.get())
+            group_size = int(self.odds_group_size_var.get())
+        except ValueError:
+            return ""
+        # The spinboxes only bound their arrows; typed values are clamped to the same ranges
+        modifier = min(max(modifier, ODDS_MODIFIER_RANGE[0]), ODDS_MODIFIER_RANGE[1])
+        group_size = min(max(group_size, ODDS_GROUP_SIZE_RANGE[0]), ODDS_GROUP_SIZE_RANGE[1])
+        # Memoized per table, so refreshing every row on each spinbox click stays cheap
+        odds = maneuver_odds(maneuver, modifier, group_size)
+        if odds is None:
+            return ""
+        return (f" | Hit {odds.hit_chance:.0%} (crit {odds.critical_chance:.0%}), "
+                f"avg damage {odds.expected_damage:.2f}")
+
+    def _refresh_maneuver_odds(self):
+        """
+        Updates the odds in the maneuver rows of the current page after the attack
+        modifier or group size changed.
+        """
+        for index, row in self.maneuver_rows.items():
+            expanded = row["editor"] is not None and row["editor"].winfo_ismapped()
+            maneuver = self._collect_maneuver(index) if expanded else self._maneuver_source(index)
+            row["summary"].configure(text=self._maneuver_summary_text(index, maneuver, expanded))
 
-            print(f"DEBUG: Retrieved ID: {enemy_id}, Name: {enemy_name}")
+    def _create_maneuver_row(self, parent, index):
+        """
+        Creates a collapsed summary row for a maneuver. The editor is built on first expand.
+        """
+        row_frame = tk.Frame(parent, bg="#cccccc")
+        row_frame.pack(fill="x")
 
-            updated_data["id"] = enemy_id
-            updated_data["name"] = enemy_name
-            
-            # Safely convert to int, handle potential ValueError
-            threat_base = 0
-            try:
-                threat_base = int(self.editable_fields["threatLevel_base"].get())
-            except ValueError:
-                print("Warning: Threat Level (Base) is not a valid number. Using 0.")
-            
-            threat_per_spawn = 0
+        summary_label = tk.Label(row_frame, text=self._maneuver_summary_text(index, self._maneuver_source(index), False),
+                                 font=("Quantico", 12, "bold"), fg="black", bg="#cccccc",
+                                 relief="raised", bd=2, anchor="w", cursor="hand2")
+        summary_label.pack(fill="x", pady=(5, 0))
+        summary_label.bind("<Button-1>", lambda e, i=index: self._toggle_maneuver_editor(i))
+
+        tk.Frame(row_frame, height=1, bg="#555555").pack(fill="x", side="bottom", pady=5) # Separator
+
+        self.maneuver_rows[index] = {"frame": row_frame, "summary": summary_label, "editor": None}
+
+    def _toggle_maneuver_editor(self, index):
+        """
+        Expands or collapses the editor of a maneuver row, building it the first time.
+        """
+        row = self.maneuver_rows[index]
+        editor = row["editor"]
+        if editor is None:
+            editor = self._build_maneuver_editor(row["frame"], index)
+            row["editor"] = editor
+
+        if editor.winfo_ismapped():
+            editor.pack_forget()
+            # Refresh the summary so it reflects any edits made while expanded
+            row["summary"].configure(text=self._maneuver_summary_text(index, self._collect_maneuver(index), False))
+        else:
+            editor.pack(fill="x", padx=10, pady=2, after=row["summary"])
+            row["summary"].configure(text=self._maneuver_summary_text(index, self._maneuver_source(index), True))
+
+    def _build_maneuver_editor(self, parent, index):
+        """
+        Creates the editable detail rows for a single maneuver and registers their variables.
+        """
+        maneuver = self._maneuver_source(index)
+        maneuver_data = {} # To store variables for this specific maneuver
+        self.editable_fields["maneuvers"][index] = maneuver_data
+
+        detail_frame_inner = tk.Frame(parent, bg="#cccccc", padx=5, pady=5, relief="raised", bd=1)
+        detail_frame_inner.grid_columnconfigure(0, weight=0)
+        detail_frame_inner.grid_columnconfigure(1, weight=1)
+
+        row_idx = 0
+        def add_editable_detail_row(label_text, value_key, initial_value, is_text_area=False):
+            nonlocal row_idx
+            tk.Label(detail_frame_inner, text=label_text, font=("Quantico", 10, "bold"), fg="black", bg="#cccccc").grid(row=row_idx, column=0, sticky="w", padx=2)
+
+            if is_text_area:
+                text_widget = scrolledtext.ScrolledText(detail_frame_inner, wrap=tk.WORD, height=3,
+                                                       font=("Helvetica", 10), fg="#f0f0f0", bg="#5a5a5a",
+                                                       insertbackground="#f0f0f0", relief="sunken", bd=1)
+                text_widget.insert(tk.END, str(initial_value))
+                text_widget.grid(row=row_idx, column=1, sticky="ew", padx=2, pady=2)
+                maneuver_data[value_key] = text_widget # Store widget reference directly
+                self._track_text_widget(text_widget, ("maneuvers", index))
+            else:
+                value_var = tk.StringVar(value=str(initial_value))
+                value_entry = tk.Entry(detail_frame_inner, textvariable=value_var,
+                                       font=("Helvetica", 10), fg="#f0f0f0", bg="#5a5a5a",
+                                       relief="sunken", bd=1)
+                value_entry.grid(row=row_idx, column=1, sticky="ew", padx=2, pady=2)
+                maneuver_data[value_key] = value_var # Store StringVar reference
+                self._track_variable(value_var, ("maneuvers", index))
+            row_idx += 1
+
+        add_editable_detail_row("Timing:", "timing", maneuver.get('timing', 'N/A'))
+        add_editable_detail_row("Cost:", "cost", maneuver.get('cost', 'N/A'))
+        add_editable_detail_row("Range:", "range", maneuver.get('range', 'N/A'))
+        add_editable_detail_row("Description:", "description", maneuver.get('description', 'No description.'), is_text_area=True)
+
+        damage = maneuver.get('damage', {})
+        if damage:
+            add_editable_detail_row("Base Damage:", "damage_base_damage", damage.get('base_damage', 'N/A'))
+            add_editable_detail_row("Effect:", "damage_effect", damage.get('effect', 'N/A'))
+            if "formula" in damage: # Only add if formula exists
+                add_editable_detail_row("Formula:", "damage_formula", damage.get('formula', 'N/A'))
+
+        return detail_frame_inner
+
+    def _maneuver_source(self, index):
+        """
+        Returns the maneuver at the given index as of the latest undo step.
+        """
+        return self.current_enemy_data["maneuvers"][index]
+
+    def _collect_maneuver(self, index):
+        """
+        Builds the maneuver dictionary at the given index from its editor,
+        or returns the stored data if the editor was never built.
+        """
+        maneuver_vars = self.editable_fields["maneuvers"][index]
+        source = self._maneuver_source(index)
+        if not maneuver_vars:
+            return source
+
+        maneuver = {
+            "id": source.get("id", "N/A"),
+            "timing": maneuver_vars["timing"].get(),
+            "cost": 0, # Default
+            "range": 0, # Default
+            "description": maneuver_vars["description"].get("1.0", tk.END).strip()
+        }
+        try:
+            maneuver["cost"] = int(maneuver_vars["cost"].get())
+        except ValueError:
+            logger.warning("Cost for maneuver '%s' is not a valid number. Using 0.", maneuver['id'])
+        try:
+            maneuver["range"] = int(maneuver_vars["range"].get())
+        except ValueError:
+            logger.warning("Range for maneuver '%s' is not a valid number. Using 0.", maneuver['id'])
+
+        damage = {}
+        if "damage_base_damage" in maneuver_vars:
+            base_damage = 0
             try:
-                threat_per_spawn = int(self.editable_fields["threatLevel_per_spawn_group"].get())
+                base_damage = int(maneuver_vars["damage_base_damage"].get())
             except ValueError:
-                print("Warning: Threat Level (Per Spawn Group) is not a valid number. Using 0.")
+                logger.warning("Base Damage for maneuver '%s' is not a valid number. Using 0.", maneuver['id'])
+            damage["base_damage"] = base_damage
+
+        if "damage_effect" in maneuver_vars:
+            damage["effect"] = maneuver_vars["damage_effect"].get()
+        if "damage_formula" in maneuver_vars:
+            damage["formula"] = maneuver_vars["damage_formula"].get()
+        if damage:
+            maneuver["damage"] = damage
+        return maneuver
+
+    def _track_variable(self, variable, field_key):
+        """
+        Marks field_key as dirty whenever the given Tkinter variable is written.
+        """
+        variable.trace_add("write", lambda *args: self._mark_dirty(field_key))
+
+    def _track_text_widget(self, text_widget, field_key):
+        """
+        Marks field_key as dirty whenever the given text widget is modified.
+        The widget's modified flag is reset after each change so the next edit fires again.
+        """
+        text_widget.edit_modified(False) # Ignore the initial insert
+        def on_modified(event):
+            if text_widget.edit_modified():
+                text_widget.edit_modified(False)
+                self._mark_dirty(field_key)
+        text_widget.bind("<<Modified>>", on_modified)
+
+    def _mark_dirty(self, field_key):
+        """
+        Records a changed field and (re)starts the undo grouping and autosave countdowns.
+        """
+        if self.suppress_tracking:
+            return
+        self.dirty_fields.add(field_key)
+        self._update_save_status()
+        if self.undo_step_job is not None:
+            self.after_cancel(self.undo_step_job)
+        self.undo_step_job = self.after(UNDO_GROUPING_DELAY_MS, self._commit_undo_step)
+        self._schedule_autosave()
+
+    def _schedule_autosave(self):
+        """
+        (Re)starts the autosave countdown.
+        """
+        self._cancel_autosave()
+        self.autosave_job = self.after(AUTOSAVE_DELAY_MS, self._autosave)
+
+    def _cancel_autosave(self):
+        """
+        Cancels a scheduled autosave, if any.
+        """
+        if self.autosave_job is not None:
+            self.after_cancel(self.autosave_job)
+            self.autosave_job = None
+
+    def _autosave(self):
+        """
+        Flushes unsaved changes after a period of inactivity.
+        """
+        self.autosave_job = None
+        if self._has_unsaved_changes():
+            self._collect_and_save_data()
 
-            max_ap = 0
+    def _derived_stats_text(self, record):
+        """
+        Returns the one-line summary of the record's threat, expected damage and best
+        maneuvers, taken from the shared derived-stats cache.
+        """
+        stats = get_derived_stats_cache().get(record)
+        text = (f"Threat {stats.threat} (+{stats.threat_per_group} per extra group) | "
+                f"Damage per turn {stats.damage_per_turn:.2f} | Damage per AP {stats.damage_per_ap:.2f}")
+        if stats.best_maneuvers:
+            text += " | Best: " + ", ".join(f"{timing or 'N/A'} {maneuver_id}"
+                                            for timing, maneuver_id in sorted(stats.best_maneuvers.items()))
+        return text
+
+    def _has_unsaved_changes(self):
+        """
+        Returns True if there are edits that have not been written to disk.
+        """
+        return bool(self.dirty_fields) or self.history.current is not self.saved_record
+
+    def _update_save_status(self):
+        """
+        Shows or clears the unsaved changes indicator and refreshes the undo/redo buttons.
+        """
+        if self._has_unsaved_changes():
+            self.save_status_label.configure(text="● Unsaved changes", fg="#e6b450")
+        else:
+            self.save_status_label.configure(text="", fg="#f0f0f0")
+        self.undo_button.configure(state="normal" if self.dirty_fields or self.history.can_undo() else "disabled")
+        self.redo_button.configure(state="normal" if self.history.can_redo() else "disabled")
+
+    def reload_from_disk(self, record):
+        """
+        Shows a version of the displayed monster that was written by someone else, e.g. a
+        co-GM editing the file. Unsaved edits win: they are kept and replace the file on
+        the next save.
+
+        Args:
+            record (dict): The monster as it is now on disk, or None if its file was removed.
+        """
+        if record == self.saved_record:
+            return # Our own save coming back
+        if self._has_unsaved_changes():
+            logger.warning("%s changed on disk while being edited; keeping the edits.",
+                           self.saved_record.get("id") if self.saved_record else "The monster")
+            self.save_status_label.configure(text="● Changed on disk; saving will replace it", fg="#e6b450")
+            return
+        if record is None:
+            self.save_status_label.configure(text="● Removed on disk; saving will restore it", fg="#e6b450")
+            return
+        logger.info("Reloading %s, which changed on disk.", record.get("id"))
+        self.display_enemy_data(record, self.store)
+
+    def _on_back(self):
+        """
+        Saves any pending changes before returning to the parent menu.
+        """
+        if self._has_unsaved_changes():
+            self._collect_and_save_data()
+        self.back_to_parent_callback()
+
+    def _read_int_field(self, field_key, field_label):
+        """
+        Reads an editable field as an integer, falling back to 0 with a warning.
+        """
+        try:
+            return int(self.editable_fields[field_key].get())
+        except ValueError:
+            logger.warning("%s is not a valid number. Using 0.", field_label)
+            return 0
+
+    def _dirty_field_change(self, field_key):
+        """
+        Returns the (path, value) change for one dirty field, where path leads into the record.
+        """
+        if field_key in ("id", "name"):
+            return (field_key,), self.editable_fields[field_key].get()
+        if field_key == "threatLevel_base":
+            return ("threatLevel", "base"), self._read_int_field(field_key, "Threat Level (Base)")
+        if field_key == "threatLevel_per_spawn_group":
+            return ("threatLevel", "per_spawn_group"), self._read_int_field(field_key, "Threat Level (Per Spawn Group)")
+        if field_key == "maximumActionPoints":
+            return ("maximumActionPoints",), self._read_int_field(field_key, "Maximum Action Points")
+        if field_key == "flavor_text":
+            return ("flavor",), self._collect_flavor()
+        if isinstance(field_key, tuple) and field_key[0] == "maneuvers":
+            return field_key, self._collect_maneuver(field_key[1])
+        raise KeyError(field_key)
+
+    def _commit_undo_step(self):
+        """
+        Turns the dirty fields into a single undo step. Only the changed paths of the
+        record are copied; everything else is shared with the previous version.
+        """
+        if self.undo_step_job is not None:
+            self.after_cancel(self.undo_step_job)
+            self.undo_step_job = None
+        if not self.dirty_fields:
+            return
+
+        changes = [self._dirty_field_change(field_key) for field_key in self.dirty_fields]
+        self.current_enemy_data = self.history.commit(changes)
+        self.dirty_fields = set()
+        self._update_save_status()
+
+    def _on_shortcut(self, action):
+        """
+        Runs an undo/redo shortcut of the window while the viewer is on screen.
+
+        Returns:
+            str: "break" when the viewer handled the key, so no later binding of the
+                 window acts on it; None while the viewer is hidden.
+        """
+        if not self.winfo_ismapped():
+            return None
+        action()
+        return "break" # Handled: no other window binding runs
+
+    def destroy(self):
+        """
+        Removes the viewer's shortcut bindings from its window, then destroys the viewer.
+        """
+        toplevel = self.winfo_toplevel()
+        for sequence, funcid in self.shortcut_bindings:
+            # unbind(sequence, funcid) would also drop the other bindings of the sequence,
+            # so only this viewer's line is removed from the script
             try:
-                max_ap = int(self.editable_fields["maximumActionPoints"].get())
-            except ValueError:
-                print("Warning: Maximum Action Points is not a valid number. Using 0.")
-
-            updated_data["threatLevel"] = {
-                "base": threat_base,
-                "per_spawn_group": threat_per_spawn
-            }
-            updated_data["maximumActionPoints"] = max_ap
-
-            # Collect maneuvers
-            updated_maneuvers = []
-            for maneuver_vars in self.editable_fields["maneuvers"]:
-                maneuver = {
-                    "id": maneuver_vars["id"].get() if isinstance(maneuver_vars["id"], tk.StringVar) else maneuver_vars["id"].cget("text"),
-                    "timing": maneuver_vars["timing"].get(),
-                    "cost": 0, # Default
-                    "range": 0, # Default
-                    "description": maneuver_vars["description"].get("1.0", tk.END).strip()
-                }
-                try:
-                    maneuver["cost"] = int(maneuver_vars["cost"].get())
-                except ValueError:
-                    print(f"Warning: Cost for maneuver '{maneuver['id']}' is not a valid number. Using 0.")
-                try:
-                    maneuver["range"] = int(maneuver_vars["range"].get())
-                except ValueError:
-                    print(f"Warning: Range for maneuver '{maneuver['id']}' is not a valid number. Using 0.")
-
-                damage = {}
-                if "damage_base_damage" in maneuver_vars:
-                    base_damage = 0
-                    try:
-                        base_damage = int(maneuver_vars["damage_base_damage"].get())
-                    except ValueError:
-                        print(f"Warning: Base Damage for maneuver '{maneuver['id']}' is not a valid number. Using 0.")
-                    damage["base_damage"] = base_damage
-                
-                if "damage_effect" in maneuver_vars:
-                    damage["effect"] = maneuver_vars["damage_effect"].get()
-                if "damage_formula" in maneuver_vars:
-                    damage["formula"] = maneuver_vars["damage_formula"].get()
-                if damage:
-                    maneuver["damage"] = damage
-                updated_maneuvers.append(maneuver)
-            updated_data["maneuvers"] = updated_maneuvers
-
-            # Collect flavor text
-            flavor_text_content = self.editable_fields["flavor_text"].get("1.0", tk.END).strip()
-            flavor_parts = flavor_text_content.split("\n\n") 
-            
-            description = ""
-            tactics = ""
-            roleplay = ""
-
-            if len(flavor_parts) > 0 and flavor_parts[0].startswith("Description:\n"):
-                description = flavor_parts[0].replace("Description:\n", "").strip()
-            if len(flavor_parts) > 1 and flavor_parts[1].startswith("Tactics:\n"):
-                tactics = flavor_parts[1].replace("Tactics:\n", "").strip()
-            if len(flavor_parts) > 2 and flavor_parts[2].startswith("Roleplay:\n"):
-                roleplay = flavor_parts[2].replace("Roleplay:\n", "").strip()
-
-            updated_data["flavor"] = {
-                "description": description,
-                "tactics": tactics,
-                "roleplay": roleplay
-            }
-            
-            # Save to JSON file
-            with open(ENEMY_DATA_FILE, 'w') as f:
-                json.dump(updated_data, f, indent=4)
-            print(f"Enemy data saved successfully to {ENEMY_DATA_FILE}")
-            self.current_enemy_data = updated_data # Update current data in memory
-            print("DEBUG: Save operation completed.")
-            
+                script = toplevel.bind(sequence)
+                toplevel.bind(sequence, "\n".join(line for line in script.split("\n") if funcid not in line))
+                toplevel.deletecommand(funcid)
+            except tk.TclError: # The window is already being torn down
+                pass
+        self.shortcut_bindings = []
+        super().destroy()
+
+    def undo(self):
+        """
+        Reverts the record to the previous undo step.
+        """
+        self._commit_undo_step()
+        record = self.history.undo()
+        if record is not None:
+            self._show_history_record(record)
+
+    def redo(self):
+        """
+        Re-applies the undo step that was last undone.
+        """
+        self._commit_undo_step()
+        record = self.history.redo()
+        if record is not None:
+            self._show_history_record(record)
+
+    def _show_history_record(self, record):
+        """
+        Updates the existing widgets to show a record taken from the undo history.
+        Expanded maneuver editors are rebuilt and stay expanded.
+        """
+        self.current_enemy_data = record
+        self.suppress_tracking = True
+        try:
+            self.editable_fields["name"].set(record.get("name", "Unknown Enemy"))
+            self.editable_fields["id"].set(str(record.get("id", "N/A")))
+            threat_level = record.get("threatLevel", {})
+            self.editable_fields["threatLevel_base"].set(str(threat_level.get("base", "N/A")))
+            self.editable_fields["threatLevel_per_spawn_group"].set(str(threat_level.get("per_spawn_group", "N/A")))
+            self.editable_fields["maximumActionPoints"].set(str(record.get("maximumActionPoints", "N/A")))
+
+            flavor_text_widget = self.editable_fields["flavor_text"]
+            flavor_text_widget.delete("1.0", tk.END)
+            flavor_text_widget.insert(tk.END, self._format_flavor(record.get("flavor", {})))
+            flavor_text_widget.edit_modified(False)
+
+            expanded = [index for index, row in self.maneuver_rows.items()
+                        if row["editor"] is not None and row["editor"].winfo_ismapped()]
+            self.editable_fields["maneuvers"] = [{} for _ in record.get("maneuvers", [])]
+            self.maneuver_rows = {}
+            if self.editable_fields["maneuvers"]:
+                self._render_maneuver_page()
+                for index in expanded:
+                    self._toggle_maneuver_editor(index)
+        finally:
+            self.suppress_tracking = False
+
+        self._update_save_status()
+        if self._has_unsaved_changes():
+            self._schedule_autosave()
+        else:
+            self._cancel_autosave()
+
+    def _format_flavor(self, flavor):
+        """
+        Returns the combined text shown in the flavor text widget.
+        """
+        return (f"Description:\n{flavor.get('description', 'N/A')}\n\n"
+                f"Tactics:\n{flavor.get('tactics', 'N/A')}\n\n"
+                f"Roleplay:\n{flavor.get('roleplay', 'N/A')}")
+
+    def _collect_flavor(self):
+        """
+        Splits the flavor text widget back into its description, tactics and roleplay parts.
+        """
+        flavor_text_content = self.editable_fields["flavor_text"].get("1.0", tk.END).strip()
+        flavor_parts = flavor_text_content.split("\n\n")
+
+        description = ""
+        tactics = ""
+        roleplay = ""
+
+        if len(flavor_parts) > 0 and flavor_parts[0].startswith("Description:\n"):
+            description = flavor_parts[0].replace("Description:\n", "").strip()
+        if len(flavor_parts) > 1 and flavor_parts[1].startswith("Tactics:\n"):
+            tactics = flavor_parts[1].replace("Tactics:\n", "").strip()
+        if len(flavor_parts) > 2 and flavor_parts[2].startswith("Roleplay:\n"):
+            roleplay = flavor_parts[2].replace("Roleplay:\n", "").strip()
+
+        return {
+            "description": description,
+            "tactics": tactics,
+            "roleplay": roleplay
+        }
+
+    def _collect_and_save_data(self):
+        """
+        Commits the fields changed since the last undo step and saves the resulting
+        record to the JSON file. Untouched fields are not read back from the widgets.
+        """
+        self._cancel_autosave()
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("_collect_and_save_data called. Dirty fields: %s", sorted(self.dirty_fields, key=str))
+
+        try:
+            self._commit_undo_step()
+            if not self._has_unsaved_changes():
+                logger.info("No changes to save.")
+                return
+
+            updated_data = self.history.current
+            if self.store is not None:
+                # A changed id is a rename: the file under the old id has to go. A rename
+                # that only changes case removes it first, as both ids share one file on
+                # some systems and the store refuses the new id while the old one is stored.
+                previous_id = self.saved_record.get("id") if self.saved_record else None
+                renamed = bool(previous_id) and previous_id != updated_data["id"]
+                if renamed and previous_id.casefold() == updated_data["id"].casefold():
+                    self.store.delete(previous_id)
+                    renamed = False
+                self.store.put(updated_data)
+                if renamed:
+                    self.store.delete(previous_id)
+                logger.info("Enemy data saved successfully to %s", self.store.path_for(updated_data["id"]))
+            else:
+                # Save to JSON file
+                with open(ENEMY_DATA_FILE, 'w') as f:
+                    json.dump(updated_data, f, indent=4)
+                logger.info("Enemy data saved successfully to %s", ENEMY_DATA_FILE)
+            # Stale under the old id (a rename) and the new one
+            get_derived_stats_cache().invalidate(updated_data.get("id"), (self.saved_record or {}).get("id"))
+            self.saved_record = updated_data
+            if self.derived_stats_label is not None:
+                self.derived_stats_label.configure(text=self._derived_stats_text(updated_data))
+            self._update_save_status()
+            logger.debug("Save operation completed.")
+
         except KeyError as e:
-            print(f"Error: Missing expected field when saving: {e}. Please ensure all fields are correctly initialized.")
+            logger.error("Missing expected field when saving: %s. Please ensure all fields are correctly initialized.", e)
+        except IdCollisionError as e:
+            logger.error("Not saved: %s", e)
+            self.save_status_label.configure(text="● Not saved: another monster's id differs only in case", fg="#e6b450")
         except Exception as e:
-            print(f"An unexpected error occurred during save: {e}")
+            logger.exception("An unexpected error occurred during save: %s", e)
 
 
 # MOCK_ZOMBIE_DATA definition removed from here, now in game_data.py
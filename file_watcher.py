@@ -0,0 +1,293 @@
+# file_watcher.py
+
+# Watches a folder for files that are added, changed or removed, e.g. monster files a
+# co-GM edits in the bestiary folder mid-session.
+#
+# On Linux the kernel reports changes through inotify (called through ctypes, so no
+# extra package is needed). Elsewhere, or when inotify is unavailable, the folder is
+# scanned every poll interval and file sizes and modification times are compared.
+#
+# Changes are collected on a background thread for a short quiet period, so that a
+# burst of writes (an import, an editor's save-as-rename) is reported as one batch, and
+# the callback is called on that thread. GUI code should hand the batch over to the
+# Tk thread, e.g. through a queue polled with after().
+
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Seconds between two scans of the polling backend
+DEFAULT_POLL_INTERVAL = 1.0
+# Seconds without new events before a batch of changes is reported
+DEFAULT_QUIET_PERIOD = 0.2
+# Seconds after which a batch is reported even if events keep coming (e.g. a long import)
+MAX_BATCH_DELAY = 2.0
+
+# inotify constants, from <sys/inotify.h>
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+# IN_MODIFY is left out: a file being written would be reported half-written. Its
+# IN_CLOSE_WRITE follows once it is complete.
+WATCH_MASK = (IN_CLOSE_WRITE | IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+FOLDER_GONE_MASK = IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED
+EVENT_HEADER = struct.Struct("iIII") # wd, mask, cookie, name length
+READ_BUFFER_SIZE = 64 * 1024
+
+
+def _load_libc():
+    """
+    Returns libc with the inotify functions, or None if they are not available.
+    """
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class FileWatcher:
+    """
+    Reports the files of a folder that were added, changed or removed.
+    """
+    def __init__(self, directory, callback, name_filter=None, poll_interval=DEFAULT_POLL_INTERVAL,
+                 quiet_period=DEFAULT_QUIET_PERIOD, use_inotify=True):
+        """
+        Initializes the watcher. Call start() to begin watching.
+
+        Args:
+            directory (str): The folder to watch. Subfolders are not watched.
+            callback (callable): Called on the watcher thread with (changed, removed): the
+                sets of file names that were added or changed, and that were removed.
+            name_filter (callable, optional): Only file names for which it returns True
+                are reported.
+            poll_interval (float): Seconds between two scans when polling.
+            quiet_period (float): Seconds without new events before a batch is reported.
+            use_inotify (bool): False always polls.
+        """
+        self.directory = directory
+        self.callback = callback
+        self.name_filter = name_filter or (lambda name: True)
+        self.poll_interval = poll_interval
+        self.quiet_period = quiet_period
+        self.use_inotify = use_inotify
+        self.backend = None # "inotify" or "polling", once started
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._wake_pipe = None # (read fd, write fd) that interrupts the inotify wait on stop()
+        # name -> (mtime_ns, size) of the files seen in the last scan
+        self._snapshot = {}
+
+    def start(self):
+        """
+        Starts watching on a daemon thread.
+        """
+        if self._thread is not None:
+            return
+        self._snapshot = self._scan()
+        self._stop_event.clear()
+        inotify_fd = self._open_inotify() if self.use_inotify else None
+        self.backend = "polling" if inotify_fd is None else "inotify"
+        if inotify_fd is not None:
+            self._wake_pipe = os.pipe()
+        target = self._poll_loop if inotify_fd is None else (lambda: self._inotify_loop(inotify_fd))
+        self._thread = threading.Thread(target=target, name=f"file-watcher:{self.directory}", daemon=True)
+        self._thread.start()
+        logger.debug("Watching %s (%s)", self.directory, self.backend)
+
+    def stop(self):
+        """
+        Stops watching and waits for the watcher thread to finish.
+        """
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        if self._wake_pipe is not None:
+            os.write(self._wake_pipe[1], b"\0")
+        self._thread.join()
+        self._thread = None
+        if self._wake_pipe is not None:
+            for fd in self._wake_pipe:
+                os.close(fd)
+            self._wake_pipe = None
+
+    def _scan(self):
+        """
+        Returns {name: (mtime_ns, size)} of the files in the folder that pass the filter.
+        """
+        snapshot = {}
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if not self.name_filter(entry.name):
+                        continue
+                    try:
+                        if entry.is_file():
+                            stat = entry.stat()
+                            snapshot[entry.name] = (stat.st_mtime_ns, stat.st_size)
+                    except FileNotFoundError: # Removed during the scan
+                        pass
+        except FileNotFoundError:
+            pass
+        return snapshot
+
+    def _rescan(self):
+        """
+        Scans the folder and returns (changed, removed) since the previous scan.
+        """
+        snapshot = self._scan()
+        changed = {name for name, signature in snapshot.items() if self._snapshot.get(name) != signature}
+        removed = set(self._snapshot) - set(snapshot)
+        self._snapshot = snapshot
+        return changed, removed
+
+    def _report(self, changed, removed):
+        if not changed and not removed:
+            return
+        try:
+            self.callback(changed, removed)
+        except Exception:
+            logger.exception("File watcher callback failed")
+
+    # --- Polling backend ---
+
+    def _poll_loop(self):
+        while not self._stop_event.wait(self.poll_interval):
+            self._report(*self._rescan())
+
+    # --- inotify backend ---
+
+    def _open_inotify(self):
+        """
+        Returns an inotify file descriptor watching the folder, or None if inotify cannot be used.
+        """
+        libc = _load_libc()
+        if libc is None:
+            return None
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            logger.warning("inotify unavailable (%s); polling %s instead",
+                           os.strerror(ctypes.get_errno()), self.directory)
+            return None
+        if libc.inotify_add_watch(fd, os.fsencode(self.directory), WATCH_MASK) < 0:
+            error = ctypes.get_errno()
+            os.close(fd)
+            # ENOSPC is the per-user watch limit (fs.inotify.max_user_watches)
+            logger.warning("Could not watch %s with inotify (%s); polling instead",
+                           self.directory, os.strerror(error) if error != errno.ENOSPC else "watch limit reached")
+            return None
+        return fd
+
+    def _read_events(self, fd):
+        """
+        Reads the pending events and returns (names of the touched files, overflowed, folder gone).
+        Whether a touched file was changed or removed is settled later by _settle.
+        """
+        names = set()
+        overflowed = False
+        folder_gone = False
+        while True:
+            try:
+                data = os.read(fd, READ_BUFFER_SIZE)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    overflowed = True
+                elif mask & FOLDER_GONE_MASK:
+                    folder_gone = True
+                elif name and self.name_filter(name):
+                    names.add(name)
+        return names, overflowed, folder_gone
+
+    def _inotify_loop(self, fd):
+        try:
+            pending_names = set()
+            rescan = False
+            last_event = None
+            batch_start = None
+            while not self._stop_event.is_set():
+                # Wait for events, for stop(), or for the end of the quiet period of a batch
+                timeout = self.quiet_period if last_event is not None else None
+                readable, _, _ = select.select([fd, self._wake_pipe[0]], [], [], timeout)
+                if self._stop_event.is_set():
+                    break
+                if readable:
+                    names, overflowed, folder_gone = self._read_events(fd)
+                    if folder_gone:
+                        logger.warning("%s was removed or moved; polling for it instead", self.directory)
+                        self._report(*self._rescan())
+                        self.backend = "polling"
+                        self._poll_loop()
+                        return
+                    pending_names |= names
+                    rescan = rescan or overflowed
+                    last_event = time.monotonic()
+                    if batch_start is None:
+                        batch_start = last_event
+                    if last_event - batch_start < MAX_BATCH_DELAY:
+                        continue
+                elif last_event is None or time.monotonic() - last_event < self.quiet_period:
+                    continue
+
+                if rescan:
+                    # Events were dropped, so only a scan can tell what changed
+                    logger.debug("inotify queue overflowed; rescanning %s", self.directory)
+                    changed, removed = self._rescan()
+                else:
+                    changed, removed = self._settle(pending_names)
+                self._report(changed, removed)
+                pending_names, rescan, last_event, batch_start = set(), False, None, None
+        finally:
+            os.close(fd)
+
+    def _settle(self, names):
+        """
+        Compares the touched files with the snapshot and returns (changed, removed),
+        updating the snapshot. Files created and deleted within the batch, or touched
+        without a change of size or modification time (e.g. only their permissions),
+        are not reported.
+        """
+        changed = set()
+        removed = set()
+        for name in names:
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                if self._snapshot.pop(name, None) is not None:
+                    removed.add(name)
+                continue
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if self._snapshot.get(name) != signature:
+                self._snapshot[name] = signature
+                changed.add(name)
+        return changed, removed
@@ -2,11 +2,28 @@
 
 # We import our utility functions from the utils module.
 from utils import get_window_title
-# Import the new settings manager
-from settings_manager import load_settings
+# Import the settings service shared by all screens
+from settings_manager import get_settings_service
+# Opt-in callback and event-loop profiling
+from ui_profiler import UIProfiler
+# Opt-in per-screen widget, Tcl variable and memory counts
+from memory_diagnostics import MemoryDiagnostics
+# Queue-based logging with levels taken from the settings
+from log_manager import setup_logging, shutdown_logging
+# asyncio event loop next to the Tk main loop, for file I/O that should not freeze the window
+from async_bridge import AsyncBridge
+# Optional bestiary shared between the machines at the table
+from bestiary_client import BestiaryClient
+from bestiary_server import BestiaryServer
+from bestiary_store import BestiaryStore
+from bestiary_protocol import parse_address
+# Saved campaigns, written incrementally by the autosave
+from campaign_save import Campaign, CampaignError, list_campaigns
 
 # The tkinter library is Python's standard GUI toolkit.
 import tkinter as tk
+import logging
+import time
 
 # Import the main menu screen
 from main_menu import MainMenu
@@ -17,27 +34,49 @@ from options_menu import OptionsMenu
 # Import the new database menu screen
 from database_menu import DatabaseMenu
 
+logger = logging.getLogger(__name__)
+
+# Display modes that are implemented with the native fullscreen attribute
+FULLSCREEN_MODES = ["Fullscreen", "Borderless Window"]
+
+# Milliseconds between two autosaves of the campaign in progress. A save only writes
+# the sections changed since the previous one, so this can be short.
+AUTOSAVE_INTERVAL_MS = 30000
+
 # This is the main class for our application.
 class Application:
     """
     The main application class that manages the window and frame switching.
     """
-    def __init__(self, master):
+    def __init__(self, master, settings_service=None, bestiary_client=None):
         """
         Initializes the application window and all its frames.
         
         Args:
             master: The root window of the application.
+            settings_service (SettingsService, optional): The settings to use.
+                Defaults to the shared per-user settings.
+            bestiary_client (BestiaryClient, optional): Use the bestiary of a bestiary
+                server instead of the local bestiary folder.
         """
         self.master = master
-        
+        self.current_frame_name = None
+        self.window_resolution = None # Last resolution applied to the window
+        self.screen_listeners = [] # Callables called with the page name after show_frame switches screens
+        self.campaign = None # The Campaign in progress, if any
+        self.autosave_job = None # Pending after() id of the next autosave
+        # Shared by the screens; its loop thread starts with the first job and stops with the window
+        self.async_bridge = AsyncBridge(master)
+
         # We use functions from the utils module to configure the window.
         master.title(get_window_title())
         master.minsize(800, 600)
         
-        # Load the saved settings on startup
-        self.settings = load_settings()
+        # Settings are loaded once by the service and kept up to date through a subscription
+        self.settings_service = settings_service or get_settings_service()
+        self.settings = self.settings_service.all()
         self._apply_initial_settings()
+        self.settings_service.subscribe(self._on_settings_changed)
 
         # Create a container frame where other frames will be placed
         container = tk.Frame(master)
@@ -51,61 +90,245 @@ class Application:
         self.frames = {}
         
         # Create and add the MainMenu frame to our dictionary of frames
-        self.frames["MainMenu"] = MainMenu(container, self.show_frame)
+        self.frames["MainMenu"] = MainMenu(container, self.show_frame,
+                                           on_new_game=self.new_game, on_continue=self.continue_game)
         
         # Create and add the OptionsMenu frame to our dictionary of frames
-        self.frames["OptionsMenu"] = OptionsMenu(container, self.show_frame, self.settings)
+        self.frames["OptionsMenu"] = OptionsMenu(container, self.show_frame, self.settings_service)
 
         # Create and add the new DatabaseMenu frame to our dictionary of frames
         # DatabaseMenu will now manage EnemyViewer internally
-        self.frames["DatabaseMenu"] = DatabaseMenu(container, self.show_frame)
-
-        # Position all frames on top of each other using grid
-        for frame_name, frame in self.frames.items():
-            frame.grid(row=0, column=0, sticky="nsew")
+        self.frames["DatabaseMenu"] = DatabaseMenu(container, self.show_frame, self.async_bridge, bestiary_client)
 
+        # Only the visible frame is gridded (see show_frame), so hidden screens
+        # take no part in geometry propagation when the window is resized.
         # Show the main menu when the application starts
         self.show_frame("MainMenu")
 
+        # "Continue" is offered once the saved campaigns turn out to include one
+        self.async_bridge.run_blocking(list_campaigns, on_done=self._on_campaigns_listed)
+
     def show_frame(self, page_name, **kwargs):
         """
-        Raises the specified frame to the top, making it visible.
+        Shows the specified frame and takes the previously shown one out of the layout.
 
         Args:
             page_name: The name of the frame to show (e.g., "MainMenu", "OptionsMenu", "DatabaseMenu").
             **kwargs: Additional keyword arguments (no longer directly used for EnemyViewer here).
         """
         frame = self.frames[page_name]
+        if page_name == self.current_frame_name:
+            return
         # The EnemyViewer is now managed internally by DatabaseMenu,
         # so no special handling is needed here for it.
-        frame.tkraise()
-    
+        frame.grid(row=0, column=0, sticky="nsew")
+        if self.current_frame_name is not None:
+            # grid_remove keeps the grid options, so the frame can be shown again cheaply
+            self.frames[self.current_frame_name].grid_remove()
+        self.current_frame_name = page_name
+        for listener in list(self.screen_listeners):
+            listener(page_name)
+
+    def apply_window_state(self, resolution, mode):
+        """
+        Applies a resolution and display mode to the main window as a single transaction.
+
+        Only the attributes that actually differ are touched, in an order that avoids
+        leaving and re-entering fullscreen.
+
+        Args:
+            resolution (str): A geometry size such as "1280x720".
+            mode (str): One of "Windowed", "Fullscreen" or "Borderless Window".
+        """
+        root = self.master
+        fullscreen = mode in FULLSCREEN_MODES
+        currently_fullscreen = bool(int(root.attributes("-fullscreen")))
+
+        if currently_fullscreen and not fullscreen:
+            root.attributes("-fullscreen", False)
+        if resolution != self.window_resolution:
+            # While fullscreen, the window manager keeps this size for when fullscreen is left
+            root.geometry(resolution)
+            self.window_resolution = resolution
+        if fullscreen and not currently_fullscreen:
+            # In Tkinter, the best way to achieve a managed, tabbable borderless window
+            # is to use the native fullscreen attribute. This removes all borders and
+            # title bars while keeping the window under OS control.
+            root.attributes("-fullscreen", True)
+
+        if fullscreen:
+            root.bind("<Escape>", self._exit_fullscreen)
+        else:
+            root.unbind("<Escape>")
+        # Lay out the visible frame once, for all of the changes above
+        root.update_idletasks()
+
+    def _exit_fullscreen(self, event):
+        """
+        Leaves fullscreen mode when the Escape key is pressed and records the new mode.
+        """
+        self.settings_service.update(mode="Windowed")
+
+    # --- Campaigns ---
+
+    def _on_campaigns_listed(self, campaigns):
+        self.frames["MainMenu"].set_continue_available(bool(campaigns))
+
+    def new_game(self):
+        """
+        Starts a new campaign. It is created on the asyncio bridge, off the Tk thread.
+        """
+        name = time.strftime("Campaign %Y-%m-%d %H.%M")
+        self.async_bridge.run_blocking(Campaign.create, name,
+                                       on_done=self._start_campaign, on_error=self._on_campaign_error)
+
+    def continue_game(self):
+        """
+        Reopens the most recently saved campaign. Only its manifest is read; sections
+        are loaded when first used.
+        """
+        def open_latest():
+            campaigns = list_campaigns()
+            if not campaigns:
+                raise CampaignError("There is no saved campaign")
+            return Campaign.open(campaigns[0][0])
+        self.async_bridge.run_blocking(open_latest, on_done=self._start_campaign, on_error=self._on_campaign_error)
+
+    def _start_campaign(self, campaign):
+        if self.campaign is not None:
+            self.save_campaign()
+        self.campaign = campaign
+        logger.info("Campaign %s at checkpoint %d", campaign.name, campaign.checkpoint)
+        self.frames["MainMenu"].show_campaign(campaign.name, campaign.saved)
+        self.frames["MainMenu"].set_continue_available(True)
+        if self.autosave_job is None:
+            self.autosave_job = self.master.after(AUTOSAVE_INTERVAL_MS, self._autosave)
+
+    def _on_campaign_error(self, error):
+        logger.error("Could not start the campaign: %s", error)
+
+    def _autosave(self):
+        """
+        Saves the changed sections of the campaign in progress in the background.
+        """
+        self.autosave_job = self.master.after(AUTOSAVE_INTERVAL_MS, self._autosave)
+        campaign = self.campaign
+        if campaign is None or not campaign.dirty:
+            return
+        self.async_bridge.run_blocking(campaign.save, name="autosave",
+                                       on_done=lambda number: self._on_campaign_saved(campaign, number),
+                                       on_error=lambda e: logger.error("Autosave failed: %s", e))
+
+    def _on_campaign_saved(self, campaign, number):
+        if number is not None and campaign is self.campaign:
+            self.frames["MainMenu"].show_campaign(campaign.name, campaign.saved)
+
+    def save_campaign(self):
+        """
+        Saves the campaign in progress now, on the calling thread (e.g. on exit).
+        """
+        if self.campaign is None:
+            return
+        try:
+            self.campaign.save()
+        except (OSError, CampaignError) as e:
+            logger.error("Could not save campaign %s: %s", self.campaign.name, e)
+
+    def _on_settings_changed(self, settings, changed_keys):
+        """
+        Keeps the application's copy of the settings in sync with the settings service
+        and applies display changes to the window.
+
+        Args:
+            settings (dict): All current settings.
+            changed_keys (set): The keys that changed.
+        """
+        self.settings = settings
+        if "resolution" in changed_keys or "mode" in changed_keys:
+            self.apply_window_state(settings["resolution"], settings["mode"])
+
     def _apply_initial_settings(self):
         """
         Applies the settings loaded from the config file to the main window.
         """
         resolution = self.settings.get("resolution", "800x600")
         mode = self.settings.get("mode", "Windowed")
-        
+
         self.master.geometry(resolution)
-        if mode in ["Fullscreen", "Borderless Window"]:
+        self.window_resolution = resolution
+        if mode in FULLSCREEN_MODES:
             self.master.attributes("-fullscreen", True)
+            self.master.bind("<Escape>", self._exit_fullscreen)
         else:
             self.master.attributes("-fullscreen", False)
 
 
-def run_app():
+def run_app(profile_report=None, memory_report=None, serve=None, connect=None):
     """
     This function creates the main window and runs the application loop.
     This explicit function is a best practice for clarity and compatibility
     with tools like PyInstaller.
+
+    Args:
+        profile_report (str, optional): If given, Tk callbacks are profiled and
+            the report is written to this file on exit (see ui_profiler.py).
+        memory_report (str, optional): If given, widget, Tcl variable and memory counts are
+            sampled on every screen switch and written to this file on exit
+            (see memory_diagnostics.py).
+        serve (str, optional): Also share the local bestiary with other machines, listening
+            on this "host:port" (see bestiary_server.py).
+        connect (str, optional): Use the bestiary shared by the server at this "host:port".
     """
+    setup_logging(get_settings_service())
+
+    server = None
+    if serve:
+        server = BestiaryServer(BestiaryStore(), *parse_address(serve))
+        try:
+            server.start_in_thread()
+        except OSError as e:
+            logger.error("Could not share the bestiary on %s: %s", serve, e)
+            server = None
+    bestiary_client = BestiaryClient(parse_address(connect)) if connect else None
+
+    profiler = None
+    if profile_report:
+        # Installed before any widget exists so every command and binding is wrapped
+        profiler = UIProfiler(profile_report)
+        profiler.install()
+
     # Create the root window. This is the main window of the application.
     root = tk.Tk()
+    if profiler:
+        profiler.start_heartbeat(root)
 
     # Create an instance of our Application class.
     # This will initialize the GUI and show the main menu.
-    app = Application(root)
+    app = Application(root, bestiary_client=bestiary_client)
+    diagnostics = None
+    if memory_report:
+        diagnostics = MemoryDiagnostics(app, memory_report)
+        diagnostics.start()
     
     # This line starts the main event loop.
     root.mainloop()
+
+    # Normally already stopped by the destruction of the window
+    app.async_bridge.stop()
+    # Changes made since the last autosave
+    app.save_campaign()
+    if bestiary_client:
+        bestiary_client.close()
+    if server:
+        server.stop_thread()
+
+    # Write any settings change that is still waiting for its coalesced save
+    app.settings_service.flush()
+
+    if profiler:
+        profiler.stop()
+    if diagnostics:
+        diagnostics.stop()
+
+    # Write out any log records still waiting in the queue
+    shutdown_logging()
@@ -0,0 +1,107 @@
+# log_manager.py
+
+# Logging for the whole game. Modules log through logging.getLogger(__name__) with
+# %-style arguments, so a message is only formatted if its level is enabled.
+#
+# Enabled records are put on a queue by a QueueHandler, and a QueueListener thread
+# writes them to the console. The Tk thread never waits on console I/O, which matters
+# for the packaged build since it keeps a console window open.
+#
+# Levels come from the settings: "log_level" for everything, and "log_levels" to
+# override single modules, e.g. {"enemy_viewer": "DEBUG"}. They are re-applied
+# whenever those settings change.
+
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+
+LOG_FORMAT = "%(asctime)s %(levelname)-7s %(name)s: %(message)s"
+LOG_DATE_FORMAT = "%H:%M:%S"
+LOG_LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
+DEFAULT_LOG_LEVEL = "INFO"
+
+logger = logging.getLogger(__name__)
+
+_listener = None
+_queue_handler = None
+_module_loggers = set() # Names of the loggers that got a level from "log_levels"
+
+
+def setup_logging(settings_service=None, stream=None):
+    """
+    Routes all logging through a background queue listener and applies the configured levels.
+    Calling it again only re-applies the levels.
+
+    Args:
+        settings_service (SettingsService, optional): Where "log_level" and "log_levels"
+            are read from. Changes to them are picked up while the game runs.
+        stream (file, optional): Where log lines are written. Defaults to sys.stderr.
+    """
+    global _listener, _queue_handler
+    if _listener is None:
+        log_queue = queue.SimpleQueue()
+        console_handler = logging.StreamHandler(stream or sys.stderr)
+        console_handler.setFormatter(logging.Formatter(LOG_FORMAT, LOG_DATE_FORMAT))
+        _listener = logging.handlers.QueueListener(log_queue, console_handler)
+        _listener.start()
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        _queue_handler = logging.handlers.QueueHandler(log_queue)
+        root.addHandler(_queue_handler)
+        atexit.register(shutdown_logging)
+
+    if settings_service is None:
+        apply_levels(DEFAULT_LOG_LEVEL, {})
+    else:
+        apply_levels(settings_service.get("log_level", DEFAULT_LOG_LEVEL), settings_service.get("log_levels", {}))
+        if _on_settings_changed not in settings_service.subscribers:
+            settings_service.subscribe(_on_settings_changed)
+
+
+def apply_levels(default_level, module_levels):
+    """
+    Sets the root level and the per-module overrides. Unknown level names are
+    reported and ignored.
+
+    Args:
+        default_level (str): Level for every logger without an override.
+        module_levels (dict): Maps logger (module) names to level names.
+    """
+    if default_level not in LOG_LEVELS:
+        logger.warning("Unknown log level %r; using %s.", default_level, DEFAULT_LOG_LEVEL)
+        default_level = DEFAULT_LOG_LEVEL
+    logging.getLogger().setLevel(default_level)
+
+    # Previous overrides are cleared so removed (or now invalid) ones follow the root level again
+    for name in _module_loggers:
+        logging.getLogger(name).setLevel(logging.NOTSET)
+    _module_loggers.clear()
+
+    for name, level in module_levels.items():
+        if level not in LOG_LEVELS:
+            logger.warning("Unknown log level %r for '%s'; ignoring it.", level, name)
+            continue
+        logging.getLogger(name).setLevel(level)
+        _module_loggers.add(name)
+
+
+def _on_settings_changed(settings, changed_keys):
+    if "log_level" in changed_keys or "log_levels" in changed_keys:
+        apply_levels(settings.get("log_level", DEFAULT_LOG_LEVEL), settings.get("log_levels", {}))
+
+
+def shutdown_logging():
+    """
+    Writes out the queued records and stops the listener thread. Records logged
+    afterwards fall back to Python's default handling (warnings and errors on stderr).
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _listener.stop()
+        _listener = None
+        _queue_handler = None
@@ -1,10 +1,42 @@
 # main.py
 
+# argparse reads the optional command-line flags, e.g. "python main.py --profile-ui"
+import argparse
+# The bulk importer parses files in worker processes; see freeze_support below
+import multiprocessing
+
 # Import the main application logic from our GUI module.
 from gui import run_app
+from ui_profiler import DEFAULT_REPORT_FILE
+from memory_diagnostics import DEFAULT_REPORT_FILE as DEFAULT_MEMORY_REPORT_FILE
+from bestiary_protocol import DEFAULT_PORT
+from bestiary_server import DEFAULT_HOST
+
+
+def parse_args():
+    """
+    Parses the command-line flags.
+    """
+    parser = argparse.ArgumentParser(description="Nechronica")
+    parser.add_argument("--profile-ui", nargs="?", const=DEFAULT_REPORT_FILE, default=None, metavar="REPORT",
+                        help=f"time Tk callbacks, watch for event-loop stalls and write a report on exit "
+                             f"(default file: {DEFAULT_REPORT_FILE})")
+    parser.add_argument("--memory-report", nargs="?", const=DEFAULT_MEMORY_REPORT_FILE, default=None, metavar="REPORT",
+                        help=f"count widgets, Tcl variables and traced memory on every screen switch and write "
+                             f"a report on exit (default file: {DEFAULT_MEMORY_REPORT_FILE})")
+    parser.add_argument("--serve", nargs="?", const=f"{DEFAULT_HOST}:{DEFAULT_PORT}", default=None, metavar="HOST:PORT",
+                        help=f"share the bestiary with the other machines at the table "
+                             f"(default address: {DEFAULT_HOST}:{DEFAULT_PORT}; use 0.0.0.0:PORT for the network)")
+    parser.add_argument("--connect", default=None, metavar="HOST:PORT",
+                        help="use the bestiary shared by another machine's --serve")
+    return parser.parse_args()
 
 # This is the standard entry point for a Python script.
 # When the script is run directly, this block of code is executed.
 if __name__ == "__main__":
+    # Lets the worker processes start from a frozen (PyInstaller) executable
+    multiprocessing.freeze_support()
+    args = parse_args()
     # Call the function that runs our application.
-    run_app()
+    run_app(profile_report=args.profile_ui, memory_report=args.memory_report,
+            serve=args.serve, connect=args.connect)
@@ -2,20 +2,26 @@
 
 import tkinter as tk
 from tkinter import PhotoImage
+import logging
 import os # Import the os module to handle file paths
 import sys # Import the sys module to get the script's path
 
+logger = logging.getLogger(__name__)
+
 class MainMenu(tk.Frame):
     """
     A frame representing the main menu of the game.
     """
-    def __init__(self, master, switch_frame_callback):
+    def __init__(self, master, switch_frame_callback, on_new_game=None, on_continue=None):
         """
         Initializes the MainMenu frame.
 
         Args:
             master: The parent widget (the main application window).
             switch_frame_callback: A function to call to switch to another frame.
+            on_new_game (callable, optional): Called when "New Game" is clicked.
+            on_continue (callable, optional): Called when "Continue" is clicked. The
+                button is only shown once set_continue_available(True) is called.
         """
         # Call the constructor of the parent class (tk.Frame)
         super().__init__(master)
@@ -45,7 +51,7 @@ class MainMenu(tk.Frame):
             image_label = tk.Label(self, image=self.menu_image, bg="#2c2c2c")
             image_label.grid(row=0, column=0, pady=(20, 10), sticky="s")
         except tk.TclError as e:
-            print(f"Warning: Image not found. Attempted path was '{image_path}'. Error: {e}")
+            logger.warning("Image not found. Attempted path was '%s'. Error: %s", image_path, e)
             image_label = tk.Label(self, text="Nechronica", font=("Helvetica", 36), fg="#f0f0f0", bg="#2c2c2c")
             image_label.grid(row=0, column=0, pady=(20, 10), sticky="s")
 
@@ -59,8 +65,14 @@ class MainMenu(tk.Frame):
         new_game_button = tk.Button(button_frame, text="New Game", font=("Helvetica", 16),
                                    width=15, pady=5, bg="#555555", fg="#f0f0f0",
                                    relief="raised", bd=3,
-                                   command=lambda: print("New Game button clicked"))
+                                   command=on_new_game or (lambda: logger.debug("New Game button clicked")))
         new_game_button.pack(pady=10)
+
+        # Continue button - Reopens the most recently saved campaign; packed once one exists
+        self.continue_button = tk.Button(button_frame, text="Continue", font=("Helvetica", 16),
+                                        width=15, pady=5, bg="#555555", fg="#f0f0f0",
+                                        relief="raised", bd=3, command=on_continue)
+        self.new_game_button = new_game_button
         
         # Database button - Added to switch to the new DatabaseMenu frame
         database_button = tk.Button(button_frame, text="Database", font=("Helvetica", 16),
@@ -75,3 +87,29 @@ class MainMenu(tk.Frame):
                                    relief="raised", bd=3,
                                    command=lambda: self.switch_frame_callback("OptionsMenu"))
         options_button.pack(pady=10)
+
+        # Name and last save of the campaign in progress
+        self.campaign_label = tk.Label(self, text="", font=("Helvetica", 11), fg="#b0b0b0", bg="#2c2c2c")
+        self.campaign_label.grid(row=2, column=0, pady=(0, 20), sticky="n")
+
+    def set_continue_available(self, available):
+        """
+        Shows the "Continue" button (right after "New Game") when a saved campaign exists.
+        """
+        if available and not self.continue_button.winfo_manager():
+            self.continue_button.pack(pady=10, after=self.new_game_button)
+        elif not available and self.continue_button.winfo_manager():
+            self.continue_button.pack_forget()
+
+    def show_campaign(self, name, saved):
+        """
+        Shows the campaign in progress under the buttons.
+
+        Args:
+            name (str): The campaign's name, or None to clear the line.
+            saved (str): Time of its last save, or None if it was not saved yet.
+        """
+        if name is None:
+            self.campaign_label.configure(text="")
+        else:
+            self.campaign_label.configure(text=f"Campaign: {name}" + (f" (saved {saved.replace('T', ' ')})" if saved else ""))
@@ -0,0 +1,109 @@
+# measure_relayout.py
+
+# Measures how much layout work a display mode switch causes: the <Configure> events it
+# produces (one per widget Tk has to lay out again) and the time until Tk is idle.
+# It compares the old way of switching (every screen stacked in the grid, fullscreen
+# toggled off and on, geometry set in between) with Application.apply_window_state.
+#
+# Usage: python measure_relayout.py [number_of_switches]
+# Needs a display; on a headless Linux box run it under Xvfb (xvfb-run python measure_relayout.py).
+
+import os
+import sys
+import tempfile
+import time
+import tkinter as tk
+
+from gui import Application, FULLSCREEN_MODES
+from settings_manager import SettingsService
+
+# The switches cycle through these (resolution, mode) pairs
+SWITCH_SEQUENCE = [
+    ("1280x720", "Windowed"),
+    ("1280x720", "Fullscreen"),
+    ("800x600", "Windowed"),
+    ("1920x1080", "Borderless Window"),
+]
+# Milliseconds given to the window manager to deliver the events of a switch
+SETTLE_MS = 100
+
+
+def legacy_switch(app, resolution, mode):
+    """
+    Switches the window the way OptionsMenu.save_settings used to:
+    _apply_resolution followed by _apply_display_mode.
+    """
+    root = app.master
+    root.attributes("-fullscreen", False)
+    root.geometry(resolution)
+    root.attributes("-fullscreen", False)
+    root.overrideredirect(False)
+    if mode in FULLSCREEN_MODES:
+        root.attributes("-fullscreen", True)
+
+
+def settle(root):
+    """
+    Processes the pending events of a switch before the next one.
+    """
+    root.update()
+    deadline = time.perf_counter() + SETTLE_MS / 1000
+    while time.perf_counter() < deadline:
+        root.update()
+
+
+def measure(strategy, switches):
+    """
+    Runs a number of mode switches with one strategy and returns the counts and timings.
+
+    Args:
+        strategy (str): "legacy" or "batched".
+        switches (int): How many switches to perform.
+
+    Returns:
+        dict: Configure events (one per widget Tk had to lay out again) and
+              milliseconds, each per switch.
+    """
+    root = tk.Tk()
+    settings_path = os.path.join(tempfile.mkdtemp(), "config.json")
+    app = Application(root, settings_service=SettingsService(path=settings_path))
+
+    configure_events = [0]
+    root.bind_all("<Configure>", lambda e: configure_events.__setitem__(0, configure_events[0] + 1), add="+")
+
+    if strategy == "legacy":
+        # Before the change every screen was gridded into the same cell and raised with tkraise
+        for frame in app.frames.values():
+            frame.grid(row=0, column=0, sticky="nsew")
+    settle(root)
+    configure_events[0] = 0
+
+    elapsed = 0.0
+    for index in range(switches):
+        resolution, mode = SWITCH_SEQUENCE[index % len(SWITCH_SEQUENCE)]
+        start = time.perf_counter()
+        if strategy == "legacy":
+            legacy_switch(app, resolution, mode)
+        else:
+            app.apply_window_state(resolution, mode)
+        root.update_idletasks()
+        elapsed += time.perf_counter() - start
+        settle(root)
+
+    root.destroy()
+    return {
+        "configure_events_per_switch": configure_events[0] / switches,
+        "ms_per_switch": elapsed * 1000 / switches,
+    }
+
+
+def main():
+    switches = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    print(f"{'strategy':<10} {'configure/switch':>17} {'ms/switch':>10}")
+    for strategy in ("legacy", "batched"):
+        result = measure(strategy, switches)
+        print(f"{strategy:<10} {result['configure_events_per_switch']:>17.1f} {result['ms_per_switch']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
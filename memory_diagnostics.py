@@ -0,0 +1,231 @@
+# memory_diagnostics.py
+
+# Opt-in memory and widget-count diagnostics (run the game with --memory-report).
+#
+# A sample is taken every time Application shows a screen and every time the
+# EnemyViewer displays a monster. Each sample records, per screen:
+#   - live Tk widgets, by widget class,
+# and for the whole interpreter:
+#   - Tcl variables created by tkinter (PY_VAR*) and the Python Variable objects behind them,
+#   - Tcl commands (every registered Python callback is one),
+#   - traced Python memory, with a tracemalloc diff against the previous sample.
+# Opening the same monster again and again should leave these numbers flat; anything
+# that keeps growing is listed as a leak suspect in the report written on exit.
+
+import gc
+import logging
+import time
+import tracemalloc
+import tkinter as tk
+
+DEFAULT_REPORT_FILE = "memory_report.txt"
+# Stack frames kept per traced allocation; 1 is enough to group by source line
+TRACEMALLOC_FRAMES = 1
+# Allocation sites listed per tracemalloc diff
+TOP_ALLOCATION_DIFFS = 10
+
+logger = logging.getLogger(__name__)
+
+
+def count_widgets(widget):
+    """
+    Counts a widget and all of its descendants by widget class.
+
+    Returns:
+        dict: Maps a Tk class name (e.g. "Entry") to a count.
+    """
+    counts = {}
+    pending = [widget]
+    while pending:
+        current = pending.pop()
+        class_name = current.winfo_class()
+        counts[class_name] = counts.get(class_name, 0) + 1
+        pending.extend(current.winfo_children())
+    return counts
+
+
+def count_tcl_variables(root):
+    """
+    Returns the number of global Tcl variables created by tkinter Variables.
+    """
+    return len(root.tk.splitlist(root.tk.call("info", "globals", "PY_VAR*")))
+
+
+def count_tcl_commands(root):
+    """
+    Returns the number of Tcl commands, which includes one per registered Python callback.
+    """
+    return len(root.tk.splitlist(root.tk.call("info", "commands")))
+
+
+def count_python_variables():
+    """
+    Returns the number of tkinter Variable objects still alive in Python.
+    """
+    return sum(1 for obj in gc.get_objects() if isinstance(obj, tk.Variable))
+
+
+class MemoryDiagnostics:
+    """
+    Samples widget, Tcl and memory counts on screen switches and writes a report.
+    """
+    def __init__(self, app, report_path=DEFAULT_REPORT_FILE):
+        """
+        Initializes the diagnostics. Nothing is sampled until start() is called.
+
+        Args:
+            app (Application): The running application.
+            report_path (str): File the report is written to by stop().
+        """
+        self.app = app
+        self.report_path = report_path
+        self.samples = []
+        self.start_time = None
+        self.previous_snapshot = None
+        self.enemy_viewer = getattr(app.frames.get("DatabaseMenu"), "enemy_viewer_frame", None)
+
+    def start(self):
+        """
+        Starts tracemalloc, subscribes to screen changes and takes the first sample.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        self.start_time = time.perf_counter()
+        self.app.screen_listeners.append(self._on_screen_shown)
+        if self.enemy_viewer is not None:
+            self.enemy_viewer.display_listeners.append(self._on_enemy_displayed)
+        self.sample(f"start ({self.app.current_frame_name})")
+
+    def stop(self):
+        """
+        Unsubscribes, takes a last sample if the window still exists, and writes the report.
+        """
+        if self._on_screen_shown in self.app.screen_listeners:
+            self.app.screen_listeners.remove(self._on_screen_shown)
+        if self.enemy_viewer is not None and self._on_enemy_displayed in self.enemy_viewer.display_listeners:
+            self.enemy_viewer.display_listeners.remove(self._on_enemy_displayed)
+        try:
+            self.sample("exit")
+        except tk.TclError:
+            pass # The window is already destroyed; the samples taken so far are reported
+        self.write_report()
+        tracemalloc.stop()
+
+    def _on_screen_shown(self, page_name):
+        self.sample(f"screen {page_name}")
+
+    def _on_enemy_displayed(self, enemy_data):
+        name = enemy_data.get("name", "?") if enemy_data else "(none)"
+        self.sample(f"enemy {name}")
+
+    def sample(self, label):
+        """
+        Records the current counts under a label and logs a one-line summary.
+        """
+        # Collect first so only objects that are really still referenced are counted
+        gc.collect()
+        root = self.app.master
+
+        screens = {name: count_widgets(frame) for name, frame in self.app.frames.items()}
+        if self.enemy_viewer is not None:
+            screens["EnemyViewer"] = count_widgets(self.enemy_viewer)
+
+        snapshot = tracemalloc.take_snapshot()
+        current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+        allocation_diffs = []
+        if self.previous_snapshot is not None:
+            stats = snapshot.compare_to(self.previous_snapshot, "lineno")
+            allocation_diffs = [str(stat) for stat in stats[:TOP_ALLOCATION_DIFFS] if stat.size_diff]
+        self.previous_snapshot = snapshot
+
+        entry = {
+            "label": label,
+            "time": time.perf_counter() - self.start_time,
+            "widgets": {name: sum(counts.values()) for name, counts in screens.items()},
+            "widget_classes": screens,
+            "total_widgets": sum(count_widgets(root).values()),
+            "tcl_variables": count_tcl_variables(root),
+            "python_variables": count_python_variables(),
+            "tcl_commands": count_tcl_commands(root),
+            "traced_bytes": current_bytes,
+            "peak_bytes": peak_bytes,
+            "allocation_diffs": allocation_diffs,
+        }
+        self.samples.append(entry)
+        logger.info("%s: %d widgets, %d Tcl variables, %d Tcl commands, %.1f KiB traced",
+                    label, entry["total_widgets"], entry["tcl_variables"], entry["tcl_commands"],
+                    current_bytes / 1024)
+        return entry
+
+    # --- Report ---
+
+    def leak_suspects(self):
+        """
+        Compares the first and last "enemy" samples.
+
+        Returns:
+            list: (metric, first value, last value, growth per display) for every metric
+                  that grew while monsters were displayed again and again.
+        """
+        enemy_samples = [entry for entry in self.samples if entry["label"].startswith("enemy ")]
+        if len(enemy_samples) < 2:
+            return []
+        first, last = enemy_samples[0], enemy_samples[-1]
+        displays = len(enemy_samples) - 1
+        suspects = []
+        for metric in ("total_widgets", "tcl_variables", "python_variables", "tcl_commands", "traced_bytes"):
+            if last[metric] > first[metric]:
+                suspects.append((metric, first[metric], last[metric], (last[metric] - first[metric]) / displays))
+        for screen, count in last["widgets"].items():
+            first_count = first["widgets"].get(screen, 0)
+            if count > first_count:
+                suspects.append((f"widgets in {screen}", first_count, count, (count - first_count) / displays))
+        return suspects
+
+    def format_report(self):
+        """
+        Returns the report as text.
+        """
+        lines = ["Nechronica memory and widget report", ""]
+        screen_names = list(self.samples[0]["widgets"]) if self.samples else []
+        header = f"{'time':>7}  {'sample':<28} {'widgets':>8} {'tcl vars':>9} {'py vars':>8} {'commands':>9} {'KiB':>9}  "
+        lines.append(header + " ".join(f"{name:>12}" for name in screen_names))
+        for entry in self.samples:
+            lines.append(f"{entry['time']:7.1f}  {entry['label'][:28]:<28} {entry['total_widgets']:>8} "
+                         f"{entry['tcl_variables']:>9} {entry['python_variables']:>8} {entry['tcl_commands']:>9} "
+                         f"{entry['traced_bytes'] / 1024:>9.1f}  "
+                         + " ".join(f"{entry['widgets'].get(name, 0):>12}" for name in screen_names))
+        lines.append("")
+
+        lines.append("Leak suspects (growth over repeated monster displays):")
+        suspects = self.leak_suspects()
+        for metric, first, last, per_display in suspects:
+            lines.append(f"  {metric}: {first} -> {last} ({per_display:+.1f} per display)")
+        if not suspects:
+            lines.append("  none")
+        lines.append("")
+
+        lines.append(f"Largest allocation changes per sample (top {TOP_ALLOCATION_DIFFS}):")
+        for entry in self.samples[1:]:
+            if entry["allocation_diffs"]:
+                lines.append(f"  {entry['label']}:")
+                lines.extend(f"    {diff}" for diff in entry["allocation_diffs"])
+        lines.append("")
+
+        if self.samples:
+            lines.append("Widget classes per screen at the last sample:")
+            for screen, counts in self.samples[-1]["widget_classes"].items():
+                classes = ", ".join(f"{name}: {count}" for name, count in sorted(counts.items(), key=lambda item: -item[1]))
+                lines.append(f"  {screen}: {classes}")
+        return "\n".join(lines) + "\n"
+
+    def write_report(self):
+        """
+        Writes the report to report_path.
+        """
+        try:
+            with open(self.report_path, 'w', encoding='utf-8') as f:
+                f.write(self.format_report())
+            logger.info("Memory report written to %s", self.report_path)
+        except IOError as e:
+            logger.error("Could not write memory report to %s: %s", self.report_path, e)
@@ -1,24 +1,25 @@
 # options_menu.py
 
 import tkinter as tk
-from settings_manager import save_settings
 
 class OptionsMenu(tk.Frame):
     """
     A frame representing the options menu of the game.
     """
-    def __init__(self, master, switch_frame_callback, initial_settings):
+    def __init__(self, master, switch_frame_callback, settings_service):
         """
         Initializes the OptionsMenu frame.
 
         Args:
             master: The parent widget (the main application window).
             switch_frame_callback: A function to call to switch to another frame.
-            initial_settings (dict): The settings loaded from the config file.
+            settings_service (SettingsService): The shared settings, read from and written to by this menu.
         """
         super().__init__(master)
         self.master = master
         self.switch_frame_callback = switch_frame_callback
+        self.settings_service = settings_service
+        initial_settings = settings_service.all()
         self.configure(bg="#2c2c2c")
 
         # Configure the grid to be responsive
@@ -85,62 +86,27 @@ class OptionsMenu(tk.Frame):
                                 command=lambda: self.switch_frame_callback("MainMenu"))
         back_button.grid(row=2, column=0, pady=20)
 
-    def _apply_resolution(self, resolution):
-        """
-        Applies the selected window resolution.
-        """
-        # We need to disable fullscreen before applying a new resolution.
-        self.master.master.attributes("-fullscreen", False)
-        self.master.master.geometry(resolution)
-        print(f"Window resolution set to: {resolution}")
-
-    def _apply_display_mode(self, mode):
-        """
-        Applies the selected display mode.
-        """
-        # The main window is the master of the master (the container frame).
-        root = self.master.master
-        
-        # First, we reset all attributes to a normal windowed state.
-        root.attributes("-fullscreen", False)
-        root.overrideredirect(False)
-        
-        if mode == "Fullscreen" or mode == "Borderless Window":
-            # In Tkinter, the best way to achieve a managed, tabbable borderless window
-            # is to use the native fullscreen attribute. This removes all borders and
-            # title bars while keeping the window under OS control.
-            root.attributes("-fullscreen", True)
-            root.bind("<Escape>", self._exit_fullscreen)
-            print(f"Display mode set to: {mode}. Press 'Esc' to exit.")
-        else: # Windowed mode
-            root.unbind("<Escape>")
-            print("Display mode set to: Windowed")
+        # Keep the dropdowns in sync if the settings are changed from elsewhere
+        settings_service.subscribe(self._on_settings_changed)
 
-    def _exit_fullscreen(self, event):
+    def _on_settings_changed(self, settings, changed_keys):
         """
-        Exits fullscreen mode when the Escape key is pressed.
+        Updates the dropdowns to reflect settings changed through the settings service.
         """
-        self.master.master.attributes("-fullscreen", False)
-        self.master.master.unbind("<Escape>")
-        print("Exited fullscreen mode.")
+        if "resolution" in changed_keys and self.resolution_var.get() != settings["resolution"]:
+            self.resolution_var.set(settings["resolution"])
+        if "mode" in changed_keys and self.display_mode_var.get() != settings["mode"]:
+            self.display_mode_var.set(settings["mode"])
 
     def save_settings(self):
         """
         Saves and applies the display settings.
-        This is where you would connect the UI to the game logic.
+        The settings service notifies the Application, which applies the
+        resolution and display mode to the window in a single transaction.
         """
         # Get the current selected values from the dropdowns
         selected_resolution = self.resolution_var.get()
         selected_mode = self.display_mode_var.get()
 
-        print(f"Applying settings...")
-
-        # Apply the resolution change (this also disables fullscreen temporarily)
-        self._apply_resolution(selected_resolution)
-
-        # Apply the display mode change
-        self._apply_display_mode(selected_mode)
-        
-        # Save the current settings to the config file
-        settings = {"resolution": selected_resolution, "mode": selected_mode}
-        save_settings(settings)
+        # Hand the settings to the settings service, which writes them to disk shortly after
+        self.settings_service.update(resolution=selected_resolution, mode=selected_mode)
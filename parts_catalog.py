@@ -0,0 +1,140 @@
+# parts_catalog.py
+
+# The catalog of Doll positions, classes and parts, loaded from the JSON/doll_*.json
+# data files. Every file is validated against JSON/doll_catalog_schema.json, and parts
+# are indexed by category, location, timing and cost so menus and the Doll builder
+# can look them up without scanning the whole list.
+
+import json
+import os
+
+from schema_validator import get_json_dir, load_schema, validate
+
+CATALOG_SCHEMA_FILE = "doll_catalog_schema.json"
+CATALOG_FILES = ["doll_positions.json", "doll_classes.json", "doll_parts.json"]
+
+# Part locations, in the order the Pictures/ art shows them
+LOCATIONS = ["Head", "Arm", "Torso", "Leg"]
+REINFORCEMENT_CATEGORIES = ["Armaments", "Mutations", "Enhancements"]
+
+
+class CatalogError(Exception):
+    """
+    Raised when a catalog file is missing, unreadable or fails validation.
+    """
+
+
+class PartsCatalog:
+    """
+    Positions, classes and parts, with indexes for fast lookup.
+    """
+    def __init__(self, positions=None, classes=None, parts=None):
+        """
+        Initializes the catalog and builds its indexes.
+
+        Args:
+            positions (list, optional): Position dictionaries.
+            classes (list, optional): Class dictionaries.
+            parts (list, optional): Part dictionaries.
+        """
+        self.positions = list(positions or [])
+        self.classes = list(classes or [])
+        self.parts = list(parts or [])
+
+        self.by_id = {}
+        for entry in self.positions + self.classes + self.parts:
+            if entry["id"] in self.by_id:
+                raise CatalogError(f"Duplicate catalog id '{entry['id']}'")
+            self.by_id[entry["id"]] = entry
+
+        # Each index maps a value to the list of parts that have it, in catalog order
+        self.by_category = {}
+        self.by_location = {}
+        self.by_timing = {}
+        self.by_cost = {}
+        for part in self.parts:
+            self.by_category.setdefault(part["category"], []).append(part)
+            self.by_location.setdefault(part["location"], []).append(part)
+            self.by_timing.setdefault(part["timing"], []).append(part)
+            self.by_cost.setdefault(part["cost"], []).append(part)
+
+    def get(self, entry_id):
+        """
+        Returns the position, class or part with the given id, or None.
+        """
+        return self.by_id.get(entry_id)
+
+    def find_parts(self, category=None, location=None, timing=None, max_cost=None):
+        """
+        Returns the parts matching every given filter, in catalog order.
+
+        The smallest matching index is used as the starting point, so a query only
+        looks at the parts of its most selective filter.
+
+        Args:
+            category (str, optional): "Basic", "Armaments", "Mutations" or "Enhancements".
+            location (str, optional): "Head", "Arm", "Torso" or "Leg".
+            timing (str, optional): "Action", "Rapid", "Auto", "Check" or "Damage".
+            max_cost (int, optional): Highest action point cost to include.
+        """
+        candidates = [index.get(value, []) for index, value in
+                      ((self.by_category, category), (self.by_location, location), (self.by_timing, timing))
+                      if value is not None]
+        if not candidates:
+            candidates = [self.parts]
+        candidates.sort(key=len)
+
+        results = []
+        for part in candidates[0]:
+            if category is not None and part["category"] != category:
+                continue
+            if location is not None and part["location"] != location:
+                continue
+            if timing is not None and part["timing"] != timing:
+                continue
+            if max_cost is not None and part["cost"] > max_cost:
+                continue
+            results.append(part)
+        return results
+
+
+def load_catalog(paths=None):
+    """
+    Loads and validates catalog files and returns a PartsCatalog.
+
+    Args:
+        paths (list, optional): Catalog files to load. Defaults to CATALOG_FILES in the JSON/ folder.
+
+    Raises:
+        CatalogError: If a file cannot be read or does not match the catalog schema.
+    """
+    if paths is None:
+        paths = [os.path.join(get_json_dir(), filename) for filename in CATALOG_FILES]
+    schema = load_schema(CATALOG_SCHEMA_FILE)
+
+    positions, classes, parts = [], [], []
+    for path in paths:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (IOError, json.JSONDecodeError) as e:
+            raise CatalogError(f"Could not load {path}: {e}")
+        errors = validate(data, schema)
+        if errors:
+            raise CatalogError(f"{path} is not a valid catalog file: " + "; ".join(errors[:5]))
+        positions.extend(data.get("positions", []))
+        classes.extend(data.get("classes", []))
+        parts.extend(data.get("parts", []))
+    return PartsCatalog(positions, classes, parts)
+
+
+_catalog = None
+
+def get_catalog():
+    """
+    Returns the shared catalog, loading it on first use.
+    """
+    global _catalog
+    if _catalog is None:
+        _catalog = load_catalog()
+    return _catalog
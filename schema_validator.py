@@ -0,0 +1,122 @@
+# schema_validator.py
+
+# A small validator for the subset of JSON Schema (draft-07) used by the files in JSON/:
+# type, enum, properties, required, additionalProperties, items, minimum, maximum,
+# minLength, minItems and local "$ref": "#/definitions/...". It keeps the game free of
+# third-party dependencies, which matters for the PyInstaller build.
+
+import json
+import os
+import sys
+
+_TYPE_CHECKS = {
+    "object": lambda value: isinstance(value, dict),
+    "array": lambda value: isinstance(value, list),
+    "string": lambda value: isinstance(value, str),
+    # bool is a subclass of int in Python, but not an integer in JSON
+    "integer": lambda value: isinstance(value, int) and not isinstance(value, bool),
+    "number": lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    "boolean": lambda value: isinstance(value, bool),
+    "null": lambda value: value is None,
+}
+
+_schema_cache = {}
+
+
+def get_json_dir():
+    """
+    Returns the path of the JSON/ folder, both from source and from a PyInstaller build.
+    """
+    if getattr(sys, 'frozen', False):
+        base_path = sys._MEIPASS
+    else:
+        base_path = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base_path, 'JSON')
+
+
+def load_schema(filename):
+    """
+    Loads (once) and returns a schema from the JSON/ folder.
+
+    Args:
+        filename (str): The schema's file name, e.g. "bestiary_schema.json".
+    """
+    if filename not in _schema_cache:
+        with open(os.path.join(get_json_dir(), filename), 'r', encoding='utf-8') as f:
+            _schema_cache[filename] = json.load(f)
+    return _schema_cache[filename]
+
+
+def validate(instance, schema, root_schema=None, path="$"):
+    """
+    Validates a value against a schema.
+
+    Args:
+        instance: The value to check.
+        schema (dict): The (sub)schema to check it against.
+        root_schema (dict, optional): The schema "$ref"s are resolved against. Defaults to schema.
+        path (str): Where instance sits in the document, used in error messages.
+
+    Returns:
+        list: Error messages; empty if the value is valid.
+    """
+    if root_schema is None:
+        root_schema = schema
+    errors = []
+
+    if "$ref" in schema:
+        ref = schema["$ref"]
+        if not ref.startswith("#/"):
+            return [f"{path}: unsupported reference {ref}"]
+        target = root_schema
+        for part in ref[2:].split("/"):
+            target = target[part]
+        return validate(instance, target, root_schema, path)
+
+    expected_type = schema.get("type")
+    if expected_type is not None:
+        types = expected_type if isinstance(expected_type, list) else [expected_type]
+        if not any(_TYPE_CHECKS[t](instance) for t in types):
+            return [f"{path}: expected {' or '.join(types)}, got {type(instance).__name__}"]
+
+    if "enum" in schema and instance not in schema["enum"]:
+        errors.append(f"{path}: {instance!r} is not one of {schema['enum']}")
+
+    if isinstance(instance, (int, float)) and not isinstance(instance, bool):
+        if "minimum" in schema and instance < schema["minimum"]:
+            errors.append(f"{path}: {instance} is less than {schema['minimum']}")
+        if "maximum" in schema and instance > schema["maximum"]:
+            errors.append(f"{path}: {instance} is greater than {schema['maximum']}")
+
+    if isinstance(instance, str) and "minLength" in schema and len(instance) < schema["minLength"]:
+        errors.append(f"{path}: shorter than {schema['minLength']} characters")
+
+    if isinstance(instance, dict):
+        for key in schema.get("required", []):
+            if key not in instance:
+                errors.append(f"{path}: missing required property '{key}'")
+        properties = schema.get("properties", {})
+        for key, value in instance.items():
+            if key in properties:
+                errors.extend(validate(value, properties[key], root_schema, f"{path}.{key}"))
+            elif schema.get("additionalProperties") is False:
+                errors.append(f"{path}: unexpected property '{key}'")
+
+    if isinstance(instance, list):
+        if "minItems" in schema and len(instance) < schema["minItems"]:
+            errors.append(f"{path}: fewer than {schema['minItems']} items")
+        if "items" in schema:
+            for index, item in enumerate(instance):
+                errors.extend(validate(item, schema["items"], root_schema, f"{path}[{index}]"))
+
+    return errors
+
+
+def validate_monster(record):
+    """
+    Validates a single monster record against JSON/bestiary_schema.json.
+
+    Returns:
+        list: Error messages; empty if the record is valid.
+    """
+    return validate(record, load_schema("bestiary_schema.json"))
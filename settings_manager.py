@@ -1,47 +1,276 @@
 # settings_manager.py
 
+import atexit
 import json
+import logging
 import os
+import re
+import sys
+import tempfile
+import threading
 
-SETTINGS_FILE = "config.json"
+from log_manager import DEFAULT_LOG_LEVEL, LOG_LEVELS
+
+APP_NAME = "Nechronica"
+SETTINGS_FILENAME = "config.json"
+
+# Older versions kept the settings next to wherever the game was started from
+LEGACY_SETTINGS_FILE = "config.json"
+
+# Changes are written to disk once no further change has arrived for this many seconds
+SAVE_DELAY_SECONDS = 1.0
+
+DEFAULT_SETTINGS = {
+    "resolution": "800x600",
+    "mode": "Windowed",
+    "log_level": DEFAULT_LOG_LEVEL,
+    "log_levels": {}
+}
+
+# Validation rules per setting: the expected type plus either allowed choices or a pattern
+# (or, for dictionaries, allowed choices for every value).
+# Settings that are not listed here are kept as they are.
+SETTINGS_SCHEMA = {
+    "resolution": {"type": str, "pattern": r"^\d+x\d+$"},
+    "mode": {"type": str, "choices": ["Windowed", "Fullscreen", "Borderless Window"]},
+    "log_level": {"type": str, "choices": LOG_LEVELS},
+    # Per-module overrides such as {"enemy_viewer": "DEBUG"}
+    "log_levels": {"type": dict, "value_choices": LOG_LEVELS},
+}
+
+logger = logging.getLogger(__name__)
+
+
+def get_config_dir():
+    """
+    Returns the per-user directory the settings file lives in.
+
+    Returns:
+        str: %APPDATA%\\Nechronica on Windows, ~/Library/Application Support/Nechronica on macOS,
+             and $XDG_CONFIG_HOME/nechronica (usually ~/.config/nechronica) elsewhere.
+    """
+    if sys.platform.startswith("win"):
+        base = os.environ.get("APPDATA") or os.path.join(os.path.expanduser("~"), "AppData", "Roaming")
+        return os.path.join(base, APP_NAME)
+    if sys.platform == "darwin":
+        return os.path.join(os.path.expanduser("~"), "Library", "Application Support", APP_NAME)
+    base = os.environ.get("XDG_CONFIG_HOME") or os.path.join(os.path.expanduser("~"), ".config")
+    return os.path.join(base, APP_NAME.lower())
+
+
+def validate_settings(settings):
+    """
+    Checks settings against SETTINGS_SCHEMA.
+
+    Args:
+        settings (dict): Settings as read from disk or passed in by the UI.
+
+    Returns:
+        tuple: (valid_settings, errors) where valid_settings only holds the values that
+               passed and errors lists a message for each one that did not.
+    """
+    valid = {}
+    errors = []
+    for key, value in settings.items():
+        rule = SETTINGS_SCHEMA.get(key)
+        if rule is not None:
+            if not isinstance(value, rule["type"]):
+                errors.append(f"'{key}' should be of type {rule['type'].__name__}, got {value!r}")
+                continue
+            if "choices" in rule and value not in rule["choices"]:
+                errors.append(f"'{key}' must be one of {rule['choices']}, got {value!r}")
+                continue
+            if "pattern" in rule and not re.match(rule["pattern"], value):
+                errors.append(f"'{key}' has an invalid format: {value!r}")
+                continue
+            if "value_choices" in rule and any(v not in rule["value_choices"] for v in value.values()):
+                errors.append(f"'{key}' values must be among {rule['value_choices']}, got {value!r}")
+                continue
+        valid[key] = value
+    return valid, errors
+
+
+class SettingsService:
+    """
+    Holds the settings in memory and keeps the settings file in sync with them.
+
+    The file is read once. Reads are served from memory, changes are pushed to
+    subscribers immediately, and writes to disk are coalesced and atomic.
+    """
+    def __init__(self, path=None, save_delay=SAVE_DELAY_SECONDS):
+        """
+        Initializes the service and loads the settings file.
+
+        Args:
+            path (str, optional): Settings file to use. Defaults to config.json in get_config_dir().
+            save_delay (float): Seconds to wait for further changes before writing to disk.
+        """
+        self.path = path or os.path.join(get_config_dir(), SETTINGS_FILENAME)
+        self.save_delay = save_delay
+        self.subscribers = []
+        self._lock = threading.Lock()
+        self._save_timer = None
+        self._dirty = False
+        self._settings = self._load()
+
+    def _load(self):
+        """
+        Reads the settings file (or the legacy one) and returns validated settings.
+        """
+        path = self.path
+        if not os.path.exists(path) and os.path.exists(LEGACY_SETTINGS_FILE):
+            # Pick up settings saved by older versions; they are written to the new location on the next save
+            path = LEGACY_SETTINGS_FILE
+        if not os.path.exists(path):
+            return dict(DEFAULT_SETTINGS)
+
+        try:
+            with open(path, 'r') as f:
+                loaded = json.load(f)
+        except (IOError, json.JSONDecodeError) as e:
+            logger.error("Could not load settings file %s: %s. Using default settings.", path, e)
+            return dict(DEFAULT_SETTINGS)
+        if not isinstance(loaded, dict):
+            logger.error("Could not load settings file %s: expected an object. Using default settings.", path)
+            return dict(DEFAULT_SETTINGS)
+
+        valid, errors = validate_settings(loaded)
+        for error in errors:
+            logger.warning("Invalid setting in %s: %s. Using the default.", path, error)
+        settings = dict(DEFAULT_SETTINGS)
+        settings.update(valid)
+        return settings
+
+    def get(self, key, default=None):
+        """
+        Returns a single setting from memory.
+        """
+        return self._settings.get(key, default)
+
+    def all(self):
+        """
+        Returns a copy of all settings.
+        """
+        return dict(self._settings)
+
+    def update(self, **changes):
+        """
+        Changes one or more settings, notifies subscribers and schedules a save.
+        Values that fail validation are rejected with a warning.
+
+        Returns:
+            set: The keys whose values actually changed.
+        """
+        validated, errors = validate_settings(changes)
+        for error in errors:
+            logger.warning("Rejected setting: %s.", error)
+
+        changed_keys = set()
+        for key in validated:
+            if self._settings.get(key) != validated[key]:
+                self._settings[key] = validated[key]
+                changed_keys.add(key)
+        if not changed_keys:
+            return changed_keys
+
+        for callback in list(self.subscribers):
+            callback(self.all(), changed_keys)
+        self._schedule_save()
+        return changed_keys
+
+    def subscribe(self, callback):
+        """
+        Registers callback(settings, changed_keys) to be called after every change.
+        """
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        """
+        Removes a callback registered with subscribe().
+        """
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+
+    def _schedule_save(self):
+        """
+        (Re)starts the countdown after which pending changes are written.
+        """
+        with self._lock:
+            self._dirty = True
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+            self._save_timer = threading.Timer(self.save_delay, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def flush(self):
+        """
+        Writes pending changes to disk now. Does nothing if there are none.
+        """
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if not self._dirty:
+                return
+            snapshot = dict(self._settings)
+            self._dirty = False
+
+        try:
+            self._write_atomic(snapshot)
+        except (IOError, OSError) as e:
+            logger.error("Could not save settings: %s", e)
+            with self._lock:
+                self._dirty = True
+
+    def _write_atomic(self, settings):
+        """
+        Writes settings to a temporary file next to the target and swaps it into place,
+        so an interrupted write never leaves a truncated settings file behind.
+        """
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix=".config-", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(settings, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+
+_service = None
+
+def get_settings_service():
+    """
+    Returns the shared SettingsService, creating it on first use.
+    Pending changes are flushed when the interpreter exits.
+    """
+    global _service
+    if _service is None:
+        _service = SettingsService()
+        atexit.register(_service.flush)
+    return _service
 
 def save_settings(settings):
     """
-    Saves a dictionary of settings to a JSON file.
+    Updates the shared settings with a dictionary of settings.
+    The file is written shortly afterwards, together with any other pending change.
 
     Args:
         settings (dict): A dictionary containing the settings to save.
     """
-    try:
-        with open(SETTINGS_FILE, 'w') as f:
-            json.dump(settings, f, indent=4)
-        print("Settings saved successfully.")
-    except IOError as e:
-        print(f"Error saving settings: {e}")
+    get_settings_service().update(**settings)
 
 def load_settings():
     """
-    Loads settings from a JSON file.
+    Returns the current settings.
 
     Returns:
-        dict: A dictionary of loaded settings, or a default dictionary
-              if the file does not exist or an error occurs.
-    """
-    default_settings = {
-        "resolution": "800x600",
-        "mode": "Windowed"
-    }
-    
-    if not os.path.exists(SETTINGS_FILE):
-        print("Settings file not found. Using default settings.")
-        return default_settings
-
-    try:
-        with open(SETTINGS_FILE, 'r') as f:
-            settings = json.load(f)
-        print("Settings loaded successfully.")
-        return settings
-    except (IOError, json.JSONDecodeError) as e:
-        print(f"Error loading settings file: {e}. Using default settings.")
-        return default_settings
-
+        dict: A copy of the settings, with defaults filled in for anything missing or invalid.
+    """
+    return get_settings_service().all()
@@ -0,0 +1,476 @@
+# statblock_export.py
+
+# Exports the bestiary as printable stat blocks, e.g. for GM screens:
+#
+#     python statblock_export.py statblocks/ [--store bestiary | --archive bestiary.nba]
+#                                [--format html|svg|both] [--workers N] [--force]
+#
+# Every monster gets a page with the sections the EnemyViewer shows: the name, the basic
+# info (id, threat levels, maximum action points), the maneuvers and the flavor text.
+# HTML pages share one stylesheet (statblock.css) and print one stat block per page; SVG
+# cards are self-contained. index.html links all of them.
+#
+# Pages are rendered in a process pool, a batch of monsters per task, from templates
+# compiled once per worker process. The output folder keeps a manifest with the content
+# hash of every exported monster, so a re-export only renders the monsters that changed
+# (or whose pages are missing) and deletes the pages of monsters that are gone.
+
+import argparse
+import hashlib
+import html
+import json
+import logging
+import os
+import sys
+import tempfile
+import textwrap
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from string import Template
+from urllib.parse import quote
+
+from bestiary_archive import ArchiveError, BestiaryArchive
+from bestiary_store import BestiaryStore, DEFAULT_BESTIARY_DIR
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ["html", "svg"]
+MANIFEST_FILENAME = ".statblocks.json"
+STYLESHEET_FILENAME = "statblock.css"
+# Bump when the templates change, so every page is rendered again
+RENDER_VERSION = 1
+# Monsters per pool task; rendering one takes well under a millisecond, so single
+# monsters would mostly cost process hand-overs
+RENDER_BATCH_SIZE = 100
+
+STYLESHEET = """\
+body { font-family: Helvetica, Arial, sans-serif; background: #2c2c2c; color: #111; margin: 0; }
+.statblock { background: #cccccc; max-width: 48em; margin: 1em auto; padding: 1em 1.5em; border: 3px outset #999; }
+.statblock h1 { font-family: Quantico, Helvetica, sans-serif; text-align: center; margin: 0 0 0.5em; }
+.statblock h2 { font-family: Quantico, Helvetica, sans-serif; border: 2px outset #999; padding: 0.1em 0.4em; margin: 1em 0 0.4em; }
+.info { display: grid; grid-template-columns: repeat(4, 1fr); gap: 0.3em; text-align: center; }
+.info dt { font-weight: bold; border: 2px outset #999; padding: 0.2em; }
+.info dd { margin: 0; background: #5a5a5a; color: #f0f0f0; padding: 0.2em; }
+.maneuver { border-top: 1px solid #999; padding: 0.3em 0; }
+.maneuver .stats { font-weight: bold; }
+.flavor h3 { margin: 0.6em 0 0.2em; font-size: 1em; }
+.index { background: #cccccc; max-width: 48em; margin: 1em auto; padding: 1em 1.5em; }
+@media print {
+    body { background: none; }
+    .statblock { border: 1px solid #000; margin: 0; max-width: none; page-break-after: always; }
+}
+"""
+
+PAGE_TEMPLATE = """\
+<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>$name</title>
+<link rel="stylesheet" href="$stylesheet">
+</head>
+<body>
+<article class="statblock">
+<h1>$name</h1>
+<dl class="info">
+<div><dt>ID</dt><dd>$id</dd></div>
+<div><dt>Threat Level (Base)</dt><dd>$threat_base</dd></div>
+<div><dt>Threat Level (Per Spawn Group)</dt><dd>$threat_per_spawn_group</dd></div>
+<div><dt>Max Action Points</dt><dd>$maximum_action_points</dd></div>
+</dl>
+<h2>Maneuvers</h2>
+$maneuvers
+<h2>Flavor Text</h2>
+<section class="flavor">
+<h3>Description</h3><p>$description</p>
+<h3>Tactics</h3><p>$tactics</p>
+<h3>Roleplay</h3><p>$roleplay</p>
+</section>
+</article>
+</body>
+</html>
+"""
+
+MANEUVER_TEMPLATE = """\
+<div class="maneuver"><div class="stats">$number. $id &mdash; Timing: $timing | Cost: $cost | Range: $range$damage</div>
+<div>$description</div></div>"""
+
+INDEX_TEMPLATE = """\
+<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Bestiary stat blocks</title>
+<link rel="stylesheet" href="$stylesheet">
+</head>
+<body>
+<div class="index">
+<h1>Bestiary stat blocks ($count)</h1>
+<ul>
+$entries
+</ul>
+</div>
+</body>
+</html>
+"""
+
+SVG_TEMPLATE = """\
+<svg xmlns="http://www.w3.org/2000/svg" width="$width" height="$height" viewBox="0 0 $width $height" font-family="Helvetica, Arial, sans-serif">
+<rect x="1" y="1" width="$inner_width" height="$inner_height" fill="#cccccc" stroke="#666666" stroke-width="2"/>
+$lines
+</svg>
+"""
+
+SVG_WIDTH = 640
+SVG_MARGIN = 20
+# Characters per wrapped SVG text line at the body font size
+SVG_WRAP_WIDTH = 92
+# (font size, line height, bold) of the SVG line styles
+SVG_STYLES = {
+    "title": (24, 34, True),
+    "heading": (16, 28, True),
+    "bold": (12, 18, True),
+    "text": (12, 16, False),
+}
+
+
+@lru_cache(maxsize=None)
+def _templates():
+    """
+    Returns the compiled templates. Cached, so each worker process compiles them once.
+    """
+    return {
+        "page": Template(PAGE_TEMPLATE),
+        "maneuver": Template(MANEUVER_TEMPLATE),
+        "index": Template(INDEX_TEMPLATE),
+        "svg": Template(SVG_TEMPLATE),
+    }
+
+
+def _file_stem(monster_id):
+    """
+    Returns the file name of a monster's pages without the extension. Characters that
+    are not safe in file names are percent-encoded, as in BestiaryStore.path_for(), so
+    different ids never share a page.
+    """
+    return quote(str(monster_id), safe="")
+
+
+def record_hash(record):
+    """
+    Returns the content hash of a monster as stored in the export manifest.
+    """
+    data = json.dumps(record, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha1(data).hexdigest()
+
+
+def _damage_text(maneuver):
+    damage = maneuver.get("damage")
+    if not damage:
+        return ""
+    text = f" | Damage: {damage.get('base_damage', 0)} {damage.get('effect', '')}".rstrip()
+    if damage.get("formula"):
+        text += f" ({damage['formula']})"
+    return text
+
+
+def render_html(record):
+    """
+    Returns the HTML stat block page of a monster.
+    """
+    templates = _templates()
+    escape = html.escape
+    threat = record.get("threatLevel", {})
+    flavor = record.get("flavor", {})
+    maneuvers = [templates["maneuver"].substitute(
+        number=index + 1, id=escape(str(maneuver.get("id", "N/A"))),
+        timing=escape(str(maneuver.get("timing", "N/A"))), cost=escape(str(maneuver.get("cost", "N/A"))),
+        range=escape(str(maneuver.get("range", "N/A"))), damage=escape(_damage_text(maneuver)),
+        description=escape(maneuver.get("description", "")))
+        for index, maneuver in enumerate(record.get("maneuvers", []))]
+    return templates["page"].substitute(
+        name=escape(record.get("name", "Unknown Enemy")), stylesheet=STYLESHEET_FILENAME,
+        id=escape(str(record.get("id", "N/A"))),
+        threat_base=escape(str(threat.get("base", "N/A"))),
+        threat_per_spawn_group=escape(str(threat.get("per_spawn_group", "N/A"))),
+        maximum_action_points=escape(str(record.get("maximumActionPoints", "N/A"))),
+        maneuvers="\n".join(maneuvers) or "<p>No maneuvers listed.</p>",
+        description=escape(flavor.get("description", "N/A")),
+        tactics=escape(flavor.get("tactics", "N/A")),
+        roleplay=escape(flavor.get("roleplay", "N/A")))
+
+
+def render_svg(record):
+    """
+    Returns the SVG stat block card of a monster. Long texts are wrapped to the card width.
+    """
+    threat = record.get("threatLevel", {})
+    flavor = record.get("flavor", {})
+    lines = [("title", record.get("name", "Unknown Enemy")),
+             ("bold", f"ID: {record.get('id', 'N/A')}"),
+             ("text", f"Threat Level (Base): {threat.get('base', 'N/A')}    "
+                      f"Threat Level (Per Spawn Group): {threat.get('per_spawn_group', 'N/A')}    "
+                      f"Max Action Points: {record.get('maximumActionPoints', 'N/A')}"),
+             ("heading", "Maneuvers")]
+    maneuvers = record.get("maneuvers", [])
+    for index, maneuver in enumerate(maneuvers):
+        lines.append(("bold", f"{index + 1}. {maneuver.get('id', 'N/A')}: Timing {maneuver.get('timing', 'N/A')} | "
+                              f"Cost {maneuver.get('cost', 'N/A')} | Range {maneuver.get('range', 'N/A')}"
+                              f"{_damage_text(maneuver)}"))
+        lines.extend(("text", line) for line in textwrap.wrap(maneuver.get("description", ""), SVG_WRAP_WIDTH))
+    if not maneuvers:
+        lines.append(("text", "No maneuvers listed."))
+    lines.append(("heading", "Flavor Text"))
+    for title, key in (("Description", "description"), ("Tactics", "tactics"), ("Roleplay", "roleplay")):
+        lines.append(("bold", title))
+        lines.extend(("text", line) for line in textwrap.wrap(flavor.get(key, "N/A"), SVG_WRAP_WIDTH))
+
+    elements = []
+    y = SVG_MARGIN
+    for style, text in lines:
+        size, height, bold = SVG_STYLES[style]
+        y += height
+        attributes = ' font-weight="bold"' if bold else ""
+        if style == "title":
+            x, attributes = SVG_WIDTH // 2, attributes + ' text-anchor="middle"'
+        else:
+            x = SVG_MARGIN
+        elements.append(f'<text x="{x}" y="{y}" font-size="{size}"{attributes}>{html.escape(text)}</text>')
+    height = y + SVG_MARGIN
+    return _templates()["svg"].substitute(width=SVG_WIDTH, height=height, inner_width=SVG_WIDTH - 2,
+                                          inner_height=height - 2, lines="\n".join(elements))
+
+
+RENDERERS = {"html": render_html, "svg": render_svg}
+
+
+def _write_atomic(path, text):
+    fd, temp_path = tempfile.mkstemp(prefix=".tmp-", dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'w', encoding="utf-8") as f:
+            f.write(text)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def render_batch(records, out_dir, formats):
+    """
+    Renders and writes the pages of a batch of monsters. Runs in a worker process.
+
+    Returns:
+        list: (id, error message or None) per monster.
+    """
+    results = []
+    for record in records:
+        try:
+            stem = _file_stem(record["id"])
+            for format_name in formats:
+                # Written in place: a page cut short by a crash is not in the manifest yet,
+                # so the next export renders it again
+                with open(os.path.join(out_dir, f"{stem}.{format_name}"), 'w', encoding="utf-8") as f:
+                    f.write(RENDERERS[format_name](record))
+            results.append((record["id"], None))
+        except (OSError, KeyError, TypeError, AttributeError) as e:
+            results.append((record.get("id"), f"{type(e).__name__}: {e}"))
+    return results
+
+
+class ExportProgress:
+    """
+    Running totals of an export.
+    """
+    def __init__(self):
+        self.total = 0 # Monsters in the bestiary
+        self.rendered = 0
+        self.unchanged = 0
+        self.removed = 0
+        self.to_render = 0
+        self.errors = [] # (id, message)
+        self.cancelled = False
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+class StatBlockExporter:
+    """
+    Renders the stat blocks of a bestiary into a folder, skipping unchanged monsters.
+    """
+    def __init__(self, out_dir, formats=("html",), workers=None, force=False, progress_callback=None):
+        """
+        Args:
+            out_dir (str): The output folder; created if needed.
+            formats (iterable): Some of FORMATS.
+            workers (int, optional): Worker processes. None uses one per CPU; 0 renders
+                in this process.
+            force (bool): Render every monster, changed or not.
+            progress_callback (callable, optional): Called with the ExportProgress after
+                every rendered batch, on the thread that called run().
+        """
+        unknown = set(formats) - set(FORMATS)
+        if unknown:
+            raise ValueError(f"Unknown export formats: {', '.join(sorted(unknown))}")
+        self.out_dir = out_dir
+        self.formats = sorted(set(formats))
+        self.workers = workers
+        self.force = force
+        self.progress_callback = progress_callback
+
+    def _load_manifest(self):
+        """
+        Returns {id: hash} of the monsters exported last time with the same templates and formats.
+        """
+        try:
+            with open(os.path.join(self.out_dir, MANIFEST_FILENAME), 'r', encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if manifest.get("render_version") != RENDER_VERSION or manifest.get("formats") != self.formats:
+            return {}
+        return manifest.get("monsters", {})
+
+    def _is_current(self, monster_id, digest, manifest):
+        if self.force or manifest.get(monster_id) != digest:
+            return False
+        stem = _file_stem(monster_id)
+        return all(os.path.exists(os.path.join(self.out_dir, f"{stem}.{format_name}")) for format_name in self.formats)
+
+    def run(self, records, cancel_event=None):
+        """
+        Exports the monsters.
+
+        Args:
+            records (iterable): Every monster of the bestiary; monsters exported earlier
+                but missing here have their pages deleted.
+            cancel_event (threading.Event, optional): Once set, the export stops after the
+                current batch. Pages written so far are kept and not rendered again.
+
+        Returns:
+            ExportProgress: The final totals.
+        """
+        os.makedirs(self.out_dir, exist_ok=True)
+        progress = ExportProgress()
+        manifest = self._load_manifest()
+        exported = {} # id -> hash of the monsters whose pages are current
+        names = {} # id -> name, for the index
+        stems = {} # casefolded file stem -> id, as case-insensitive file systems see them
+        pending = {} # id -> hash of the monsters in the batches being rendered
+        batches = [[]]
+        for record in records:
+            monster_id = record["id"]
+            stem = _file_stem(monster_id).casefold()
+            if stems.setdefault(stem, monster_id) != monster_id:
+                progress.errors.append((monster_id, f"Its pages would overwrite those of {stems[stem]}"))
+                continue
+            digest = record_hash(record)
+            names[monster_id] = record.get("name", monster_id)
+            if self._is_current(monster_id, digest, manifest):
+                exported[monster_id] = digest
+                progress.unchanged += 1
+                continue
+            pending[monster_id] = digest
+            if len(batches[-1]) >= RENDER_BATCH_SIZE:
+                batches.append([])
+            batches[-1].append(record)
+        progress.total = len(names)
+        progress.to_render = len(pending)
+        batches = [batch for batch in batches if batch]
+
+        _write_atomic(os.path.join(self.out_dir, STYLESHEET_FILENAME), STYLESHEET)
+        if self.workers == 0 or len(batches) <= 1:
+            # A single batch is not worth starting worker processes for
+            pool = None
+            results = (render_batch(batch, self.out_dir, self.formats) for batch in batches)
+        else:
+            pool = ProcessPoolExecutor(self.workers)
+            results = (future.result() for future in as_completed(
+                [pool.submit(render_batch, batch, self.out_dir, self.formats) for batch in batches]))
+        try:
+            for batch_results in results:
+                for monster_id, error in batch_results:
+                    if error is None:
+                        exported[monster_id] = pending[monster_id]
+                        progress.rendered += 1
+                    else:
+                        progress.errors.append((monster_id, error))
+                if self.progress_callback:
+                    self.progress_callback(progress)
+                if cancel_event is not None and cancel_event.is_set():
+                    progress.cancelled = True
+                    break
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+        if not progress.cancelled:
+            for monster_id in set(manifest) - set(names):
+                stem = _file_stem(monster_id)
+                if stem.casefold() in stems: # The same file as a monster still exported
+                    progress.removed += 1
+                    continue
+                for format_name in FORMATS:
+                    try:
+                        os.remove(os.path.join(self.out_dir, f"{stem}.{format_name}"))
+                    except FileNotFoundError:
+                        pass
+                progress.removed += 1
+        else:
+            # Kept, so their pages are deleted by the next complete export
+            exported.update((monster_id, digest) for monster_id, digest in manifest.items() if monster_id not in names)
+        self._write_index(names)
+        _write_atomic(os.path.join(self.out_dir, MANIFEST_FILENAME),
+                      json.dumps({"render_version": RENDER_VERSION, "formats": self.formats, "monsters": exported},
+                                 separators=(",", ":")))
+        if self.progress_callback:
+            self.progress_callback(progress)
+        return progress
+
+    def _write_index(self, names):
+        entries = []
+        for monster_id in sorted(names, key=lambda monster_id: (str(names[monster_id]).casefold(), monster_id)):
+            stem = _file_stem(monster_id)
+            links = " ".join(f'<a href="{html.escape(quote(stem))}.{format_name}">{format_name.upper()}</a>'
+                             for format_name in self.formats)
+            entries.append(f"<li>{html.escape(str(names[monster_id]))} ({links})</li>")
+        _write_atomic(os.path.join(self.out_dir, "index.html"), _templates()["index"].substitute(
+            stylesheet=STYLESHEET_FILENAME, count=len(names), entries="\n".join(entries)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the bestiary as printable HTML/SVG stat blocks.")
+    parser.add_argument("out_dir", help="output folder")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--store", default=DEFAULT_BESTIARY_DIR, help=f"bestiary folder (default: {DEFAULT_BESTIARY_DIR})")
+    source.add_argument("--archive", help="read the monsters from a bestiary archive instead")
+    parser.add_argument("--format", choices=FORMATS + ["both"], default="html", help="page format (default: html)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes; 0 renders in-process (default: one per CPU)")
+    parser.add_argument("--force", action="store_true", help="render every monster, not only the changed ones")
+    args = parser.parse_args(argv)
+
+    formats = FORMATS if args.format == "both" else [args.format]
+    exporter = StatBlockExporter(args.out_dir, formats, args.workers, args.force)
+    try:
+        if args.archive:
+            with BestiaryArchive(args.archive) as archive:
+                progress = exporter.run(archive.iter_stored_order())
+        else:
+            progress = exporter.run(BestiaryStore(args.store).iter_records())
+    except ArchiveError as e:
+        logger.error("%s", e)
+        return 1
+    logger.info("Exported %d monsters to %s in %.1f s: %d rendered, %d unchanged, %d removed",
+                progress.total, args.out_dir, progress.elapsed, progress.rendered, progress.unchanged, progress.removed)
+    for monster_id, message in progress.errors:
+        logger.warning("%s: %s", monster_id, message)
+    return 1 if progress.errors else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    sys.exit(main())
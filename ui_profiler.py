@@ -0,0 +1,249 @@
+# ui_profiler.py
+
+# Opt-in instrumentation of the Tk event loop (run the game with --profile-ui).
+#
+# Every Python callback Tk can call goes through Misc._register: button commands,
+# bindings such as <<ListboxSelect>>, variable traces and after() jobs. While the
+# profiler is installed, those callbacks are wrapped with a timer and their durations
+# are collected in a histogram per handler. A heartbeat after() probe meanwhile checks
+# how late the event loop gets to it; a late heartbeat is a stall, and it is blamed on
+# the slowest handler that ran since the previous beat. The slowest handlers and the
+# stalls are written to a report file when the application exits.
+
+import functools
+import logging
+import time
+import tkinter as tk
+
+# Histogram bucket upper bounds, in milliseconds. The last bucket is open-ended.
+LATENCY_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]
+HEARTBEAT_INTERVAL_MS = 50
+# A heartbeat this much later than scheduled counts as a stall
+STALL_THRESHOLD_MS = 100
+DEFAULT_REPORT_FILE = "ui_profile.txt"
+# How many handlers and stalls the report lists
+REPORT_TOP_N = 20
+
+# Misc.after registers its own "callit" closure around the job. The job itself is
+# wrapped in the patched after() so it keeps its real name, and callit is skipped.
+_AFTER_CALLIT_QUALNAME = "Misc.after.<locals>.callit"
+
+logger = logging.getLogger(__name__)
+
+
+def handler_name(func):
+    """
+    Returns a readable, stable name for a callback, e.g.
+    "database_menu.DatabaseMenu._toggle_catalog_dropdown" or
+    "database_menu.DatabaseMenu._create_widgets.<locals>.<lambda>:152".
+    """
+    module = getattr(func, "__module__", None) or "?"
+    qualname = getattr(func, "__qualname__", None) or repr(func)
+    name = f"{module}.{qualname}"
+    if "<lambda>" in qualname:
+        code = getattr(func, "__code__", None)
+        if code is not None:
+            name += f":{code.co_firstlineno}"
+    return name
+
+
+class HandlerStats:
+    """
+    Call count, total and worst duration, and latency histogram of one handler.
+    """
+    __slots__ = ("calls", "total_ms", "max_ms", "buckets")
+
+    def __init__(self):
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def add(self, duration_ms):
+        self.calls += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        for index, bound in enumerate(LATENCY_BUCKETS_MS):
+            if duration_ms <= bound:
+                self.buckets[index] += 1
+                return
+        self.buckets[-1] += 1
+
+
+class UIProfiler:
+    """
+    Times Tk callbacks and detects event-loop stalls.
+    """
+    def __init__(self, report_path=DEFAULT_REPORT_FILE, heartbeat_ms=HEARTBEAT_INTERVAL_MS,
+                 stall_threshold_ms=STALL_THRESHOLD_MS):
+        """
+        Initializes the profiler. Nothing is measured until install() is called.
+
+        Args:
+            report_path (str): File the report is written to by stop().
+            heartbeat_ms (int): Interval of the heartbeat probe.
+            stall_threshold_ms (int): Heartbeat lateness that counts as a stall.
+        """
+        self.report_path = report_path
+        self.heartbeat_ms = heartbeat_ms
+        self.stall_threshold_ms = stall_threshold_ms
+        self.stats = {}
+        self.stalls = [] # (seconds since start, lateness in ms, blamed handler)
+        self.max_lateness_ms = 0.0
+        self.heartbeats = 0
+        self.root = None
+        self.start_time = None
+        self.heartbeat_job = None
+        self.expected_beat = None
+        self.slowest_since_beat = None # (duration in ms, handler name)
+        self._original_register = None
+        self._original_after = None
+
+    def install(self, root=None):
+        """
+        Starts wrapping callbacks. Call it before the widgets are created so their
+        commands and bindings are wrapped too; pass the root window, now or through
+        start_heartbeat(), to run the heartbeat probe.
+        """
+        if self._original_register is not None:
+            return
+        self.start_time = time.perf_counter()
+        self._original_register = original_register = tk.Misc._register
+        self._original_after = original_after = tk.Misc.after
+        profiler = self
+
+        def _register(widget, func, subst=None, needcleanup=1):
+            if not getattr(func, "_ui_profiled", False) and getattr(func, "__qualname__", "") != _AFTER_CALLIT_QUALNAME:
+                func = profiler.wrap(func)
+            return original_register(widget, func, subst, needcleanup)
+
+        def after(widget, ms, func=None, *args):
+            if func is not None and not getattr(func, "_ui_profiled", False):
+                func = profiler.wrap(func)
+            return original_after(widget, ms, func, *args)
+
+        tk.Misc._register = _register
+        tk.Misc.after = after
+        if root is not None:
+            self.start_heartbeat(root)
+
+    def uninstall(self):
+        """
+        Stops wrapping new callbacks and stops the heartbeat. Callbacks wrapped so far
+        keep their timers until Tk releases them.
+        """
+        if self._original_register is None:
+            return
+        if self.heartbeat_job is not None and self.root is not None:
+            try:
+                self.root.after_cancel(self.heartbeat_job)
+            except tk.TclError:
+                pass # The window is already destroyed
+            self.heartbeat_job = None
+        tk.Misc._register = self._original_register
+        tk.Misc.after = self._original_after
+        self._original_register = None
+        self._original_after = None
+
+    def wrap(self, func):
+        """
+        Returns func wrapped with a timer that records into this profiler.
+        """
+        name = handler_name(func)
+
+        @functools.wraps(func)
+        def timed(*args):
+            start = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                self.record(name, (time.perf_counter() - start) * 1000)
+
+        timed._ui_profiled = True
+        return timed
+
+    def record(self, name, duration_ms):
+        """
+        Adds one call of a handler.
+        """
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = HandlerStats()
+        stats.add(duration_ms)
+        if self.slowest_since_beat is None or duration_ms > self.slowest_since_beat[0]:
+            self.slowest_since_beat = (duration_ms, name)
+
+    # --- Heartbeat ---
+
+    def start_heartbeat(self, root):
+        """
+        Starts the heartbeat probe on a root window.
+        """
+        self.root = root
+        self.expected_beat = time.perf_counter() + self.heartbeat_ms / 1000
+        # Scheduled with the unpatched after() so the probe does not profile itself
+        self.heartbeat_job = self._original_after(root, self.heartbeat_ms, self._heartbeat)
+
+    def _heartbeat(self):
+        now = time.perf_counter()
+        lateness_ms = max(0.0, (now - self.expected_beat) * 1000)
+        self.heartbeats += 1
+        self.max_lateness_ms = max(self.max_lateness_ms, lateness_ms)
+        if lateness_ms >= self.stall_threshold_ms:
+            blamed = self.slowest_since_beat[1] if self.slowest_since_beat else "(no Python callback)"
+            self.stalls.append((now - self.start_time, lateness_ms, blamed))
+        self.slowest_since_beat = None
+        self.expected_beat = now + self.heartbeat_ms / 1000
+        self.heartbeat_job = self._original_after(self.root, self.heartbeat_ms, self._heartbeat)
+
+    # --- Report ---
+
+    def stop(self):
+        """
+        Uninstalls the profiler and writes the report.
+        """
+        self.uninstall()
+        self.write_report()
+
+    def format_report(self):
+        """
+        Returns the report as text.
+        """
+        elapsed = time.perf_counter() - self.start_time if self.start_time else 0.0
+        lines = [
+            "Nechronica UI profile",
+            f"Session length: {elapsed:.1f} s, {sum(s.calls for s in self.stats.values())} callbacks "
+            f"from {len(self.stats)} handlers",
+            f"Heartbeats: {self.heartbeats} every {self.heartbeat_ms} ms, worst lateness "
+            f"{self.max_lateness_ms:.1f} ms, {len(self.stalls)} stalls of {self.stall_threshold_ms} ms or more",
+            "",
+        ]
+
+        bucket_labels = [f"<={bound}" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}"]
+        ranked = sorted(self.stats.items(), key=lambda item: item[1].max_ms, reverse=True)[:REPORT_TOP_N]
+        lines.append(f"Slowest handlers (by worst call, top {REPORT_TOP_N}):")
+        for name, stats in ranked:
+            lines.append(f"  {name}")
+            lines.append(f"    calls {stats.calls}, max {stats.max_ms:.1f} ms, "
+                         f"mean {stats.total_ms / stats.calls:.2f} ms, total {stats.total_ms:.1f} ms")
+            histogram = ", ".join(f"{label}: {count}" for label, count in zip(bucket_labels, stats.buckets) if count)
+            lines.append(f"    ms histogram: {histogram}")
+        lines.append("")
+
+        lines.append(f"Worst stalls (top {REPORT_TOP_N}):")
+        for at, lateness_ms, blamed in sorted(self.stalls, key=lambda stall: stall[1], reverse=True)[:REPORT_TOP_N]:
+            lines.append(f"  at {at:8.2f} s: {lateness_ms:7.1f} ms late, slowest handler: {blamed}")
+        if not self.stalls:
+            lines.append("  none")
+        return "\n".join(lines) + "\n"
+
+    def write_report(self):
+        """
+        Writes the report to report_path.
+        """
+        try:
+            with open(self.report_path, 'w', encoding='utf-8') as f:
+                f.write(self.format_report())
+            logger.info("UI profile written to %s", self.report_path)
+        except IOError as e:
+            logger.error("Could not write UI profile to %s: %s", self.report_path, e)